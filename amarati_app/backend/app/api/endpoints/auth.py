@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends
+from fastapi.security import HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
@@ -8,7 +9,10 @@ from app.services.auth_service import (
     authenticate_user,
     create_access_token,
     get_current_user,
+    revoke_token,
+    security,
 )
+from app.services.user_cache import invalidate_user
 from app.models.user import User
 
 router = APIRouter()
@@ -43,6 +47,15 @@ async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
     )
 
 
+@router.post("/logout", response_model=dict)
+async def logout(
+    current_user: User = Depends(get_current_user),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+):
+    await revoke_token(credentials.credentials)
+    return {"message": "تم تسجيل الخروج"}
+
+
 @router.get("/me", response_model=UserResponse)
 async def get_me(current_user: User = Depends(get_current_user)):
     return UserResponse.model_validate(current_user)
@@ -57,5 +70,6 @@ async def update_role(
     current_user.role = data.role
     db.add(current_user)
     await db.commit()
+    await invalidate_user(current_user.user_id)
     await db.refresh(current_user)
     return UserResponse.model_validate(current_user)
@@ -1,17 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from pydantic import BaseModel
+from sqlalchemy import select, update, tuple_
+from pydantic import BaseModel, Field
 from typing import Optional, List
+import asyncio
+import json
+import logging
 import uuid
 import secrets
 
-from app.core.database import get_db
+from app.core.database import AsyncSessionLocal, get_db, get_read_db
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
 from app.models.building import Building
-from app.models.user import User
+from app.models.user import User, UserRole
 from app.services.auth_service import get_current_user
+from app.services.user_cache import invalidate_user
+from app.services.unit_service import (
+    UnitSpec,
+    layout_units,
+    parse_units_csv,
+    validate_new_units,
+    provision_units,
+)
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
 # ---- Schemas ----
@@ -43,6 +57,13 @@ class MemberResponse(BaseModel):
     role: str
 
 
+class UnitLayoutRequest(BaseModel):
+    floors: int = Field(..., ge=1, le=500)
+    units_per_floor: int = Field(..., ge=1, le=1000)
+    first_floor: int = 1
+    invite_expires_in_days: Optional[int] = Field(None, ge=1)
+
+
 # ---- Create a building group ----
 @router.post("/", response_model=BuildingResponse, status_code=status.HTTP_201_CREATED)
 async def create_building(
@@ -66,6 +87,7 @@ async def create_building(
         city=data.city,
         owner_id=current_user.user_id,
         invite_code=invite_code,
+        member_count=1,
     )
     db.add(building)
 
@@ -74,6 +96,7 @@ async def create_building(
     db.add(current_user)
 
     await db.commit()
+    await invalidate_user(current_user.user_id)
     await db.refresh(building)
 
     return BuildingResponse(
@@ -82,7 +105,7 @@ async def create_building(
         address=building.address,
         city=building.city,
         invite_code=building.invite_code,
-        member_count=1,
+        member_count=building.member_count,
     )
 
 
@@ -103,9 +126,24 @@ async def join_building(
     if not building:
         raise HTTPException(status_code=404, detail="كود الدعوة غير صالح")
 
-    current_user.building_id = building.id
-    db.add(current_user)
+    # Guarded on building_id IS NULL so concurrent joins by the same user
+    # count them once
+    joined = await db.execute(
+        update(User)
+        .where(User.user_id == current_user.user_id, User.building_id.is_(None))
+        .values(building_id=building.id)
+        .execution_options(synchronize_session=False)
+    )
+    if joined.rowcount != 1:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="أنت منضم لمجموعة بالفعل")
+    await db.execute(
+        update(Building)
+        .where(Building.id == building.id)
+        .values(member_count=Building.member_count + 1)
+    )
     await db.commit()
+    await invalidate_user(current_user.user_id)
 
     return {
         "message": "تم الانضمام للمجموعة بنجاح ✅",
@@ -118,7 +156,7 @@ async def join_building(
 @router.get("/my", response_model=Optional[BuildingResponse])
 async def get_my_building(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     if not current_user.building_id:
         return None
@@ -130,35 +168,47 @@ async def get_my_building(
     if not building:
         return None
 
-    # Count members
-    members_result = await db.execute(
-        select(User).where(User.building_id == building.id)
-    )
-    member_count = len(members_result.scalars().all())
-
     return BuildingResponse(
         id=building.id,
         name=building.name,
         address=building.address,
         city=building.city,
         invite_code=building.invite_code,
-        member_count=member_count,
+        member_count=building.member_count or 0,
     )
 
 
 # ---- List building members ----
+# Sorted by name; pass the X-Next-Cursor response header back as `cursor` for the next page.
 @router.get("/my/members", response_model=List[MemberResponse])
 async def get_building_members(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    role: Optional[UserRole] = None,
+    q: Optional[str] = Query(None, description="Name prefix"),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     if not current_user.building_id:
         raise HTTPException(status_code=400, detail="أنت غير منضم لأي مجموعة")
 
-    result = await db.execute(
-        select(User).where(User.building_id == current_user.building_id)
+    query = select(User.user_id, User.name, User.role).where(
+        User.building_id == current_user.building_id
     )
-    members = result.scalars().all()
+    if role:
+        query = query.where(User.role == role)
+    if q:
+        query = query.where(User.name.startswith(q, autoescape=True))
+    if cursor:
+        after_name, after_id = decode_cursor(cursor, 2)
+        query = query.where(tuple_(User.name, User.user_id) > tuple_(after_name, after_id))
+    query = query.order_by(User.name, User.user_id).limit(limit + 1)
+
+    rows = (await db.execute(query)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].name, rows[-1].user_id)
 
     return [
         MemberResponse(
@@ -166,5 +216,78 @@ async def get_building_members(
             name=m.name,
             role=m.role.value if hasattr(m.role, 'value') else str(m.role),
         )
-        for m in members
+        for m in rows
     ]
+
+
+# ---- Bulk unit provisioning (owner) ----
+async def _get_owned_building(current_user: User, db: AsyncSession) -> Building:
+    if not current_user.building_id:
+        raise HTTPException(status_code=400, detail="أنت غير منضم لأي مجموعة")
+    result = await db.execute(select(Building).where(Building.id == current_user.building_id))
+    building = result.scalar_one_or_none()
+    if not building:
+        raise HTTPException(status_code=404, detail="المجموعة غير موجودة")
+    if building.owner_id != current_user.user_id:
+        raise HTTPException(status_code=403, detail="هذه العملية متاحة لمالك المبنى فقط")
+    return building
+
+
+async def _provision(
+    db: AsyncSession,
+    building: Building,
+    units: List[UnitSpec],
+    current_user: User,
+    invite_expires_in_days: Optional[int],
+    progress: bool,
+):
+    await validate_new_units(db, building.id, units)
+
+    if not progress:
+        result = None
+        async for event in provision_units(db, building, units, current_user.user_id, invite_expires_in_days):
+            result = event
+        return result
+
+    # Stream NDJSON progress events; the import runs in its own session for the
+    # lifetime of the response body. The status line goes out before anything
+    # is inserted, so it is 200 and the last event says how the import ended:
+    # "status": "done", or "status": "error" (nothing was saved).
+    async def stream():
+        try:
+            async with AsyncSessionLocal() as session:
+                async for event in provision_units(
+                    session, building, units, current_user.user_id, invite_expires_in_days
+                ):
+                    yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as exc:
+            logger.exception("Unit provisioning failed for building %s", building.id)
+            detail = exc.detail if isinstance(exc, HTTPException) else "تعذر إنشاء الوحدات، لم يتم حفظ أي وحدة"
+            yield json.dumps({"event": "error", "status": "error", "detail": detail}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.post("/my/units/bulk", response_model=dict, status_code=status.HTTP_201_CREATED)
+async def bulk_create_units(
+    data: UnitLayoutRequest,
+    progress: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    building = await _get_owned_building(current_user, db)
+    units = layout_units(data.floors, data.units_per_floor, data.first_floor)
+    return await _provision(db, building, units, current_user, data.invite_expires_in_days, progress)
+
+
+@router.post("/my/units/import", response_model=dict, status_code=status.HTTP_201_CREATED)
+async def import_units_csv(
+    file: UploadFile = File(...),
+    invite_expires_in_days: Optional[int] = Query(None, ge=1),
+    progress: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    building = await _get_owned_building(current_user, db)
+    units = await asyncio.to_thread(parse_units_csv, file.file)  # blocking read and parse of the spooled file
+    return await _provision(db, building, units, current_user, invite_expires_in_days, progress)
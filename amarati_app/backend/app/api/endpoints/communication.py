@@ -1,15 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, List
 import uuid
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
+from app.models.maintenance import Visit
+from app.models.maintenance_request import MaintenanceRequest
 from app.models.system import ChatMessage
-from app.models.user import User
+from app.models.user import User, UserRole
+from app.schemas.datetimes import naive_utc
+from app.services import scheduling_service
 from app.services.auth_service import get_current_user
+from app.services.maintenance_service import MAX_BULK_REQUESTS
 
 router = APIRouter()
 
@@ -63,7 +68,7 @@ async def send_message(
 @router.get("/chat", response_model=List[ChatMessageResponse])
 async def get_chat_history(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     if not current_user.building_id:
         return []
@@ -96,3 +101,187 @@ async def get_chat_history(
         )
         for m in messages
     ]
+
+
+# ---- Visit Schemas ----
+class VisitPropose(BaseModel):
+    request_id: str
+    technician_name: Optional[str] = None
+    start_time: datetime
+    duration_minutes: int = Field(60, ge=15, le=12 * 60)
+    notes: Optional[str] = None
+
+    _start_time_utc = field_validator("start_time")(naive_utc)
+
+
+class VisitReschedule(BaseModel):
+    start_time: datetime
+    duration_minutes: int = Field(60, ge=15, le=12 * 60)
+
+    _start_time_utc = field_validator("start_time")(naive_utc)
+
+
+class VisitBatchSchedule(BaseModel):
+    request_ids: List[str] = Field(..., min_length=1, max_length=MAX_BULK_REQUESTS)
+    technicians: List[str] = Field(..., min_length=1, max_length=200)
+    week_start: date
+    duration_minutes: int = Field(60, ge=15, le=12 * 60)
+    day_start_hour: int = Field(8, ge=0, le=23)
+    day_end_hour: int = Field(18, ge=1, le=24)
+
+
+class VisitResponse(BaseModel):
+    id: str
+    request_id: str
+    provider_id: str
+    technician_name: Optional[str] = None
+    status: str
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+    confirmed_by_resident: bool = False
+    notes: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class VisitBatchResult(BaseModel):
+    scheduled: List[VisitResponse]
+    unscheduled: List[str]
+
+
+class FreeSlotResponse(BaseModel):
+    technician_name: Optional[str] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+
+
+def _require_provider(user: User):
+    if user.role != UserRole.provider:
+        raise HTTPException(status_code=403, detail="هذه العملية متاحة لمزودي الخدمة فقط")
+
+
+async def _get_visit(db: AsyncSession, visit_id: str) -> Visit:
+    result = await db.execute(select(Visit).where(Visit.id == visit_id))
+    visit = result.scalar_one_or_none()
+    if not visit:
+        raise HTTPException(status_code=404, detail="الزيارة غير موجودة")
+    return visit
+
+
+# ---- Visit Endpoints ----
+@router.post("/visits", response_model=VisitResponse, status_code=status.HTTP_201_CREATED)
+async def propose_visit(
+    data: VisitPropose,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    _require_provider(current_user)
+    return await scheduling_service.propose_visit(
+        db, current_user.user_id, data.request_id, data.technician_name,
+        data.start_time, timedelta(minutes=data.duration_minutes), data.notes,
+    )
+
+
+@router.get("/visits/free-slot", response_model=FreeSlotResponse)
+async def find_free_slot(
+    technician_name: Optional[str] = None,
+    after: Optional[datetime] = None,
+    duration_minutes: int = Query(60, ge=15, le=12 * 60),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    _require_provider(current_user)
+    duration = timedelta(minutes=duration_minutes)
+    index = await scheduling_service.scheduler.index_for(db, current_user.user_id, technician_name)
+    now = datetime.utcnow()
+    start = scheduling_service.next_free_slot(index, max(naive_utc(after) or now, now), duration)
+    return FreeSlotResponse(
+        technician_name=technician_name,
+        start_time=start,
+        end_time=start + duration if start else None,
+    )
+
+
+@router.post("/visits/schedule-batch", response_model=VisitBatchResult, status_code=status.HTTP_201_CREATED)
+async def schedule_visits_batch(
+    data: VisitBatchSchedule,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    _require_provider(current_user)
+    if data.day_start_hour >= data.day_end_hour:
+        raise HTTPException(status_code=400, detail="ساعات العمل غير صالحة")
+    visits, unscheduled = await scheduling_service.schedule_batch(
+        db, current_user.user_id, data.request_ids, data.technicians, data.week_start,
+        timedelta(minutes=data.duration_minutes), data.day_start_hour, data.day_end_hour,
+    )
+    return VisitBatchResult(scheduled=visits, unscheduled=unscheduled)
+
+
+@router.get("/visits", response_model=List[VisitResponse])
+async def list_visits(
+    request_id: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    query = select(Visit)
+    if request_id:
+        query = query.where(Visit.request_id == request_id)
+    else:
+        query = query.where(
+            Visit.provider_id == current_user.user_id,
+            Visit.status.in_(scheduling_service.ACTIVE_VISIT_STATUSES),
+        )
+    result = await db.execute(query.order_by(Visit.start_time))
+    return result.scalars().all()
+
+
+@router.put("/visits/{visit_id}/reschedule", response_model=VisitResponse)
+async def reschedule_visit(
+    visit_id: str,
+    data: VisitReschedule,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    visit = await _get_visit(db, visit_id)
+    if visit.provider_id != current_user.user_id:
+        raise HTTPException(status_code=403, detail="لا يمكنك تعديل هذه الزيارة")
+    if visit.status not in scheduling_service.ACTIVE_VISIT_STATUSES:
+        raise HTTPException(status_code=400, detail="لا يمكن إعادة جدولة هذه الزيارة")
+    return await scheduling_service.reschedule_visit(
+        db, visit, data.start_time, timedelta(minutes=data.duration_minutes)
+    )
+
+
+@router.post("/visits/{visit_id}/confirm", response_model=VisitResponse)
+async def confirm_visit(
+    visit_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    visit = await _get_visit(db, visit_id)
+    result = await db.execute(
+        select(MaintenanceRequest.user_id).where(MaintenanceRequest.request_id == visit.request_id)
+    )
+    if result.scalar_one_or_none() != current_user.user_id:
+        raise HTTPException(status_code=403, detail="لا يمكنك تأكيد هذه الزيارة")
+    if visit.status != "scheduled":
+        raise HTTPException(status_code=400, detail="لا يمكن تأكيد هذه الزيارة")
+    visit.status = "confirmed"
+    visit.confirmed_by_resident = True
+    await db.commit()
+    return visit
+
+
+@router.post("/visits/{visit_id}/cancel", response_model=VisitResponse)
+async def cancel_visit(
+    visit_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    visit = await _get_visit(db, visit_id)
+    if visit.provider_id != current_user.user_id:
+        raise HTTPException(status_code=403, detail="لا يمكنك تعديل هذه الزيارة")
+    if visit.status not in scheduling_service.ACTIVE_VISIT_STATUSES:
+        raise HTTPException(status_code=400, detail="لا يمكن إلغاء هذه الزيارة")
+    return await scheduling_service.cancel_visit(db, visit)
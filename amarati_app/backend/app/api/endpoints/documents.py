@@ -1,11 +1,35 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError, field_validator
+from sqlalchemy import and_, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 import uuid
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.models.building import Building
+from app.models.document import Document
+from app.models.user import User
+from app.schemas.datetimes import naive_utc
+from app.services.auth_service import get_current_user
+from app.services.document_service import (
+    get_document as _get_document,
+    current_version,
+    version_history,
+    create_document,
+    add_version,
+    delete_document as _delete_document,
+)
+from app.services.blob_service import receive_upload, acquire_blob, blob_response
+from app.services.blob_store import get_blob_store
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = 200
+
 # ---- Schemas ----
 class DocumentCreate(BaseModel):
     title: str
@@ -13,75 +37,326 @@ class DocumentCreate(BaseModel):
     file_url: str
     unit_id: Optional[str] = None
     building_id: Optional[str] = None
-    expires_at: Optional[str] = None
+    expires_at: Optional[datetime] = None
     visibility_role: str = "all"  # all, owner, tenant, supervisor
 
+    _expires_at_utc = field_validator("expires_at")(naive_utc)
+
 class ChatMessageCreate(BaseModel):
     building_id: str
     sender_id: str
     message: str
     message_type: str = "text"
 
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def document_to_dict(document: Document) -> dict:
+    return {
+        "id": document.document_id,
+        "title": document.title,
+        "category": document.doc_type,
+        "file_url": document.file_path,
+        "unit_id": document.unit_id,
+        "building_id": document.building_id,
+        "expires_at": _isoformat(document.expires_at),
+        "is_expired": bool(document.expires_at and document.expires_at <= datetime.utcnow()),
+        "visibility_role": document.visibility_role,
+        "version": document.version,
+        "version_group_id": document.version_group_id,
+        "parent_document_id": document.parent_document_id,
+        "is_current": document.is_current,
+        "file_name": document.file_name,
+        "content_type": document.content_type,
+        "size_bytes": document.size_bytes,
+        "sha256": document.blob_sha256,
+        "download_url": (
+            f"{settings.API_V1_STR}/documents/{document.document_id}/download" if document.blob_sha256 else None
+        ),
+        "created_at": _isoformat(document.upload_date),
+    }
+
+
+def _new_document(doc: DocumentCreate, uploaded_by: User) -> Document:
+    return Document(
+        document_id=str(uuid.uuid4()),
+        user_id=uploaded_by.user_id,
+        title=doc.title,
+        doc_type=doc.category,
+        file_path=doc.file_url,
+        unit_id=doc.unit_id,
+        building_id=doc.building_id,
+        expires_at=doc.expires_at,
+        visibility_role=doc.visibility_role,
+        upload_date=datetime.utcnow(),
+    )
+
+
 # ---- Mock Data ----
-_documents: dict = {}
 _chat_messages: List[dict] = []
 
+async def _receive_document(request: Request, db: AsyncSession, uploaded_by: User) -> Document:
+    """
+    Streams a multipart upload (a `file` part plus the DocumentCreate fields
+    other than file_url) into the blob store and returns the unsaved
+    Document pointing at the blob. The blob reference is pending in `db`.
+    """
+    store = get_blob_store()
+    upload = await receive_upload(request, store, settings.DOCUMENT_MAX_UPLOAD_BYTES)
+    writer = upload.writer
+    try:
+        doc = DocumentCreate(**{**upload.fields, "file_url": ""})
+    except ValidationError as exc:
+        store.discard(writer)
+        raise RequestValidationError(exc.errors())
+    try:
+        await _require_can_file_in(db, uploaded_by, doc.building_id)
+    except HTTPException:
+        store.discard(writer)
+        raise
+    sha256 = await acquire_blob(db, store, writer)
+    document = _new_document(doc, uploaded_by)
+    document.file_path = store.key(sha256)
+    document.blob_sha256 = sha256
+    document.file_name = upload.file_name
+    document.content_type = upload.content_type
+    document.size_bytes = writer.size
+    return document
+
+
+def _owned_buildings(current_user: User):
+    return select(Building.id).where(Building.owner_id == current_user.user_id)
+
+
+def _visible_to(current_user: User):
+    """
+    The SQL form of _require_can_view: the caller's uploads, documents of
+    buildings they own, and those of their own building shown to their role.
+    """
+    visible = [Document.user_id == current_user.user_id, Document.building_id.in_(_owned_buildings(current_user))]
+    if current_user.building_id:
+        visible.append(and_(
+            Document.building_id == current_user.building_id,
+            Document.visibility_role.in_(("all", current_user.role.value)),
+        ))
+    return or_(*visible)
+
+
+async def _require_can_file_in(db: AsyncSession, current_user: User, building_id: Optional[str]):
+    """Documents can be filed under the caller's own building or one they own."""
+    if not building_id or building_id == current_user.building_id:
+        return
+    owned = await db.execute(_owned_buildings(current_user).where(Building.id == building_id))
+    if owned.scalar_one_or_none() is None:
+        raise HTTPException(status_code=403, detail="لا يمكنك إضافة مستندات إلى هذا المبنى")
+
+
+async def _building_owner_id(db: AsyncSession, document: Document) -> Optional[str]:
+    if not document.building_id:
+        return None
+    result = await db.execute(select(Building.owner_id).where(Building.id == document.building_id))
+    return result.scalar_one_or_none()
+
+
+async def _require_owner_or_uploader(db: AsyncSession, current_user: User, document: Document):
+    if document.user_id == current_user.user_id:
+        return
+    if await _building_owner_id(db, document) == current_user.user_id:
+        return
+    raise HTTPException(status_code=403, detail="هذه العملية متاحة لمالك المبنى أو لمن رفع المستند فقط")
+
+
+async def _require_can_view(db: AsyncSession, current_user: User, document: Document):
+    """
+    The uploader and the building owner always; other members of the
+    document's building when visibility_role is "all" or their role.
+    """
+    if document.user_id == current_user.user_id:
+        return
+    owner_id = await _building_owner_id(db, document)
+    if owner_id == current_user.user_id:
+        return
+    if owner_id is None or current_user.building_id != document.building_id:
+        raise HTTPException(status_code=403, detail="لا يمكنك الوصول إلى هذا المستند")
+    if document.visibility_role not in ("all", current_user.role.value):
+        raise HTTPException(status_code=403, detail="هذا المستند غير متاح لدورك")
+
+
 # ---- Document Endpoints ----
 @router.post("/", response_model=dict)
-async def upload_document(doc: DocumentCreate):
-    did = str(uuid.uuid4())
-    _documents[did] = {
-        "id": did,
-        "title": doc.title,
-        "category": doc.category,
-        "file_url": doc.file_url,
-        "unit_id": doc.unit_id,
-        "building_id": doc.building_id,
-        "expires_at": doc.expires_at,
-        "is_expired": False,
-        "visibility_role": doc.visibility_role,
-        "version": 1,
-        "created_at": datetime.utcnow().isoformat(),
-    }
-    return _documents[did]
+async def upload_document(
+    doc: DocumentCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    await _require_can_file_in(db, current_user, doc.building_id)
+    return document_to_dict(await create_document(db, _new_document(doc, current_user)))
+
+@router.post("/upload", response_model=dict)
+async def upload_document_file(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    multipart/form-data with a `file` part and title, category, unit_id,
+    building_id, expires_at, visibility_role fields. Identical files are
+    stored once.
+    """
+    return document_to_dict(await create_document(db, await _receive_document(request, db, current_user)))
 
 @router.get("/", response_model=List[dict])
-async def list_documents(building_id: Optional[str] = None, category: Optional[str] = None):
-    docs = list(_documents.values())
+async def list_documents(
+    response: Response,
+    building_id: Optional[str] = None,
+    category: Optional[str] = None,
+    unit_id: Optional[str] = None,
+    all_versions: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Current versions (or every version with all_versions=true) visible to
+    the caller, newest first, keyset-paginated on (upload_date, id); the
+    next page's cursor is in X-Next-Cursor.
+    """
+    query = select(Document).where(_visible_to(current_user))
+    if not all_versions:
+        query = query.where(Document.is_current.is_(True))
     if building_id:
-        docs = [d for d in docs if d["building_id"] == building_id]
+        query = query.where(Document.building_id == building_id)
     if category:
-        docs = [d for d in docs if d["category"] == category]
-    return docs
+        query = query.where(Document.doc_type == category)
+    if unit_id:
+        query = query.where(Document.unit_id == unit_id)
+    if cursor:
+        after_uploaded, after_id = decode_cursor(cursor, 2)
+        try:
+            after_uploaded = datetime.fromisoformat(after_uploaded)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(tuple_(Document.upload_date, Document.document_id) < tuple_(after_uploaded, after_id))
+    query = query.order_by(Document.upload_date.desc(), Document.document_id.desc()).limit(limit + 1)
+
+    documents = list((await db.execute(query)).scalars().all())
+    if len(documents) > limit:
+        documents = documents[:limit]
+        last = documents[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.upload_date.isoformat(), last.document_id)
+    return [document_to_dict(d) for d in documents]
 
 @router.get("/{document_id}", response_model=dict)
-async def get_document(document_id: str):
-    if document_id not in _documents:
-        raise HTTPException(status_code=404, detail="المستند غير موجود")
-    return _documents[document_id]
+async def get_document(
+    document_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    document = await _get_document(db, document_id)
+    await _require_can_view(db, current_user, document)
+    return document_to_dict(document)
+
+@router.get("/{document_id}/latest", response_model=dict)
+async def get_latest_version(
+    document_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    document = await _get_document(db, document_id)
+    await _require_can_view(db, current_user, document)
+    if document.is_current:
+        return document_to_dict(document)
+    latest = await current_version(db, document.version_group_id)
+    if latest is None:
+        return document_to_dict(document)
+    await _require_can_view(db, current_user, latest)
+    return document_to_dict(latest)
+
+@router.get("/{document_id}/versions", response_model=List[dict])
+async def get_version_history(
+    document_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """The versions of the document's group that are visible to the caller, oldest first."""
+    document = await _get_document(db, document_id)
+    await _require_can_view(db, current_user, document)
+    versions = await version_history(db, document.version_group_id, _visible_to(current_user))
+    return [document_to_dict(d) for d in versions]
+
+@router.api_route("/{document_id}/download", methods=["GET", "HEAD"])
+async def download_document(
+    document_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    The uploaded file, for the uploader, the building owner and members of
+    the building the document is visible to. Supports Range (resuming),
+    If-Range, and If-None-Match / If-Modified-Since revalidation against
+    the content hash.
+    """
+    document = await _get_document(db, document_id)
+    await _require_can_view(db, current_user, document)
+    return await blob_response(request, get_blob_store(), document)
 
 @router.put("/{document_id}/new-version", response_model=dict)
-async def upload_new_version(document_id: str, doc: DocumentCreate):
-    if document_id not in _documents:
-        raise HTTPException(status_code=404, detail="المستند غير موجود")
-    old_version = _documents[document_id]["version"]
-    new_id = str(uuid.uuid4())
-    _documents[new_id] = {
-        "id": new_id,
-        "title": doc.title,
-        "category": doc.category,
-        "file_url": doc.file_url,
-        "unit_id": doc.unit_id,
-        "building_id": doc.building_id,
-        "expires_at": doc.expires_at,
-        "is_expired": False,
-        "visibility_role": doc.visibility_role,
-        "version": old_version + 1,
-        "parent_document_id": document_id,
-        "created_at": datetime.utcnow().isoformat(),
-    }
-    return _documents[new_id]
+async def upload_new_version(
+    document_id: str,
+    doc: DocumentCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    document = await _get_document(db, document_id)
+    await _require_owner_or_uploader(db, current_user, document)
+    await _require_can_file_in(db, current_user, doc.building_id)
+    return document_to_dict(await add_version(db, document, _new_document(doc, current_user)))
+
+@router.post("/{document_id}/new-version/upload", response_model=dict)
+async def upload_new_version_file(
+    document_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    # 404 / 403 before reading the body
+    await _require_owner_or_uploader(db, current_user, await _get_document(db, document_id))
+    new = await _receive_document(request, db, current_user)
+    document = await _get_document(db, document_id)  # reloaded: receiving may roll the session back
+    return document_to_dict(await add_version(db, document, new))
+
+@router.delete("/{document_id}", response_model=dict)
+async def delete_document(
+    document_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Deletes the document with all its versions (building owner or uploader only)."""
+    document = await _get_document(db, document_id)
+    await _require_owner_or_uploader(db, current_user, document)
+    return {"deleted_versions": await _delete_document(db, document)}
 
 @router.get("/expiring/soon", response_model=List[dict])
-async def get_expiring_documents():
-    return [d for d in _documents.values() if d.get("expires_at") and not d["is_expired"]]
+async def get_expiring_documents(
+    building_id: Optional[str] = None,
+    days: int = Query(30, ge=1, le=365),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Current versions visible to the caller expiring within `days`, soonest first."""
+    now = datetime.utcnow()
+    query = select(Document).where(
+        _visible_to(current_user),
+        Document.is_current.is_(True),
+        Document.expires_at > now,
+        Document.expires_at <= now + timedelta(days=days),
+    )
+    if building_id:
+        query = query.where(Document.building_id == building_id)
+    result = await db.execute(query.order_by(Document.expires_at, Document.document_id).limit(limit))
+    return [document_to_dict(d) for d in result.scalars().all()]
@@ -1,21 +1,114 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.sql import Select
 from typing import Optional, List
+from datetime import date, datetime, timedelta
 import uuid
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, get_read_db
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
 from app.models.maintenance_request import MaintenanceRequest
-from app.models.user import User
+from app.models.unit import Unit
+from app.models.user import User, UserRole
 from app.schemas.maintenance_schema import (
     MaintenanceRequestCreate,
     MaintenanceRequestResponse,
     MaintenanceStatusUpdate,
+    MaintenanceBulkStatusUpdate,
+    MaintenanceBulkStatusResult,
+    StatusLogResponse,
+    MaintenanceAnalyticsResponse,
 )
+from app.services.analytics_service import record_request_created, get_building_analytics
 from app.services.auth_service import get_current_user
+from app.services.dispatch_service import dispatcher
+from app.services.maintenance_service import apply_status_transition, get_status_timeline
+from app.services.search_service import search_requests
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = 100
+# Counting stops here so the estimate stays cheap on large tables
+TOTAL_ESTIMATE_CAP = 10_000
+TOTAL_ESTIMATE_HEADER = "X-Total-Estimate"
+MAX_ANALYTICS_DAYS = 366
+ANALYTICS_ROLES = (UserRole.owner, UserRole.supervisor, UserRole.admin)
+
+
+# ---- Listing filters / keyset pagination ----
+class MaintenanceListParams:
+    def __init__(
+        self,
+        status_filter: Optional[List[str]] = Query(None, alias="status"),
+        category: Optional[str] = None,
+        unit_number: Optional[str] = None,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    ):
+        self.statuses = status_filter
+        self.category = category
+        self.unit_number = unit_number
+        self.created_from = created_from
+        self.created_to = created_to
+        self.cursor = cursor
+        self.limit = limit
+
+    def apply_filters(self, query: Select) -> Select:
+        if self.statuses:
+            query = query.where(MaintenanceRequest.status.in_(self.statuses))
+        if self.category:
+            query = query.where(MaintenanceRequest.category == self.category)
+        if self.unit_number:
+            query = query.where(MaintenanceRequest.unit_number == self.unit_number)
+        if self.created_from:
+            query = query.where(MaintenanceRequest.created_at >= self.created_from)
+        if self.created_to:
+            query = query.where(MaintenanceRequest.created_at < self.created_to)
+        return query
+
+
+async def _list_page(
+    db: AsyncSession,
+    response: Response,
+    params: MaintenanceListParams,
+    query: Select,
+) -> List[MaintenanceRequest]:
+    """
+    Newest first, keyset-paginated on (created_at, request_id).
+    Sets X-Next-Cursor and a capped X-Total-Estimate on the response.
+    """
+    query = params.apply_filters(query)
+
+    count_query = select(func.count()).select_from(
+        query.with_only_columns(MaintenanceRequest.request_id).limit(TOTAL_ESTIMATE_CAP).subquery()
+    )
+    response.headers[TOTAL_ESTIMATE_HEADER] = str((await db.execute(count_query)).scalar_one())
+
+    if params.cursor:
+        after_created, after_id = decode_cursor(params.cursor, 2)
+        try:
+            after_created = datetime.fromisoformat(after_created)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(
+            tuple_(MaintenanceRequest.created_at, MaintenanceRequest.request_id)
+            < tuple_(after_created, after_id)
+        )
+    query = query.order_by(
+        MaintenanceRequest.created_at.desc(), MaintenanceRequest.request_id.desc()
+    ).limit(params.limit + 1)
+
+    rows = list((await db.execute(query)).scalars().all())
+    if len(rows) > params.limit:
+        rows = rows[:params.limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at.isoformat(), last.request_id)
+    return rows
+
 
 # ---- Create a new maintenance request (tenant) ----
 @router.post("/", response_model=MaintenanceRequestResponse, status_code=status.HTTP_201_CREATED)
@@ -24,18 +117,37 @@ async def create_request(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
+    unit_id = None
+    if data.unit_number and current_user.building_id:
+        result = await db.execute(
+            select(Unit.unit_id).where(
+                Unit.building == current_user.building_id,
+                Unit.unit_number == data.unit_number,
+            )
+        )
+        unit_id = result.scalar_one_or_none()
+
     req = MaintenanceRequest(
         request_id=str(uuid.uuid4()),
         description=data.description,
         category=data.category,
         status="pending",
         unit_number=data.unit_number,
+        unit_id=unit_id,
         contact_name=data.contact_name or current_user.name,
         contact_phone=data.contact_phone or current_user.phone,
         user_id=current_user.user_id,
+        building_id=current_user.building_id,
+        created_at=datetime.utcnow(),
     )
     db.add(req)
+    await record_request_created(db, req)
+    dispatch_changes = None
+    if settings.DISPATCH_ENABLED:
+        dispatch_changes = await dispatcher.dispatch(req)
     await db.commit()
+    if dispatch_changes:
+        await dispatcher.apply_committed_changes(db, dispatch_changes)
     await db.refresh(req)
     return req
 
@@ -43,29 +155,86 @@ async def create_request(
 # ---- List all requests (for provider dashboard) ----
 @router.get("/", response_model=List[MaintenanceRequestResponse])
 async def list_requests(
-    status_filter: Optional[str] = Query(None, alias="status"),
+    response: Response,
+    params: MaintenanceListParams = Depends(),
+    assigned_to_me: bool = False,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
-    query = select(MaintenanceRequest).order_by(MaintenanceRequest.created_at.desc())
-    if status_filter:
-        query = query.where(MaintenanceRequest.status == status_filter)
-    result = await db.execute(query)
-    return result.scalars().all()
+    query = select(MaintenanceRequest)
+    if assigned_to_me:
+        query = query.where(MaintenanceRequest.assigned_provider_id == current_user.user_id)
+    return await _list_page(db, response, params, query)
 
 
 # ---- List current user's requests (for tenant) ----
 @router.get("/my", response_model=List[MaintenanceRequestResponse])
 async def list_my_requests(
+    response: Response,
+    params: MaintenanceListParams = Depends(),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    query = select(MaintenanceRequest).where(MaintenanceRequest.user_id == current_user.user_id)
+    return await _list_page(db, response, params, query)
+
+
+# ---- Full-text search over descriptions and categories ----
+@router.get("/search", response_model=List[MaintenanceRequestResponse])
+async def search_maintenance_requests(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Tenants (and users outside any building) search their own requests; others their building's."""
+    if current_user.role == UserRole.tenant or not current_user.building_id:
+        return await search_requests(db, q, limit, offset, user_id=current_user.user_id)
+    return await search_requests(db, q, limit, offset, building_id=current_user.building_id)
+
+
+# ---- Building dashboard (reads the rollup tables only) ----
+@router.get("/analytics", response_model=MaintenanceAnalyticsResponse)
+async def maintenance_analytics(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    granularity: str = Query("day", pattern="^(day|week)$"),
+    category: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if not current_user.building_id:
+        raise HTTPException(status_code=400, detail="أنت غير منضم لأي مجموعة")
+    if current_user.role not in ANALYTICS_ROLES:
+        raise HTTPException(status_code=403, detail="هذه العملية متاحة لمالك المبنى فقط")
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_from > date_to or (date_to - date_from).days >= MAX_ANALYTICS_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"نطاق التاريخ غير صالح (الحد الأقصى {MAX_ANALYTICS_DAYS} يوماً)",
+        )
+    return await get_building_analytics(
+        db, current_user.building_id, date_from, date_to, granularity, category
+    )
+
+
+# ---- Bulk status update (provider closes out many jobs at once) ----
+@router.post("/status/bulk", response_model=MaintenanceBulkStatusResult)
+async def bulk_update_status(
+    update: MaintenanceBulkStatusUpdate,
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(
-        select(MaintenanceRequest)
-        .where(MaintenanceRequest.user_id == current_user.user_id)
-        .order_by(MaintenanceRequest.created_at.desc())
+    result = await apply_status_transition(
+        db, update.request_ids, update.status, current_user.user_id, update.notes
+    )
+    return MaintenanceBulkStatusResult(
+        updated=[req.request_id for req in result["updated"]],
+        not_found=result["not_found"],
+        invalid=result["invalid"],
     )
-    return result.scalars().all()
 
 
 # ---- Get single request ----
@@ -73,7 +242,7 @@ async def list_my_requests(
 async def get_request(
     request_id: str,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     result = await db.execute(
         select(MaintenanceRequest).where(MaintenanceRequest.request_id == request_id)
@@ -92,22 +261,25 @@ async def update_status(
     current_user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    result = await db.execute(
-        select(MaintenanceRequest).where(MaintenanceRequest.request_id == request_id)
+    result = await apply_status_transition(
+        db, [request_id], update.status, current_user.user_id, update.notes
     )
-    req = result.scalar_one_or_none()
-    if not req:
+    if result["not_found"]:
         raise HTTPException(status_code=404, detail="الطلب غير موجود")
-
-    valid_statuses = ["pending", "accepted", "rejected", "in_progress", "completed"]
-    if update.status not in valid_statuses:
+    if result["invalid"]:
+        current = result["invalid"][0]["status"]
         raise HTTPException(
             status_code=400,
-            detail=f"الحالة غير صالحة. الحالات المسموحة: {', '.join(valid_statuses)}"
+            detail=f"لا يمكن تغيير حالة الطلب من {current} إلى {update.status}"
         )
+    return result["updated"][0]
 
-    req.status = update.status
-    db.add(req)
-    await db.commit()
-    await db.refresh(req)
-    return req
+
+# ---- Status history of a request ----
+@router.get("/{request_id}/timeline", response_model=List[StatusLogResponse])
+async def get_request_timeline(
+    request_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    return await get_status_timeline(db, request_id)
@@ -5,7 +5,7 @@ from pydantic import BaseModel
 from typing import List, Optional, Dict
 from datetime import datetime
 
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db
 from app.models.notification import Notification
 from app.models.user import User
 from app.services.auth_service import get_current_user
@@ -34,7 +34,7 @@ class NotificationPreferencesUpdate(BaseModel):
 @router.get("/", response_model=List[NotificationResponse])
 async def get_my_notifications(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Fetch all notifications for the current user."""
     result = await db.execute(
@@ -96,7 +96,7 @@ async def mark_notification_read(
 @router.get("/preferences", response_model=Dict[str, bool])
 async def get_my_preferences(
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ):
     """Get the current user's notification preferences."""
     prefs = await notification_service.get_user_preferences(db, current_user.user_id)
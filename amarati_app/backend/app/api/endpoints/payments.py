@@ -1,87 +1,363 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, field_validator
+from sqlalchemy import or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
+import csv
+import io
+import json
 import uuid
-from datetime import datetime
+from datetime import date, datetime, timedelta
+
+from app.core.database import get_db, get_read_db, ReadSessionLocal
+from app.core.pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from app.models.building import Building
+from app.models.payment import Payment, PaymentStatus, PaymentType
+from app.models.user import User
+from app.schemas.datetimes import naive_utc
+from app.services.auth_service import get_current_user
+from app.services.payment_service import (
+    PROVIDER_ACCOUNT,
+    BUILDING_ACCOUNT,
+    record_new_payment,
+    transition_payment,
+    get_ledger,
+)
+from app.services.statement_service import DEFAULT_WINDOW_DAYS, reconcile_statement
 
 router = APIRouter()
 
+MAX_PAGE_SIZE = 200
+EXPORT_BATCH_SIZE = 2000
+EXPORT_COLUMNS = (
+    "id", "created_at", "paid_at", "due_date", "amount", "payment_type", "status",
+    "payer_id", "receiver_id", "unit_id", "building_id", "maintenance_request_id", "description",
+)
+
+
 # ---- Schemas ----
 class PaymentCreate(BaseModel):
     amount: float
-    payment_type: str = "rent"  # rent, maintenance, shared_expense, other
+    payment_type: PaymentType = PaymentType.rent
     payer_id: str
     receiver_id: Optional[str] = None
     unit_id: Optional[str] = None
     building_id: Optional[str] = None
     maintenance_request_id: Optional[str] = None
     description: Optional[str] = None
-    due_date: Optional[str] = None
+    due_date: Optional[datetime] = None
+
+    _due_date_utc = field_validator("due_date")(naive_utc)
 
 class ReceiptUpload(BaseModel):
     receipt_url: str
 
-# ---- Mock Data ----
-_payments: dict = {}
 
-# ---- Endpoints ----
-@router.post("/", response_model=dict)
-async def create_payment(payment: PaymentCreate):
-    pid = str(uuid.uuid4())
-    _payments[pid] = {
-        "id": pid,
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def payment_to_dict(payment: Payment) -> dict:
+    return {
+        "id": payment.id,
         "amount": payment.amount,
-        "payment_type": payment.payment_type,
-        "status": "pending",
+        "payment_type": payment.payment_type.value,
+        "status": payment.status.value,
         "payer_id": payment.payer_id,
         "receiver_id": payment.receiver_id,
         "unit_id": payment.unit_id,
         "building_id": payment.building_id,
         "maintenance_request_id": payment.maintenance_request_id,
         "description": payment.description,
-        "receipt_url": None,
-        "due_date": payment.due_date,
-        "paid_at": None,
-        "created_at": datetime.utcnow().isoformat(),
+        "receipt_url": payment.receipt_url,
+        "due_date": _isoformat(payment.due_date),
+        "paid_at": _isoformat(payment.paid_at),
+        "created_at": _isoformat(payment.created_at),
     }
-    return _payments[pid]
+
+
+def _visible_to(current_user: User):
+    """Payments the user pays or receives, or that belong to a building they own."""
+    owned_buildings = select(Building.id).where(Building.owner_id == current_user.user_id)
+    return or_(
+        Payment.payer_id == current_user.user_id,
+        Payment.receiver_id == current_user.user_id,
+        Payment.building_id.in_(owned_buildings),
+    )
+
+
+async def _get_payment(db: AsyncSession, payment_id: str, current_user: User, manage: bool = False) -> Payment:
+    """
+    The payment if the user is a party to it or owns its building; with
+    `manage`, only its receiver or the building owner.
+    """
+    result = await db.execute(select(Payment).where(Payment.id == payment_id))
+    payment = result.scalar_one_or_none()
+    if not payment:
+        raise HTTPException(status_code=404, detail="الدفعة غير موجودة")
+    parties = {payment.receiver_id} if manage else {payment.payer_id, payment.receiver_id}
+    if current_user.user_id in parties:
+        return payment
+    if payment.building_id:
+        result = await db.execute(select(Building.owner_id).where(Building.id == payment.building_id))
+        if result.scalar_one_or_none() == current_user.user_id:
+            return payment
+    raise HTTPException(status_code=403, detail="لا يمكنك الوصول إلى هذه الدفعة")
+
+
+async def _owned_building_id(db: AsyncSession, current_user: User, building_id: Optional[str]) -> str:
+    """`building_id` (default: the user's building) after checking the user owns it."""
+    building_id = building_id or current_user.building_id
+    if not building_id:
+        raise HTTPException(status_code=400, detail="أنت غير منضم لأي مجموعة")
+    result = await db.execute(select(Building.owner_id).where(Building.id == building_id))
+    owner_id = result.scalar_one_or_none()
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail="المجموعة غير موجودة")
+    if owner_id != current_user.user_id:
+        raise HTTPException(status_code=403, detail="هذه العملية متاحة لمالك المبنى فقط")
+    return building_id
+
+
+# ---- Endpoints ----
+@router.post("/", response_model=dict)
+async def create_payment(
+    payment: PaymentCreate,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """Payers record their own payments; building owners record payments due in their building."""
+    building_id = payment.building_id
+    if payment.payer_id != current_user.user_id or (building_id and building_id != current_user.building_id):
+        building_id = await _owned_building_id(db, current_user, building_id)
+    record = Payment(
+        id=str(uuid.uuid4()),
+        amount=payment.amount,
+        payment_type=payment.payment_type,
+        status=PaymentStatus.pending,
+        payer_id=payment.payer_id,
+        receiver_id=payment.receiver_id,
+        unit_id=payment.unit_id,
+        building_id=building_id,
+        maintenance_request_id=payment.maintenance_request_id,
+        description=payment.description,
+        due_date=payment.due_date,
+        created_at=datetime.utcnow(),
+    )
+    await record_new_payment(db, record)
+    await db.commit()
+    return payment_to_dict(record)
 
 @router.get("/", response_model=List[dict])
-async def list_payments(payer_id: Optional[str] = None, status: Optional[str] = None):
-    payments = list(_payments.values())
+async def list_payments(
+    response: Response,
+    payer_id: Optional[str] = None,
+    receiver_id: Optional[str] = None,
+    status: Optional[PaymentStatus] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Payments visible to the user, newest first, keyset-paginated on
+    (created_at, id); the next page's cursor is in X-Next-Cursor.
+    """
+    query = select(Payment).where(_visible_to(current_user))
     if payer_id:
-        payments = [p for p in payments if p["payer_id"] == payer_id]
+        query = query.where(Payment.payer_id == payer_id)
+    if receiver_id:
+        query = query.where(Payment.receiver_id == receiver_id)
+    if status:
+        query = query.where(Payment.status == status)
+    if cursor:
+        after_created, after_id = decode_cursor(cursor, 2)
+        try:
+            after_created = datetime.fromisoformat(after_created)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(tuple_(Payment.created_at, Payment.id) < tuple_(after_created, after_id))
+    query = query.order_by(Payment.created_at.desc(), Payment.id.desc()).limit(limit + 1)
+
+    payments = list((await db.execute(query)).scalars().all())
+    if len(payments) > limit:
+        payments = payments[:limit]
+        last = payments[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at.isoformat(), last.id)
+    return [payment_to_dict(p) for p in payments]
+
+# ---- Streaming export (owner) ----
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (PaymentStatus, PaymentType)):
+        return value.value
+    return value
+
+
+# A cell starting with one of these is run as a formula by spreadsheet apps
+_CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_value(value):
+    """_export_value, with text that would be read as a formula quoted by a leading apostrophe."""
+    value = _export_value(value)
+    if isinstance(value, str) and value.startswith(_CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+async def _export_rows(query, export_format: str):
+    """
+    Streams the export in EXPORT_BATCH_SIZE chunks from a server-side
+    cursor, on its own read session that lives as long as the response
+    body. Memory stays flat however many rows match.
+    """
+    if export_format == "csv":
+        yield "\ufeff" + ",".join(EXPORT_COLUMNS) + "\r\n"  # BOM so Excel reads Arabic text
+    async with ReadSessionLocal() as session:
+        result = await session.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            buffer = io.StringIO()
+            if export_format == "csv":
+                writer = csv.writer(buffer)
+                writer.writerows([_csv_value(v) for v in row] for row in partition)
+            else:
+                for row in partition:
+                    buffer.write(json.dumps(
+                        {name: _export_value(v) for name, v in zip(EXPORT_COLUMNS, row)},
+                        ensure_ascii=False,
+                    ))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+
+
+@router.get("/export")
+async def export_payments(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    building_id: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    payment_type: Optional[PaymentType] = None,
+    status: Optional[PaymentStatus] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    building_id = await _owned_building_id(db, current_user, building_id)
+    query = select(*(getattr(Payment, name) for name in EXPORT_COLUMNS)).where(Payment.building_id == building_id)
+    if date_from:
+        query = query.where(Payment.created_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        query = query.where(Payment.created_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    if payment_type:
+        query = query.where(Payment.payment_type == payment_type)
     if status:
-        payments = [p for p in payments if p["status"] == status]
-    return payments
+        query = query.where(Payment.status == status)
+    query = query.order_by(Payment.created_at, Payment.id)
+
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    filename = f"payments-{building_id}-{datetime.utcnow():%Y%m%d}.{format}"
+    return StreamingResponse(
+        _export_rows(query, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+# ---- Bank statement reconciliation (owner) ----
+@router.post("/reconcile", response_model=dict)
+async def reconcile_bank_statement(
+    file: UploadFile = File(...),
+    building_id: Optional[str] = None,
+    window_days: int = Query(DEFAULT_WINDOW_DAYS, ge=0, le=60),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Marks the building's pending payments completed from a bank statement
+    CSV (date, amount, reference, description). Returns the matches and the
+    statement lines that matched nothing.
+    """
+    building_id = await _owned_building_id(db, current_user, building_id)
+    return await reconcile_statement(db, building_id, file.file, window_days)
 
 @router.get("/{payment_id}", response_model=dict)
-async def get_payment(payment_id: str):
-    if payment_id not in _payments:
-        raise HTTPException(status_code=404, detail="الدفعة غير موجودة")
-    return _payments[payment_id]
+async def get_payment(
+    payment_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    return payment_to_dict(await _get_payment(db, payment_id, current_user))
 
 @router.put("/{payment_id}/pay", response_model=dict)
-async def mark_as_paid(payment_id: str):
-    if payment_id not in _payments:
-        raise HTTPException(status_code=404, detail="الدفعة غير موجودة")
-    _payments[payment_id]["status"] = "completed"
-    _payments[payment_id]["paid_at"] = datetime.utcnow().isoformat()
-    return _payments[payment_id]
+async def mark_as_paid(
+    payment_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    payment = await _get_payment(db, payment_id, current_user)
+    payment = await transition_payment(db, payment, PaymentStatus.completed, paid_at=datetime.utcnow())
+    return payment_to_dict(payment)
+
+@router.put("/{payment_id}/fail", response_model=dict)
+async def mark_as_failed(
+    payment_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    payment = await _get_payment(db, payment_id, current_user, manage=True)
+    payment = await transition_payment(db, payment, PaymentStatus.failed)
+    return payment_to_dict(payment)
+
+@router.put("/{payment_id}/refund", response_model=dict)
+async def refund_payment(
+    payment_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    payment = await _get_payment(db, payment_id, current_user, manage=True)
+    payment = await transition_payment(db, payment, PaymentStatus.refunded)
+    return payment_to_dict(payment)
 
 @router.post("/{payment_id}/receipt", response_model=dict)
-async def upload_receipt(payment_id: str, receipt: ReceiptUpload):
-    if payment_id not in _payments:
-        raise HTTPException(status_code=404, detail="الدفعة غير موجودة")
-    _payments[payment_id]["receipt_url"] = receipt.receipt_url
-    return _payments[payment_id]
+async def upload_receipt(
+    payment_id: str,
+    receipt: ReceiptUpload,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    payment = await _get_payment(db, payment_id, current_user)
+    payment.receipt_url = receipt.receipt_url
+    await db.commit()
+    return payment_to_dict(payment)
 
-@router.get("/summary/provider/{provider_id}", response_model=dict)
-async def provider_payment_summary(provider_id: str):
-    all_payments = [p for p in _payments.values() if p["receiver_id"] == provider_id]
+def _ledger_summary(ledger) -> dict:
+    if ledger is None:
+        return {"total": 0.0, "pending": 0.0, "completed": 0.0, "failed": 0.0, "refunded": 0.0, "count": 0}
     return {
-        "total": sum(p["amount"] for p in all_payments),
-        "pending": sum(p["amount"] for p in all_payments if p["status"] == "pending"),
-        "completed": sum(p["amount"] for p in all_payments if p["status"] == "completed"),
-        "count": len(all_payments),
+        "total": ledger.total_amount,
+        "pending": ledger.pending_amount,
+        "completed": ledger.completed_amount,
+        "failed": ledger.failed_amount,
+        "refunded": ledger.refunded_amount,
+        "count": ledger.payment_count,
     }
+
+@router.get("/summary/provider/{provider_id}", response_model=dict)
+async def provider_payment_summary(
+    provider_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    if provider_id != current_user.user_id:
+        raise HTTPException(status_code=403, detail="لا يمكنك عرض ملخص مدفوعات مزود خدمة آخر")
+    return _ledger_summary(await get_ledger(db, PROVIDER_ACCOUNT, provider_id))
+
+@router.get("/summary/building/{building_id}", response_model=dict)
+async def building_payment_summary(
+    building_id: str,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+):
+    building_id = await _owned_building_id(db, current_user, building_id)
+    return _ledger_summary(await get_ledger(db, BUILDING_ACCOUNT, building_id))
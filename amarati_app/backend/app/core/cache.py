@@ -0,0 +1,158 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+
+from app.core.config import settings
+
+
+class TTLCache:
+    """
+    Mapping whose entries expire after a time-to-live. With max_entries set
+    it is a bounded LRU; with max_entries=None entries only ever leave by
+    expiring (expired ones are swept as the map grows).
+    """
+
+    _MIN_SWEEP_SIZE = 1024
+
+    def __init__(self, max_entries: Optional[int], ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict = OrderedDict()
+        self._sweep_at = self._MIN_SWEEP_SIZE
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        value, expires_at = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl is None else ttl
+        if ttl <= 0:
+            self._data.pop(key, None)
+            return
+        self._data[key] = (value, time.monotonic() + ttl)
+        self._data.move_to_end(key)
+        if self.max_entries is not None:
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+        elif len(self._data) >= self._sweep_at:
+            self._sweep()
+
+    def _sweep(self):
+        # Amortised O(1) per set: the next sweep waits until the map doubles
+        now = time.monotonic()
+        for key in [key for key, (_, expires_at) in self._data.items() if expires_at <= now]:
+            del self._data[key]
+        self._sweep_at = max(self._MIN_SWEEP_SIZE, 2 * len(self._data))
+
+    def delete(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheBackend:
+    """
+    Async key/value store for JSON-serialisable values.
+    Subclass this to share a cache between workers (e.g. Redis or memcached).
+    """
+
+    async def get(self, key: str) -> Any:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def get_many(self, keys: List[str]) -> List[Any]:
+        return [await self.get(key) for key in keys]
+
+    async def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        """Sets the key only if it is absent. Returns whether it was set."""
+        raise NotImplementedError
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Per-process backend; each worker keeps its own copy."""
+
+    def __init__(self, max_entries: Optional[int], ttl_seconds: float):
+        self._cache = TTLCache(max_entries, ttl_seconds)
+
+    async def get(self, key: str) -> Any:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, key: str):
+        self._cache.delete(key)
+
+    async def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        if self._cache.get(key) is not None:
+            return False
+        self._cache.set(key, value, ttl)
+        return True
+
+
+class RedisCacheBackend(CacheBackend):
+    """Shared between workers; values are stored as JSON under `prefix`."""
+
+    def __init__(self, client, prefix: str, ttl_seconds: float):
+        self._client = client
+        self._prefix = prefix
+        self.ttl_seconds = ttl_seconds
+
+    def _ttl_ms(self, ttl: Optional[float]) -> int:
+        return max(1, int((self.ttl_seconds if ttl is None else ttl) * 1000))
+
+    async def get(self, key: str) -> Any:
+        raw = await self._client.get(self._prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    async def get_many(self, keys: List[str]) -> List[Any]:
+        raws = await self._client.mget([self._prefix + key for key in keys])
+        return [None if raw is None else json.loads(raw) for raw in raws]
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        if ttl is not None and ttl <= 0:
+            await self.delete(key)
+            return
+        await self._client.set(self._prefix + key, json.dumps(value), px=self._ttl_ms(ttl))
+
+    async def delete(self, key: str):
+        await self._client.delete(self._prefix + key)
+
+    async def add(self, key: str, value: Any, ttl: Optional[float] = None) -> bool:
+        return bool(await self._client.set(self._prefix + key, json.dumps(value), px=self._ttl_ms(ttl), nx=True))
+
+
+_redis_client = None
+
+
+def create_cache_backend(namespace: str, max_entries: Optional[int], ttl_seconds: float) -> CacheBackend:
+    """
+    A Redis backend when CACHE_REDIS_URL is set (required when running more
+    than one worker), otherwise a per-process one holding `max_entries`
+    (None: unbounded, entries leave only when they expire).
+    """
+    global _redis_client
+    if not settings.CACHE_REDIS_URL:
+        return InMemoryCacheBackend(max_entries, ttl_seconds)
+    if _redis_client is None:
+        import redis.asyncio as redis  # only needed when a shared cache is configured
+
+        _redis_client = redis.from_url(settings.CACHE_REDIS_URL)
+    return RedisCacheBackend(_redis_client, f"amarati:{namespace}:", ttl_seconds)
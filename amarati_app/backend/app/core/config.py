@@ -1,3 +1,4 @@
+from typing import List, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -9,9 +10,82 @@ class Settings(BaseSettings):
     # Database — SQLite
     DATABASE_URL: str = "sqlite+aiosqlite:///./amarati.db"
 
+    # Database engine profile: "dev", "sqlite-prod" or "postgres-prod"
+    #   dev           -> SQL echo on, default pool (local development)
+    #   sqlite-prod   -> WAL journal, synchronous=NORMAL, mmap, busy timeout
+    #   postgres-prod -> asyncpg with a tuned connection pool and statement cache
+    DB_PROFILE: str = "dev"
+
+    # Optional read replica used by get_read_db(). When unset, sqlite-prod
+    # opens a separate read-only pool on DATABASE_URL and other profiles
+    # read from the primary.
+    READ_DATABASE_URL: Optional[str] = None
+
+    # SQLite tuning (sqlite-prod)
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024  # 256 MB
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024  # 64 MB page cache per connection
+
+    # Connection pool tuning (postgres-prod)
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_STATEMENT_CACHE_SIZE: int = 500
+
+    # Per-request SQL instrumentation (Server-Timing header + budget warnings)
+    SQL_INSTRUMENTATION: bool = True
+    SQL_STATEMENT_BUDGET: int = 15
+    SQL_REPEAT_THRESHOLD: int = 5
+
+    # Shared cache (redis://...) for the user cache and token revocations.
+    # Unset, each worker keeps its own, which is only correct with one worker.
+    CACHE_REDIS_URL: Optional[str] = None
+
+    # Authenticated-user cache (0 disables it)
+    USER_CACHE_TTL_SECONDS: int = 60
+    USER_CACHE_MAX_ENTRIES: int = 10000
+
+    # Password hashing pool: "thread" or "process" executor, and how many
+    # bcrypt calls may run at once (callers beyond that wait in line)
+    PASSWORD_HASH_EXECUTOR: str = "thread"
+    PASSWORD_HASH_WORKERS: int = 4
+    # How often the pool's queue depth and throughput are logged (0 disables)
+    PASSWORD_POOL_STATS_INTERVAL_SECONDS: int = 300
+
+    # Provider dispatch: auto-assign new maintenance requests to providers
+    DISPATCH_ENABLED: bool = True
+    DISPATCH_MAX_ACTIVE_JOBS: int = 10
+    DISPATCH_REFRESH_SECONDS: int = 300
+
+    # Visit scheduling: per-provider interval indexes are rebuilt this often,
+    # and working hours and batch weeks are on this time zone's clock
+    VISIT_INDEX_TTL_SECONDS: int = 300
+    VISIT_TIMEZONE: str = "Asia/Riyadh"
+
+    # Monthly billing run: bills fall due on this day of the month, with
+    # reminders this many days before the due date
+    BILLING_DUE_DAY: int = 5
+    BILLING_REMINDER_OFFSETS_DAYS: List[int] = [7, 3, 1]
+
+    # Document uploads: content-addressed blob directory, upload size cap,
+    # and how long an unreferenced blob is kept before GC deletes it
+    BLOB_STORE_ROOT: str = "./storage/blobs"
+    DOCUMENT_MAX_UPLOAD_BYTES: int = 50 * 1024 * 1024  # 50 MB
+    BLOB_GC_GRACE_SECONDS: int = 24 * 60 * 60
+    # Downloads behind nginx: set to "X-Accel-Redirect" (or "X-Sendfile" for
+    # Apache/lighttpd) and the proxy sends the file itself with sendfile(2).
+    # nginx needs an `internal` location at BLOB_OFFLOAD_PREFIX aliased to
+    # BLOB_STORE_ROOT. Unset, the app streams the file (or hands it to the
+    # server through the ASGI pathsend extension where that is supported).
+    BLOB_OFFLOAD_HEADER: Optional[str] = None
+    BLOB_OFFLOAD_PREFIX: str = "/_blobs/"
+
     # Security
     SECRET_KEY: str = "changethis-secret-key-for-amarati-development"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    # Verified tokens kept in memory (by SHA-256 digest) until they expire
+    TOKEN_CACHE_MAX_ENTRIES: int = 50000
 
     model_config = SettingsConfigDict(env_file=".env")
 
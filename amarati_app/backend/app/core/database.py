@@ -1,20 +1,109 @@
+from pathlib import Path
+
+from sqlalchemy import MetaData, event, make_url
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from app.core.config import settings
 
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=True,
-    connect_args={"check_same_thread": False},
-)
+DB_PROFILES = ("dev", "sqlite-prod", "postgres-prod")
+
+
+def _engine_options(profile: str) -> dict:
+    """Keyword arguments for create_async_engine() for the given profile."""
+    if profile == "dev":
+        return {
+            "echo": True,
+            "connect_args": {"check_same_thread": False},
+        }
+    if profile == "sqlite-prod":
+        return {
+            "echo": False,
+            "connect_args": {"check_same_thread": False},
+        }
+    if profile == "postgres-prod":
+        return {
+            "echo": False,
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+            "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+            "pool_pre_ping": True,
+            "connect_args": {
+                # asyncpg prepared statement cache (per connection)
+                "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            },
+        }
+    raise ValueError(f"Unknown DB_PROFILE {profile!r}, expected one of {DB_PROFILES}")
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new SQLite connection for concurrent production use."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.SQLITE_CACHE_SIZE_KB)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _mark_sqlite_read_only(dbapi_connection, connection_record):
+    """Connect hook rejecting writes on SQLite connections handed out by the read engine."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+def create_engine_for_profile(url: str, profile: str, read_only: bool = False):
+    options = _engine_options(profile)
+    if read_only and make_url(url).get_backend_name() == "postgresql":
+        # A server-side default for the whole session: a SET issued from a
+        # connect hook would run inside asyncpg's implicit transaction and be
+        # undone by the pool's reset-on-return rollback
+        connect_args = dict(options.get("connect_args", {}))
+        connect_args["server_settings"] = {"default_transaction_read_only": "on"}
+        options["connect_args"] = connect_args
+    engine = create_async_engine(url, **options)
+    if profile == "sqlite-prod":
+        event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    if read_only and engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", _mark_sqlite_read_only)
+    return engine
+
+
+def _create_read_engine():
+    if settings.READ_DATABASE_URL:
+        return create_engine_for_profile(settings.READ_DATABASE_URL, settings.DB_PROFILE, read_only=True)
+    if settings.DB_PROFILE == "sqlite-prod":
+        # WAL lets readers run alongside the writer, so give them their own pool
+        return create_engine_for_profile(settings.DATABASE_URL, settings.DB_PROFILE, read_only=True)
+    return engine
+
+
+# Primary (read/write) engine
+engine = create_engine_for_profile(settings.DATABASE_URL, settings.DB_PROFILE)
 AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+# Read engine: a replica, a read-only SQLite pool, or the primary itself
+read_engine = _create_read_engine()
+ReadSessionLocal = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+
 
 class Base(DeclarativeBase):
-    pass
+    # PostgreSQL's own default names, so databases created before the
+    # migrations existed already match and constraints can be dropped by name
+    metadata = MetaData(naming_convention={
+        "ix": "ix_%(column_0_label)s",
+        "uq": "%(table_name)s_%(column_0_name)s_key",
+        "fk": "%(table_name)s_%(column_0_name)s_fkey",
+        "pk": "%(table_name)s_pkey",
+    })
 
 
 async def get_db():
+    """Session on the primary. Use for writes and for reads that must see them."""
     async with AsyncSessionLocal() as session:
         try:
             yield session
@@ -22,10 +111,51 @@ async def get_db():
             await session.close()
 
 
-async def create_tables():
+async def get_read_db():
+    """Session on the read engine. Use for read-only handlers; may lag the primary."""
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+def upsert_insert(dialect_name: str, table):
+    """INSERT supporting on_conflict_do_update()/on_conflict_do_nothing() on SQLite and PostgreSQL."""
+    if dialect_name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def import_models():
+    """Imports every model module, so that Base.metadata describes the whole schema."""
+    # New schema models
+    from app.models import user, unit, bill, document, maintenance_request, predictive_maintenance, notification  # noqa
+    # Legacy models (supplementary tables)
+    from app.models import building, payment, maintenance, system  # noqa
+    # Derived tables
+    from app.models import maintenance_search, maintenance_analytics  # noqa
+
+
+def _run_migrations(connection):
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(Path(__file__).resolve().parents[2] / "alembic.ini"))
+    config.attributes["connection"] = connection
+    command.upgrade(config, "head")
+
+
+async def upgrade_schema():
+    """
+    Brings the database up to the latest schema by running the Alembic
+    migrations in migrations/ (the same as `alembic upgrade head`).
+    """
     async with engine.begin() as conn:
-        # New schema models
-        from app.models import user, unit, bill, document, maintenance_request, predictive_maintenance, notification  # noqa
-        # Legacy models (supplementary tables)
-        from app.models import building, payment, maintenance, system  # noqa
-        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_run_migrations)
+
+
+async def dispose_engines():
+    if read_engine is not engine:
+        await read_engine.dispose()
+    await engine.dispose()
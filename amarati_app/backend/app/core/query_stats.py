@@ -0,0 +1,139 @@
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("app.sql")
+
+
+class RequestQueryStats:
+    """SQL statements issued while handling one HTTP request."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float, executemany: bool = False):
+        self.count += 1
+        self.total_time += elapsed
+        if not executemany:
+            # batched executemany() calls are intentional, not an N+1 pattern
+            self.shapes[statement] += 1
+        if elapsed > self.slowest_time:
+            self.slowest_time = elapsed
+            self.slowest_statement = statement
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total_time * 1000:.2f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest_time * 1000:.2f}"
+        )
+
+    def repeated_shapes(self, threshold: int) -> list[tuple[str, int]]:
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+_current_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def start_request_stats():
+    """Begin collecting statements for the current request. Returns (stats, token)."""
+    stats = RequestQueryStats()
+    return stats, _current_stats.set(stats)
+
+
+def stop_request_stats(token):
+    _current_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_stats.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_stats.get()
+    start_times = conn.info.get("query_start_time")
+    if stats is None or not start_times:
+        return
+    stats.record(statement, time.perf_counter() - start_times.pop(), executemany)
+
+
+def instrument_engine(engine):
+    """Attach the per-request statement counters to an AsyncEngine."""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def report_request_stats(route: str, stats: RequestQueryStats, budget: int, repeat_threshold: int):
+    """Log a warning when a route exceeds its statement budget or looks like an N+1."""
+    if stats.count > budget:
+        logger.warning(
+            "%s issued %d SQL statements (budget %d, %.1f ms in DB, slowest %.1f ms: %s)",
+            route, stats.count, budget, stats.total_time * 1000,
+            stats.slowest_time * 1000, (stats.slowest_statement or "")[:200],
+        )
+    for shape, n in stats.repeated_shapes(repeat_threshold):
+        logger.warning(
+            "%s repeated the same SQL statement %d times (possible N+1): %s",
+            route, n, shape[:200],
+        )
+
+
+class QueryStatsMiddleware:
+    """
+    Counts the SQL issued for each HTTP request and reports it once the last
+    body message is sent, so statements run while a StreamingResponse
+    produces its body are included. Server-Timing goes out with the headers
+    and therefore covers the statements issued before the body started.
+    """
+
+    def __init__(self, app: ASGIApp, budget: int, repeat_threshold: int):
+        self.app = app
+        self.budget = budget
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = start_request_stats()
+        reported = False
+
+        def report():
+            nonlocal reported
+            if reported:
+                return
+            reported = True
+            route = scope.get("route")
+            report_request_stats(
+                f"{scope['method']} {getattr(route, 'path', scope['path'])}",
+                stats,
+                budget=self.budget,
+                repeat_threshold=self.repeat_threshold,
+            )
+
+        async def send_with_stats(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                report()
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            report()
+            stop_request_stats(token)
@@ -1,18 +1,28 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.core.database import create_tables
+from app.core.database import upgrade_schema, dispose_engines, engine, read_engine
+from app.core.query_stats import instrument_engine, QueryStatsMiddleware
+from app.services.auth_service import password_pool
 
 from app.api.endpoints import auth, buildings, maintenance, payments, documents, communication, notifications
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: create tables
-    await create_tables()
+    # Startup: apply pending schema migrations
+    await upgrade_schema()
+    pool_stats = None
+    if settings.PASSWORD_POOL_STATS_INTERVAL_SECONDS:
+        pool_stats = asyncio.create_task(password_pool.log_stats(settings.PASSWORD_POOL_STATS_INTERVAL_SECONDS))
     yield
-    # Shutdown: nothing to clean up
+    # Shutdown: release pooled connections and password workers
+    if pool_stats is not None:
+        pool_stats.cancel()
+    await dispose_engines()
+    password_pool.shutdown()
 
 
 app = FastAPI(
@@ -29,8 +39,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Estimate", "Server-Timing"],
 )
 
+# SQL statement count / DB time per request
+if settings.SQL_INSTRUMENTATION:
+    instrument_engine(engine)
+    instrument_engine(read_engine)
+    app.add_middleware(
+        QueryStatsMiddleware,
+        budget=settings.SQL_STATEMENT_BUDGET,
+        repeat_threshold=settings.SQL_REPEAT_THRESHOLD,
+    )
+
 # ---- Routers ----
 app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["Authentication"])
 app.include_router(buildings.router, prefix=f"{settings.API_V1_STR}/buildings", tags=["Buildings & Units"])
@@ -1,13 +1,18 @@
-from sqlalchemy import Column, String, Float, Date, ForeignKey
+from sqlalchemy import Column, String, Float, Date, ForeignKey, UniqueConstraint
 from app.core.database import Base
 
 
 class Bill(Base):
     __tablename__ = "bills"
+    __table_args__ = (
+        # One bill per unit per billing period; lets billing runs be re-run safely
+        UniqueConstraint("unit_id", "period", name="uq_bills_unit_period"),
+    )
 
     bill_id = Column(String(36), primary_key=True)
     amount = Column(Float, nullable=False)
     due_date = Column(Date, nullable=False)
     status = Column(String(50), nullable=False, default="pending")
+    period = Column(String(7), nullable=True)  # YYYY-MM
     user_id = Column(String(36), ForeignKey("users.user_id"), nullable=False)
     unit_id = Column(String(36), ForeignKey("units.unit_id"), nullable=False)
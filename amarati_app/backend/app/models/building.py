@@ -14,6 +14,7 @@ class Building(Base):
     address = Column(Text, nullable=True)
     city = Column(String(100), nullable=True)
     total_units = Column(Integer, default=0)
+    member_count = Column(Integer, default=0, nullable=False)
     owner_id = Column(String(36), ForeignKey("users.user_id"), nullable=False)
     invite_code = Column(String(20), unique=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,10 +1,19 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, BigInteger, Boolean, Index, UniqueConstraint
 from datetime import datetime
 from app.core.database import Base
 
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # Every version of a document shares version_group_id (the first
+        # version's id); exactly one row per group has is_current set
+        UniqueConstraint("version_group_id", "version", name="uq_documents_group_version"),
+        Index("ix_documents_group_current", "version_group_id", "is_current"),
+        # Registry listings: keyset-paginated by (upload_date, document_id)
+        Index("ix_documents_building_current_uploaded", "building_id", "is_current", "upload_date", "document_id"),
+        Index("ix_documents_current_expires", "is_current", "expires_at"),
+    )
 
     document_id = Column(String(36), primary_key=True)
     doc_type = Column(String(100), nullable=False)
@@ -13,3 +22,34 @@ class Document(Base):
     unit_id = Column(String(36), ForeignKey("units.unit_id"), nullable=True)
     user_id = Column(String(36), ForeignKey("users.user_id"), nullable=True)
     bill_id = Column(String(36), ForeignKey("bills.bill_id"), nullable=True)
+    title = Column(String(255), nullable=True)
+    building_id = Column(String(36), ForeignKey("buildings.id"), nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+    visibility_role = Column(String(20), nullable=False, default="all")  # all, owner, tenant, supervisor
+    version = Column(Integer, nullable=False, default=1)
+    version_group_id = Column(String(36), nullable=False)
+    parent_document_id = Column(String(36), ForeignKey("documents.document_id"), nullable=True)
+    is_current = Column(Boolean, nullable=False, default=True)
+    # Uploaded files (app.services.blob_service); file_path is then the blob's store key
+    blob_sha256 = Column(String(64), ForeignKey("document_blobs.sha256"), nullable=True)
+    file_name = Column(String(255), nullable=True)
+    content_type = Column(String(100), nullable=True)
+    size_bytes = Column(BigInteger, nullable=True)
+
+
+class DocumentBlob(Base):
+    """
+    One stored file per distinct content, shared by every document that
+    uploaded the same bytes. ref_count counts those documents; blobs left at
+    0 are collected by app.services.blob_service (-1 marks one being deleted).
+    """
+    __tablename__ = "document_blobs"
+    __table_args__ = (
+        Index("ix_document_blobs_released", "ref_count", "released_at"),
+    )
+
+    sha256 = Column(String(64), primary_key=True)
+    size_bytes = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    released_at = Column(DateTime, nullable=True)  # when ref_count last dropped to 0
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Integer, Text, Float
+from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey, Integer, Text, Float, Index
 from datetime import datetime
 import uuid
 from app.core.database import Base
@@ -19,6 +19,9 @@ class MaintenanceVote(Base):
 
 class StatusLog(Base):
     __tablename__ = "status_logs"
+    __table_args__ = (
+        Index("ix_status_logs_request_created", "request_id", "created_at"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     request_id = Column(String(36), ForeignKey("maintenance_requests.request_id"), nullable=False)
@@ -46,6 +49,10 @@ class ProviderProfile(Base):
 
 class Visit(Base):
     __tablename__ = "visits"
+    __table_args__ = (
+        Index("ix_visits_provider_start", "provider_id", "start_time"),
+        Index("ix_visits_request", "request_id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     request_id = Column(String(36), ForeignKey("maintenance_requests.request_id"), nullable=False)
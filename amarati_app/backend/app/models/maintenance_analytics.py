@@ -0,0 +1,30 @@
+from sqlalchemy import Column, String, Date, Integer, Float, ForeignKey
+from app.core.database import Base
+
+
+class MaintenanceStatusRollup(Base):
+    """
+    Requests per building, creation day, category and *current* status.
+    Moving a request between statuses shifts one count between rows of its
+    creation day (see app.services.analytics_service).
+    """
+    __tablename__ = "maintenance_status_rollups"
+
+    building_id = Column(String(36), ForeignKey("buildings.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    category = Column(String(100), primary_key=True)
+    status = Column(String(50), primary_key=True)
+    request_count = Column(Integer, nullable=False, default=0)
+
+
+class MaintenanceActivityRollup(Base):
+    """Completions and reopenings per building, day they happened and category."""
+    __tablename__ = "maintenance_activity_rollups"
+
+    building_id = Column(String(36), ForeignKey("buildings.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    category = Column(String(100), primary_key=True)
+    completed_count = Column(Integer, nullable=False, default=0)
+    # Sum of (completed at - created at) in hours; mean = total / completed_count
+    completion_hours_total = Column(Float, nullable=False, default=0.0)
+    reopened_count = Column(Integer, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Index
 from datetime import datetime
 import uuid
 from app.core.database import Base
@@ -6,6 +6,16 @@ from app.core.database import Base
 
 class MaintenanceRequest(Base):
     __tablename__ = "maintenance_requests"
+    __table_args__ = (
+        # Listings are ordered by (created_at, request_id) for keyset pagination
+        Index("ix_maintenance_requests_created", "created_at", "request_id"),
+        Index("ix_maintenance_requests_user_created", "user_id", "created_at", "request_id"),
+        Index("ix_maintenance_requests_status_created", "status", "created_at", "request_id"),
+        Index("ix_maintenance_requests_category_created", "category", "created_at", "request_id"),
+        Index("ix_maintenance_requests_unit_created", "unit_number", "created_at", "request_id"),
+        Index("ix_maintenance_requests_building_created", "building_id", "created_at", "request_id"),
+        Index("ix_maintenance_requests_provider_created", "assigned_provider_id", "created_at", "request_id"),
+    )
 
     request_id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     description = Column(Text, nullable=False)
@@ -17,3 +27,7 @@ class MaintenanceRequest(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     unit_id = Column(String(36), ForeignKey("units.unit_id"), nullable=True)
     user_id = Column(String(36), ForeignKey("users.user_id"), nullable=False)
+    building_id = Column(String(36), ForeignKey("buildings.id"), nullable=True)
+    # Set by the dispatch engine (app.services.dispatch_service)
+    assigned_provider_id = Column(String(36), ForeignKey("users.user_id"), nullable=True)
+    assigned_at = Column(DateTime, nullable=True)
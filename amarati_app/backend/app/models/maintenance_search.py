@@ -0,0 +1,50 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, event
+from app.core.database import Base
+
+
+class MaintenanceSearchDocument(Base):
+    """Normalized search text per maintenance request (see app.services.search_service)."""
+    __tablename__ = "maintenance_search_documents"
+
+    # FTS5's content_rowid: an INTEGER PRIMARY KEY is an alias of the rowid,
+    # whereas the implicit rowid of a table keyed otherwise may be renumbered
+    # by VACUUM, silently detaching the index from its rows
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    request_id = Column(String(36), ForeignKey("maintenance_requests.request_id"), nullable=False, unique=True)
+    content = Column(Text, nullable=False)
+
+
+# SQLite: FTS5 index over the documents table, kept in sync by triggers
+_SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS maintenance_search_fts USING fts5(
+        content, content='maintenance_search_documents', content_rowid='id'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS maintenance_search_ai AFTER INSERT ON maintenance_search_documents BEGIN
+        INSERT INTO maintenance_search_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS maintenance_search_ad AFTER DELETE ON maintenance_search_documents BEGIN
+        INSERT INTO maintenance_search_fts(maintenance_search_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS maintenance_search_au AFTER UPDATE ON maintenance_search_documents BEGIN
+        INSERT INTO maintenance_search_fts(maintenance_search_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO maintenance_search_fts(rowid, content) VALUES (new.id, new.content);
+    END""",
+]
+
+# PostgreSQL: GIN index on the tsvector of the documents table
+_POSTGRES_DDL = [
+    """CREATE INDEX IF NOT EXISTS ix_maintenance_search_documents_tsv
+        ON maintenance_search_documents USING gin (to_tsvector('simple', content))""",
+]
+
+
+def create_search_index(connection):
+    """Creates the full-text index for the connection's dialect (a no-op if it exists)."""
+    statements = {"sqlite": _SQLITE_DDL, "postgresql": _POSTGRES_DDL}.get(connection.dialect.name, [])
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_search_index(target, connection, **kw):
+    create_search_index(connection)
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Boolean
+from sqlalchemy import Column, String, Text, DateTime, ForeignKey, Boolean, Index
 from datetime import datetime
 from app.core.database import Base
 
 
 class Notification(Base):
     __tablename__ = "notifications"
+    __table_args__ = (
+        Index("ix_notifications_user_date", "user_id", "date"),
+    )
 
     notification_id = Column(String(36), primary_key=True)
     title = Column(String(255), nullable=False)
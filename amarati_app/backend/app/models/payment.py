@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Float, Text, Enum, Boolean
+from sqlalchemy import Column, String, DateTime, ForeignKey, Float, Integer, Text, Enum, Boolean, Index, UniqueConstraint
 from datetime import datetime
 import uuid
 import enum
@@ -23,6 +23,15 @@ class PaymentType(str, enum.Enum):
 
 class Payment(Base):
     __tablename__ = "payments"
+    __table_args__ = (
+        # Listings are ordered by (created_at, id) for keyset pagination
+        Index("ix_payments_created", "created_at", "id"),
+        Index("ix_payments_payer_created", "payer_id", "created_at", "id"),
+        Index("ix_payments_building_created", "building_id", "created_at", "id"),
+        # Covers the provider summary (SUM(amount) ... GROUP BY status)
+        Index("ix_payments_receiver_status", "receiver_id", "status", "amount"),
+        Index("ix_payments_status_due", "status", "due_date"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     amount = Column(Float, nullable=False)
@@ -40,13 +49,39 @@ class Payment(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class PaymentLedger(Base):
+    """
+    Running payment totals per account (a provider as receiver, or a
+    building), kept in step with every payment status change by
+    app.services.payment_service.
+    """
+    __tablename__ = "payment_ledgers"
+
+    account_type = Column(String(20), primary_key=True)  # provider, building
+    account_id = Column(String(36), primary_key=True)
+    payment_count = Column(Integer, nullable=False, default=0)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    pending_amount = Column(Float, nullable=False, default=0.0)
+    completed_amount = Column(Float, nullable=False, default=0.0)
+    failed_amount = Column(Float, nullable=False, default=0.0)
+    refunded_amount = Column(Float, nullable=False, default=0.0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
 class BillingReminder(Base):
     __tablename__ = "billing_reminders"
+    __table_args__ = (
+        UniqueConstraint("bill_id", "remind_at", name="uq_billing_reminders_bill_time"),
+        # Due reminders are picked up by (is_sent, remind_at)
+        Index("ix_billing_reminders_due", "is_sent", "remind_at"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    payment_id = Column(String(36), ForeignKey("payments.id"), nullable=False)
+    payment_id = Column(String(36), ForeignKey("payments.id"), nullable=True)
+    bill_id = Column(String(36), ForeignKey("bills.bill_id"), nullable=True)
     user_id = Column(String(36), ForeignKey("users.user_id"), nullable=False)
     message = Column(Text, nullable=True)
+    remind_at = Column(DateTime, nullable=True)
     is_sent = Column(Boolean, default=False)
     sent_at = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Date, Text, ForeignKey
+from sqlalchemy import Column, String, Date, Float, Text, ForeignKey
 from app.core.database import Base
 
 
@@ -9,5 +9,7 @@ class PredictiveMaintenance(Base):
     last_inspection = Column(Date, nullable=True)
     next_inspection = Column(Date, nullable=True)
     risk_level = Column(String(50), nullable=True)
+    # 0..1, written by app.services.risk_service
+    risk_score = Column(Float, nullable=True)
     notes = Column(Text, nullable=True)
-    unit_id = Column(String(36), ForeignKey("units.unit_id"), nullable=False)
+    unit_id = Column(String(36), ForeignKey("units.unit_id"), unique=True, nullable=False)
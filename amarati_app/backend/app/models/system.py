@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Enum, Boolean, Integer
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Enum, Boolean, Integer, Index
 from datetime import datetime
 import uuid
 import enum
@@ -18,6 +18,9 @@ class DocumentCategory(str, enum.Enum):
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    __table_args__ = (
+        Index("ix_chat_messages_building_created", "building_id", "created_at"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     building_id = Column(String(36), ForeignKey("buildings.id"), nullable=False)
@@ -1,11 +1,16 @@
-from sqlalchemy import Column, String, Integer, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, UniqueConstraint
 from app.core.database import Base
 
 
 class Unit(Base):
     __tablename__ = "units"
+    __table_args__ = (
+        UniqueConstraint("building", "unit_number", name="uq_units_building_unit_number"),
+    )
 
     unit_id = Column(String(36), primary_key=True)
     building = Column(String(255), nullable=False)
     floor = Column(Integer, nullable=False)
+    unit_number = Column(String(50), nullable=True)
     user_id = Column(String(36), ForeignKey("users.user_id"), nullable=True)
+    monthly_rent = Column(Float, nullable=True)
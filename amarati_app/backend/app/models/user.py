@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, Enum, ForeignKey, JSON
+import enum
+from sqlalchemy import Column, String, Enum, ForeignKey, JSON, Index
 from app.core.database import Base
 
 
@@ -12,6 +13,10 @@ class UserRole(str, enum.Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Member directory: filter by building, keyset-paginate by (name, user_id)
+        Index("ix_users_building_name", "building_id", "name", "user_id"),
+    )
 
     user_id = Column(String(36), primary_key=True)
     name = Column(String(255), nullable=False)
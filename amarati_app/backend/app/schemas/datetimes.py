@@ -0,0 +1,12 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Timestamps are stored as naive UTC (DateTime columns without a time
+    zone); convert offset-aware input. Use as a pydantic field_validator.
+    """
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
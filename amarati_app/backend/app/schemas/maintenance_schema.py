@@ -1,6 +1,8 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List
+from datetime import date, datetime
+
+from app.services.maintenance_service import MAX_BULK_REQUESTS
 
 
 class MaintenanceRequestCreate(BaseModel):
@@ -20,6 +22,7 @@ class MaintenanceRequestResponse(BaseModel):
     contact_name: str | None = None
     contact_phone: str | None = None
     user_id: str
+    assigned_provider_id: str | None = None
     created_at: datetime | None = None
 
     model_config = ConfigDict(from_attributes=True)
@@ -28,3 +31,55 @@ class MaintenanceRequestResponse(BaseModel):
 class MaintenanceStatusUpdate(BaseModel):
     status: str  # accepted, rejected, in_progress, completed
     notes: Optional[str] = None
+
+
+class MaintenanceBulkStatusUpdate(BaseModel):
+    request_ids: List[str] = Field(..., min_length=1, max_length=MAX_BULK_REQUESTS)
+    status: str
+    notes: Optional[str] = None
+
+
+class InvalidStatusTransition(BaseModel):
+    request_id: str
+    status: str
+
+
+class MaintenanceBulkStatusResult(BaseModel):
+    updated: List[str]
+    not_found: List[str]
+    invalid: List[InvalidStatusTransition]
+
+
+class StatusLogResponse(BaseModel):
+    old_status: str | None = None
+    new_status: str
+    changed_by: str
+    notes: str | None = None
+    created_at: datetime | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class MaintenanceStatusCount(BaseModel):
+    period: date
+    category: str
+    status: str
+    count: int
+
+
+class MaintenanceCompletionStats(BaseModel):
+    period: date
+    category: str
+    completed: int
+    mean_completion_hours: float | None = None
+    reopened: int
+    reopen_rate: float | None = None
+
+
+class MaintenanceAnalyticsResponse(BaseModel):
+    building_id: str
+    date_from: date
+    date_to: date
+    granularity: str
+    by_status: List[MaintenanceStatusCount]
+    completion: List[MaintenanceCompletionStats]
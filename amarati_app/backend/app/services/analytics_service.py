@@ -0,0 +1,248 @@
+import asyncio
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select, update, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import upsert_insert
+from app.models.building import Building
+from app.models.maintenance import StatusLog
+from app.models.maintenance_analytics import MaintenanceStatusRollup, MaintenanceActivityRollup
+from app.models.maintenance_request import MaintenanceRequest
+from app.models.user import User
+
+BACKFILL_BUILDING_BATCH = 200
+
+_STATUS_KEY = ("building_id", "day", "category", "status")
+_ACTIVITY_KEY = ("building_id", "day", "category")
+_ACTIVITY_COUNTERS = ("completed_count", "completion_hours_total", "reopened_count")
+
+
+def _as_date(value) -> date:
+    # SQLite's date() returns text, PostgreSQL's a date
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _hours_between(dialect_name: str, end, start):
+    if dialect_name == "postgresql":
+        return func.extract("epoch", end - start) / 3600
+    return (func.julianday(end) - func.julianday(start)) * 24
+
+
+async def _add_to_rollup(db: AsyncSession, model, key: tuple, counters: tuple, rows: List[dict]):
+    """Adds each row's counters to the stored row with the same key (inserting it if missing)."""
+    if not rows:
+        return
+    stmt = upsert_insert(db.bind.dialect.name, model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(key),
+        set_={name: getattr(model, name) + getattr(stmt.excluded, name) for name in counters},
+    )
+    await db.execute(stmt, rows)
+
+
+# ---- Incremental maintenance (inside the caller's transaction) ----
+async def record_request_created(db: AsyncSession, req: MaintenanceRequest):
+    if not req.building_id:
+        return
+    await _add_to_rollup(db, MaintenanceStatusRollup, _STATUS_KEY, ("request_count",), [{
+        "building_id": req.building_id,
+        "day": req.created_at.date(),
+        "category": req.category,
+        "status": req.status,
+        "request_count": 1,
+    }])
+
+
+async def record_status_changes(
+    db: AsyncSession,
+    requests: List[MaintenanceRequest],
+    old_statuses: Dict[str, str],
+    new_status: str,
+    changed_at: datetime,
+):
+    status_deltas: Dict[tuple, int] = defaultdict(int)
+    activity: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0.0, 0])
+    for req in requests:
+        if not req.building_id or req.created_at is None:
+            continue
+        old_status = old_statuses[req.request_id]
+        created_day = req.created_at.date()
+        status_deltas[(req.building_id, created_day, req.category, old_status)] -= 1
+        status_deltas[(req.building_id, created_day, req.category, new_status)] += 1
+
+        counters = activity[(req.building_id, changed_at.date(), req.category)]
+        if new_status == "completed":
+            counters[0] += 1
+            counters[1] += (changed_at - req.created_at).total_seconds() / 3600
+        elif old_status == "completed":
+            counters[2] += 1
+
+    await _add_to_rollup(db, MaintenanceStatusRollup, _STATUS_KEY, ("request_count",), [
+        {**dict(zip(_STATUS_KEY, key)), "request_count": delta}
+        for key, delta in status_deltas.items()
+        if delta
+    ])
+    await _add_to_rollup(db, MaintenanceActivityRollup, _ACTIVITY_KEY, _ACTIVITY_COUNTERS, [
+        {**dict(zip(_ACTIVITY_KEY, key)), **dict(zip(_ACTIVITY_COUNTERS, counters))}
+        for key, counters in activity.items()
+        if counters[0] or counters[2]
+    ])
+
+
+# ---- Backfill ----
+async def rebuild_rollups(db: AsyncSession, batch_size: int = BACKFILL_BUILDING_BATCH) -> int:
+    """
+    Recomputes both rollup tables from maintenance_requests and status_logs,
+    a batch of buildings at a time: each batch's rows are deleted and
+    recomputed (one GROUP BY per table) in one transaction, so readers see
+    either the old or the new figures for a building, never none. Requests
+    created before building_id was recorded inherit their creator's
+    building first. Returns the number of buildings.
+    """
+    await db.execute(
+        update(MaintenanceRequest)
+        .where(MaintenanceRequest.building_id.is_(None))
+        .values(
+            building_id=select(User.building_id)
+            .where(User.user_id == MaintenanceRequest.user_id)
+            .scalar_subquery()
+        )
+    )
+    hours = _hours_between(db.bind.dialect.name, StatusLog.created_at, MaintenanceRequest.created_at)
+    done = 0
+    last_id = ""
+    while True:
+        result = await db.execute(
+            select(Building.id).where(Building.id > last_id).order_by(Building.id).limit(batch_size)
+        )
+        building_ids = result.scalars().all()
+        if not building_ids:
+            break
+
+        await db.execute(delete(MaintenanceStatusRollup).where(MaintenanceStatusRollup.building_id.in_(building_ids)))
+        await db.execute(
+            delete(MaintenanceActivityRollup).where(MaintenanceActivityRollup.building_id.in_(building_ids))
+        )
+        created_day = func.date(MaintenanceRequest.created_at)
+        result = await db.execute(
+            select(
+                MaintenanceRequest.building_id, created_day, MaintenanceRequest.category,
+                MaintenanceRequest.status, func.count(),
+            )
+            .where(MaintenanceRequest.building_id.in_(building_ids))
+            .group_by(MaintenanceRequest.building_id, created_day, MaintenanceRequest.category, MaintenanceRequest.status)
+        )
+        await _add_to_rollup(db, MaintenanceStatusRollup, _STATUS_KEY, ("request_count",), [
+            {"building_id": b, "day": _as_date(d), "category": c, "status": s, "request_count": n}
+            for b, d, c, s, n in result.all()
+        ])
+
+        log_day = func.date(StatusLog.created_at)
+        is_completion = StatusLog.new_status == "completed"
+        is_reopen = StatusLog.old_status == "completed"
+        result = await db.execute(
+            select(
+                MaintenanceRequest.building_id, log_day, MaintenanceRequest.category,
+                func.count().filter(is_completion),
+                func.coalesce(func.sum(hours).filter(is_completion), 0.0),
+                func.count().filter(is_reopen),
+            )
+            .join(MaintenanceRequest, MaintenanceRequest.request_id == StatusLog.request_id)
+            .where(MaintenanceRequest.building_id.in_(building_ids), is_completion | is_reopen)
+            .group_by(MaintenanceRequest.building_id, log_day, MaintenanceRequest.category)
+        )
+        await _add_to_rollup(db, MaintenanceActivityRollup, _ACTIVITY_KEY, _ACTIVITY_COUNTERS, [
+            {
+                "building_id": b, "day": _as_date(d), "category": c,
+                "completed_count": completed, "completion_hours_total": total_hours, "reopened_count": reopened,
+            }
+            for b, d, c, completed, total_hours, reopened in result.all()
+        ])
+        await db.commit()
+        done += len(building_ids)
+        last_id = building_ids[-1]
+
+    # Rollups of buildings deleted since they were recorded
+    for model in (MaintenanceStatusRollup, MaintenanceActivityRollup):
+        await db.execute(delete(model).where(model.building_id.not_in(select(Building.id))))
+    await db.commit()
+    return done
+
+
+# ---- Dashboard ----
+def _period_start(day: date, granularity: str) -> date:
+    return day - timedelta(days=day.weekday()) if granularity == "week" else day
+
+
+async def get_building_analytics(
+    db: AsyncSession,
+    building_id: str,
+    date_from: date,
+    date_to: date,
+    granularity: str = "day",
+    category: Optional[str] = None,
+) -> dict:
+    """Reads only the rollup tables, so the cost depends on the date range, not on history."""
+    status_query = select(MaintenanceStatusRollup).where(
+        MaintenanceStatusRollup.building_id == building_id,
+        MaintenanceStatusRollup.day >= date_from,
+        MaintenanceStatusRollup.day <= date_to,
+    )
+    activity_query = select(MaintenanceActivityRollup).where(
+        MaintenanceActivityRollup.building_id == building_id,
+        MaintenanceActivityRollup.day >= date_from,
+        MaintenanceActivityRollup.day <= date_to,
+    )
+    if category:
+        status_query = status_query.where(MaintenanceStatusRollup.category == category)
+        activity_query = activity_query.where(MaintenanceActivityRollup.category == category)
+
+    by_status: Dict[tuple, int] = defaultdict(int)
+    for row in (await db.execute(status_query)).scalars():
+        if row.request_count:
+            by_status[(_period_start(row.day, granularity), row.category, row.status)] += row.request_count
+
+    activity: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0.0, 0])
+    for row in (await db.execute(activity_query)).scalars():
+        counters = activity[(_period_start(row.day, granularity), row.category)]
+        counters[0] += row.completed_count
+        counters[1] += row.completion_hours_total
+        counters[2] += row.reopened_count
+
+    return {
+        "building_id": building_id,
+        "date_from": date_from,
+        "date_to": date_to,
+        "granularity": granularity,
+        "by_status": [
+            {"period": period, "category": cat, "status": status, "count": count}
+            for (period, cat, status), count in sorted(by_status.items())
+        ],
+        "completion": [
+            {
+                "period": period,
+                "category": cat,
+                "completed": completed,
+                "mean_completion_hours": round(total_hours / completed, 2) if completed else None,
+                "reopened": reopened,
+                "reopen_rate": round(reopened / completed, 3) if completed else None,
+            }
+            for (period, cat), (completed, total_hours, reopened) in sorted(activity.items())
+        ],
+    }
+
+
+async def _main():
+    from app.core.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        buildings = await rebuild_rollups(db)
+    print(f"Rebuilt maintenance rollups for {buildings} building(s)")
+
+
+if __name__ == "__main__":
+    # python -m app.services.analytics_service
+    asyncio.run(_main())
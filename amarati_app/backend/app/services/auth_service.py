@@ -1,4 +1,6 @@
 from datetime import datetime, timedelta, timezone
+import hashlib
+import time
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,13 +9,27 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import uuid
 
+from app.core.cache import CacheBackend, TTLCache, create_cache_backend
 from app.core.config import settings
 from app.core.database import get_db
 from app.models.user import User
+from app.services.password_pool import PasswordWorkerPool
+from app.services.user_cache import load_user
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
+password_pool = PasswordWorkerPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_EXECUTOR)
+
+# Verified claims, keyed by token digest, until the token's exp. Losing an
+# entry only costs a signature check, so this stays a per-worker LRU.
+_verified_tokens = TTLCache(settings.TOKEN_CACHE_MAX_ENTRIES, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+# Revoked token digests: shared between workers (CACHE_REDIS_URL) and never
+# evicted, since a dropped entry would make the token valid again. Each
+# entry expires with its token.
+_revoked_tokens: CacheBackend = create_cache_backend(
+    "revoked-tokens", max_entries=None, ttl_seconds=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
 
 
 def hash_password(password: str) -> str:
@@ -24,6 +40,14 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
 
+async def hash_password_async(password: str) -> str:
+    return await password_pool.run(hash_password, password)
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await password_pool.run(verify_password, plain, hashed)
+
+
 def create_access_token(user_id: str, role: str) -> str:
     expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     payload = {
@@ -34,6 +58,47 @@ def create_access_token(user_id: str, role: str) -> str:
     return jwt.encode(payload, settings.SECRET_KEY, algorithm="HS256")
 
 
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+async def decode_access_token(token: str) -> dict:
+    """
+    Verifies the token and returns its claims.
+    Signature checks only run the first time a token is seen.
+    """
+    digest = _token_digest(token)
+    if await _revoked_tokens.get(digest):
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    claims = _verified_tokens.get(digest)
+    if claims is None:
+        try:
+            claims = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+        except JWTError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        # Tokens without an expiry could never be revoked for good
+        if not isinstance(claims.get("exp"), (int, float)):
+            raise HTTPException(status_code=401, detail="Invalid token")
+        _verified_tokens.set(digest, claims, ttl=claims["exp"] - time.time())
+    elif claims["exp"] <= time.time():
+        _verified_tokens.delete(digest)
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return claims
+
+
+async def revoke_token(token: str):
+    """Rejects the token, in every worker, from now until it would have expired anyway."""
+    digest = _token_digest(token)
+    _verified_tokens.delete(digest)
+    try:
+        exp = jwt.get_unverified_claims(token).get("exp")
+    except JWTError:
+        return
+    if isinstance(exp, (int, float)):
+        await _revoked_tokens.set(digest, True, ttl=exp - time.time())
+
+
 async def register_user(
     name: str,
     phone: str,
@@ -65,7 +130,7 @@ async def register_user(
         name=name,
         phone=phone,
         email=email,
-        password=hash_password(password),
+        password=await hash_password_async(password),
         role=role,
     )
     db.add(user)
@@ -77,7 +142,7 @@ async def register_user(
 async def authenticate_user(phone: str, password: str, db: AsyncSession) -> User:
     result = await db.execute(select(User).where(User.phone == phone))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(password, user.password):
+    if not user or not await verify_password_async(password, user.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="رقم الجوال أو كلمة المرور غير صحيحة",
@@ -89,17 +154,12 @@ async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: AsyncSession = Depends(get_db),
 ) -> User:
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError:
+    payload = await decode_access_token(credentials.credentials)
+    user_id: str = payload.get("sub")
+    if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    result = await db.execute(select(User).where(User.user_id == user_id))
-    user = result.scalar_one_or_none()
+    user = await load_user(db, user_id)
     if user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return user
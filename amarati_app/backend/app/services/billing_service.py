@@ -0,0 +1,154 @@
+import argparse
+import asyncio
+import calendar
+import re
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import upsert_insert
+from app.models.bill import Bill
+from app.models.payment import BillingReminder
+from app.models.unit import Unit
+
+BILLING_BATCH_SIZE = 1000
+
+# Fixed namespace so a (unit, period) always maps to the same bill id across runs
+_BILLING_NAMESPACE = uuid.UUID("5f3c1a9e-7d1b-4c62-9a57-2b8e0f4d6c31")
+_PERIOD = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+
+def parse_period(period: str) -> date:
+    if not _PERIOD.match(period or ""):
+        raise ValueError("الفترة يجب أن تكون بالصيغة YYYY-MM")
+    year, month = map(int, period.split("-"))
+    return date(year, month, 1)
+
+
+def due_date_for(period_start: date) -> date:
+    last_day = calendar.monthrange(period_start.year, period_start.month)[1]
+    return period_start.replace(day=min(settings.BILLING_DUE_DAY, last_day))
+
+
+def bill_id_for(unit_id: str, period: str) -> str:
+    return str(uuid.uuid5(_BILLING_NAMESPACE, f"bill:{unit_id}:{period}"))
+
+
+async def run_billing(
+    db: AsyncSession,
+    period: str,
+    building_id: Optional[str] = None,
+    default_amount: Optional[float] = None,
+    batch_size: int = BILLING_BATCH_SIZE,
+) -> Dict[str, int]:
+    """
+    Generates `period`'s (YYYY-MM) bills for every occupied unit, in unit_id
+    order, one multi-row INSERT of bills and one of reminders per batch and
+    a commit per batch. Units already billed for the period are skipped by
+    the batch query (and by the unique constraints, should two runs
+    overlap), so an interrupted run can simply be started again. Units
+    without a monthly_rent use `default_amount`, or are skipped when it
+    isn't given. Reminders whose time has already passed are not created.
+    Raises ValueError for a malformed period.
+    """
+    period_start = parse_period(period)
+    due_date = due_date_for(period_start)
+    now = datetime.utcnow()
+    reminder_times = [
+        datetime.combine(due_date - timedelta(days=offset), datetime.min.time())
+        for offset in settings.BILLING_REMINDER_OFFSETS_DAYS
+    ]
+    reminder_times = [remind_at for remind_at in reminder_times if remind_at >= now]
+
+    # Core inserts on the tables, so rowcount reports the rows actually added
+    dialect = db.bind.dialect.name
+    bill_stmt = upsert_insert(dialect, Bill.__table__).on_conflict_do_nothing(
+        index_elements=["unit_id", "period"]
+    )
+    reminder_stmt = upsert_insert(dialect, BillingReminder.__table__).on_conflict_do_nothing(
+        index_elements=["bill_id", "remind_at"]
+    )
+
+    stats = {"units": 0, "bills": 0, "reminders": 0, "skipped": 0}
+    last_id = ""
+    while True:
+        query = (
+            select(Unit.unit_id, Unit.user_id, Unit.monthly_rent, Bill.bill_id)
+            .outerjoin(Bill, (Bill.unit_id == Unit.unit_id) & (Bill.period == period))
+            .where(Unit.user_id.is_not(None), Unit.unit_id > last_id)
+            .order_by(Unit.unit_id)
+            .limit(batch_size)
+        )
+        if building_id:
+            query = query.where(Unit.building == building_id)
+        units = (await db.execute(query)).all()
+        if not units:
+            break
+        stats["units"] += len(units)
+        last_id = units[-1].unit_id
+
+        bills: List[dict] = []
+        reminders: List[dict] = []
+        for unit_id, user_id, monthly_rent, existing_bill_id in units:
+            if existing_bill_id is not None:
+                continue
+            amount = monthly_rent if monthly_rent is not None else default_amount
+            if amount is None:
+                stats["skipped"] += 1
+                continue
+            bill_id = bill_id_for(unit_id, period)
+            bills.append({
+                "bill_id": bill_id,
+                "amount": amount,
+                "due_date": due_date,
+                "status": "pending",
+                "period": period,
+                "user_id": user_id,
+                "unit_id": unit_id,
+            })
+            for remind_at in reminder_times:
+                reminders.append({
+                    "id": str(uuid.uuid4()),
+                    "bill_id": bill_id,
+                    "user_id": user_id,
+                    "message": f"تذكير: فاتورة شهر {period} بمبلغ {amount:g} مستحقة بتاريخ {due_date.isoformat()}",
+                    "remind_at": remind_at,
+                    "is_sent": False,
+                    "created_at": now,
+                })
+
+        if bills:
+            result = await db.execute(bill_stmt, bills)
+            stats["bills"] += max(result.rowcount, 0)
+        if reminders:
+            result = await db.execute(reminder_stmt, reminders)
+            stats["reminders"] += max(result.rowcount, 0)
+        await db.commit()
+    return stats
+
+
+async def _main():
+    from app.core.database import AsyncSessionLocal
+
+    parser = argparse.ArgumentParser(description="Generate a month's bills for occupied units")
+    parser.add_argument("period", help="YYYY-MM")
+    parser.add_argument("--building", help="only this building id")
+    parser.add_argument("--amount", type=float, help="amount for units without a monthly_rent")
+    args = parser.parse_args()
+    try:
+        parse_period(args.period)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    async with AsyncSessionLocal() as db:
+        stats = await run_billing(db, args.period, args.building, args.amount)
+    print(", ".join(f"{key}={value}" for key, value in stats.items()))
+
+
+if __name__ == "__main__":
+    # python -m app.services.billing_service 2026-11 [--building ID] [--amount 1500]
+    asyncio.run(_main())
@@ -0,0 +1,328 @@
+import asyncio
+import calendar
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy import select, update, delete, bindparam, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ModuleNotFoundError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+from app.core.config import settings
+from app.core.database import upsert_insert
+from app.models.document import Document, DocumentBlob
+from app.services.blob_store import BlobStore, BlobWriter
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_FORM_FIELDS = 20
+MAX_FORM_FIELD_BYTES = 16 * 1024
+GC_BATCH_SIZE = 500
+_ACQUIRE_ATTEMPTS = 20  # waiting out a GC pass that is deleting the same blob
+
+
+class StreamedUpload:
+    """A multipart upload: its text fields and the one file, already in the blob store's temp area."""
+
+    def __init__(self):
+        self.fields: Dict[str, str] = {}
+        self.writer: Optional[BlobWriter] = None
+        self.file_name: Optional[str] = None
+        self.content_type: Optional[str] = None
+
+
+async def receive_upload(request: Request, store: BlobStore, max_bytes: int) -> StreamedUpload:
+    """
+    Parses a multipart/form-data body as it streams in. The file part goes
+    straight to a blob writer (hashed on the way) in a worker thread, one
+    network chunk at a time, so memory use doesn't depend on the file size.
+    The caller commits or discards upload.writer.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="يجب رفع الملف بصيغة multipart/form-data")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + 64 * 1024:
+        raise HTTPException(status_code=413, detail="حجم الملف أكبر من الحد المسموح")
+
+    upload = StreamedUpload()
+    part: dict = {}
+    pending: List[bytes] = []  # file bytes parsed from the current network chunk
+
+    def on_part_begin():
+        part.clear()
+        part.update(headers={}, header_name=b"", header_value=b"", data=bytearray(), is_file=False)
+
+    def on_header_field(data, start, end):
+        part["header_name"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        part["header_value"] += data[start:end]
+
+    def on_header_end():
+        part["headers"][part["header_name"].lower()] = part["header_value"]
+        part["header_name"], part["header_value"] = b"", b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(part["headers"].get(b"content-disposition", b""))
+        part["name"] = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" in options:
+            if upload.writer is not None:
+                raise HTTPException(status_code=400, detail="يمكن رفع ملف واحد فقط في كل طلب")
+            part["is_file"] = True
+            upload.file_name = options[b"filename"].decode("utf-8", "replace")[:255]
+            upload.content_type = part["headers"].get(b"content-type", b"application/octet-stream").decode("latin-1")[:100]
+            upload.writer = store.open_writer()
+        elif len(upload.fields) >= MAX_FORM_FIELDS:
+            raise HTTPException(status_code=400, detail="عدد الحقول كبير جداً")
+
+    def on_part_data(data, start, end):
+        if part["is_file"]:
+            pending.append(data[start:end])
+            if upload.writer.size + sum(map(len, pending)) > max_bytes:
+                raise HTTPException(status_code=413, detail="حجم الملف أكبر من الحد المسموح")
+        else:
+            part["data"] += data[start:end]
+            if len(part["data"]) > MAX_FORM_FIELD_BYTES:
+                raise HTTPException(status_code=400, detail="قيمة الحقل طويلة جداً")
+
+    def on_part_end():
+        if not part["is_file"]:
+            upload.fields[part["name"]] = part["data"].decode("utf-8", "replace")
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+    })
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            if pending:
+                data = b"".join(pending)
+                pending.clear()
+                await asyncio.to_thread(upload.writer.write, data)
+        parser.finalize()
+    except BaseException as exc:
+        if upload.writer is not None:
+            store.discard(upload.writer)
+        if isinstance(exc, HTTPException):
+            raise
+        if isinstance(exc, Exception):
+            raise HTTPException(status_code=400, detail="بيانات الرفع غير صالحة") from exc
+        raise
+    if upload.writer is None:
+        raise HTTPException(status_code=400, detail="لم يتم إرفاق ملف")
+    return upload
+
+
+async def acquire_blob(db: AsyncSession, store: BlobStore, writer: BlobWriter) -> str:
+    """
+    Counts a new reference to the uploaded content and files it in the
+    store (or drops the upload when the same bytes are already stored).
+    The blob's row is committed first, unreferenced, so a file placed in
+    the store always has a row that garbage collection will find. The
+    reference itself is added in the caller's transaction, which must not
+    have other pending changes (this commits and may roll back): the caller
+    then adds the referencing document and commits, or rolls back and the
+    reference goes with it. Returns the blob's SHA-256.
+    """
+    sha256 = writer.sha256
+    now = datetime.utcnow()
+    register = upsert_insert(db.bind.dialect.name, DocumentBlob.__table__).values(
+        sha256=sha256, size_bytes=writer.size, ref_count=0, created_at=now, released_at=now
+    ).on_conflict_do_nothing(index_elements=["sha256"])
+    reference = (
+        update(DocumentBlob.__table__)
+        .where(DocumentBlob.sha256 == sha256, DocumentBlob.ref_count >= 0)  # -1: garbage collection is deleting it
+        .values(ref_count=DocumentBlob.ref_count + 1, released_at=None)
+    )
+    for _ in range(_ACQUIRE_ATTEMPTS):
+        await db.execute(register)
+        await db.commit()
+        result = await db.execute(reference)
+        if result.rowcount == 1:
+            break
+        await db.rollback()
+        await asyncio.sleep(0.05)
+    else:
+        store.discard(writer)
+        raise HTTPException(status_code=503, detail="الملف قيد الحذف، أعد المحاولة")
+
+    # Our reference is written (and locks the row until commit), so GC can't
+    # claim the blob between here and the caller's commit; after a rollback
+    # the row is back at ref_count 0 and GC removes the file
+    try:
+        await asyncio.to_thread(store.commit, writer)
+    except Exception:
+        store.discard(writer)
+        await db.rollback()
+        raise
+    return sha256
+
+
+async def release_blobs(db: AsyncSession, counts: Dict[str, int]):
+    """Drops `counts[sha]` references from each blob, in the caller's transaction."""
+    if not counts:
+        return
+    remaining = DocumentBlob.ref_count - bindparam("b_count")
+    await db.execute(
+        update(DocumentBlob.__table__)
+        .where(DocumentBlob.sha256 == bindparam("b_sha"))
+        .values(
+            ref_count=remaining,
+            released_at=case((remaining <= 0, bindparam("b_now")), else_=DocumentBlob.released_at),
+        ),
+        [{"b_sha": sha, "b_count": count, "b_now": datetime.utcnow()} for sha, count in counts.items()],
+    )
+
+
+async def collect_garbage(
+    db: AsyncSession,
+    store: BlobStore,
+    grace_seconds: int = settings.BLOB_GC_GRACE_SECONDS,
+    batch_size: int = GC_BATCH_SIZE,
+) -> Dict[str, int]:
+    """
+    Deletes blobs that have had no references for `grace_seconds`. Each
+    batch is claimed first (ref_count 0 -> -1, so uploads of the same bytes
+    wait instead of re-referencing it), then the files and the rows go.
+    Stale partial uploads in the store's temp area are removed too.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    stats = {"blobs": 0, "bytes": 0, "stale_uploads": 0}
+    while True:
+        result = await db.execute(
+            select(DocumentBlob.sha256)
+            .where(DocumentBlob.ref_count == 0, DocumentBlob.released_at < cutoff)
+            .limit(batch_size)
+        )
+        candidates = result.scalars().all()
+        if not candidates:
+            break
+        result = await db.execute(
+            update(DocumentBlob.__table__)
+            .where(DocumentBlob.sha256.in_(candidates), DocumentBlob.ref_count == 0)
+            .values(ref_count=-1)
+            .returning(DocumentBlob.sha256, DocumentBlob.size_bytes)
+        )
+        claimed = result.all()
+        await db.commit()
+
+        for sha256, size in claimed:
+            await asyncio.to_thread(store.delete, sha256)
+            stats["bytes"] += size
+        await db.execute(
+            delete(DocumentBlob.__table__).where(
+                DocumentBlob.sha256.in_([sha256 for sha256, _ in claimed]), DocumentBlob.ref_count == -1
+            )
+        )
+        await db.commit()
+        stats["blobs"] += len(claimed)
+
+    stats["stale_uploads"] = await asyncio.to_thread(store.remove_stale_uploads, grace_seconds)
+    return stats
+
+
+class BlobFileResponse(FileResponse):
+    # Starlette's 64 KB default costs a worker-thread hop and a send per
+    # chunk; large reads keep a streamed download near disk speed
+    chunk_size = DOWNLOAD_CHUNK_SIZE
+
+
+def _http_date(value: datetime) -> str:
+    return formatdate(calendar.timegm(value.utctimetuple()), usegmt=True)
+
+
+def _content_disposition(file_name: str) -> str:
+    quoted = quote(file_name)
+    if quoted != file_name:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{file_name}"'
+
+
+def _not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """If-None-Match (weak comparison, RFC 9110) wins over If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is not None:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+async def blob_response(request: Request, store: BlobStore, document: Document) -> Response:
+    """
+    Serves an uploaded document's file. A blob's bytes never change, so its
+    SHA-256 is a strong ETag and the upload time its Last-Modified; a
+    matching conditional request gets a 304 without touching the file.
+    Range / If-Range requests get 206 responses from FileResponse. With
+    BLOB_OFFLOAD_HEADER set, the proxy sends the file instead.
+    """
+    if not document.blob_sha256:
+        raise HTTPException(status_code=404, detail="لا يوجد ملف مرفوع لهذا المستند")
+    etag = f'"{document.blob_sha256}"'
+    last_modified = document.upload_date
+    headers = {"ETag": etag, "Last-Modified": _http_date(last_modified), "Cache-Control": "private, no-cache"}
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = _content_disposition(document.file_name or document.blob_sha256)
+    media_type = document.content_type or "application/octet-stream"
+    offload = settings.BLOB_OFFLOAD_HEADER
+    if offload:
+        if offload.lower() == "x-sendfile":
+            target = store.path(document.blob_sha256)
+            if target is None:
+                raise HTTPException(status_code=404, detail="ملف المستند غير موجود")
+            headers[offload] = str(target.resolve())
+        else:
+            headers[offload] = settings.BLOB_OFFLOAD_PREFIX + store.key(document.blob_sha256)
+        return Response(headers=headers, media_type=media_type)
+
+    def locate():
+        path = store.path(document.blob_sha256)
+        return (path, os.stat(path)) if path is not None else (None, None)
+
+    try:
+        path, stat_result = await asyncio.to_thread(locate)
+    except FileNotFoundError:  # collected between the two lookups
+        path = None
+    if path is None:
+        raise HTTPException(status_code=404, detail="ملف المستند غير موجود")
+    return BlobFileResponse(path, headers=headers, media_type=media_type, stat_result=stat_result)
+
+
+async def _main():
+    from app.core.database import AsyncSessionLocal
+    from app.services.blob_store import get_blob_store
+
+    grace = int(sys.argv[1]) if len(sys.argv) > 1 else settings.BLOB_GC_GRACE_SECONDS
+    async with AsyncSessionLocal() as db:
+        stats = await collect_garbage(db, get_blob_store(), grace)
+    print(", ".join(f"{key}={value}" for key, value in stats.items()))
+
+
+if __name__ == "__main__":
+    # python -m app.services.blob_service [grace_seconds]
+    asyncio.run(_main())
@@ -0,0 +1,121 @@
+import hashlib
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+
+
+class BlobWriter:
+    """
+    An upload in progress: bytes go to a temporary file and into a running
+    SHA-256 as they arrive. The backend files it under the digest on commit.
+    """
+
+    def __init__(self, temp_path: Path):
+        self.temp_path = temp_path
+        self.size = 0
+        self._hash = hashlib.sha256()
+        self._file = open(temp_path, "wb")
+
+    def write(self, data: bytes):
+        self._hash.update(data)
+        self._file.write(data)
+        self.size += len(data)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+
+class BlobStore:
+    """Content-addressed storage backend: blobs are named by their SHA-256."""
+
+    def open_writer(self) -> BlobWriter:
+        raise NotImplementedError
+
+    def commit(self, writer: BlobWriter) -> bool:
+        """Files a finished upload under its digest. Returns False if the blob was already stored."""
+        raise NotImplementedError
+
+    def discard(self, writer: BlobWriter):
+        raise NotImplementedError
+
+    def key(self, sha256: str) -> str:
+        """The blob's name relative to the store root (Document.file_path of uploads)."""
+        return f"{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+    def path(self, sha256: str) -> Optional[Path]:
+        """Local path of a stored blob, or None if it isn't there."""
+        raise NotImplementedError
+
+    def delete(self, sha256: str):
+        raise NotImplementedError
+
+    def remove_stale_uploads(self, max_age_seconds: int) -> int:
+        """Deletes temp files of uploads abandoned more than `max_age_seconds` ago."""
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    """Blobs as files under root/ab/cd/<sha256>; uploads land in root/tmp first."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.tmp = self.root / "tmp"
+        self.tmp.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, sha256: str) -> Path:
+        return self.root / self.key(sha256)
+
+    def open_writer(self) -> BlobWriter:
+        return BlobWriter(self.tmp / f"{uuid.uuid4().hex}.part")
+
+    def commit(self, writer: BlobWriter) -> bool:
+        writer.close()
+        target = self._path(writer.sha256)
+        if target.exists():
+            writer.temp_path.unlink(missing_ok=True)
+            return False
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(writer.temp_path, target)  # atomic: readers never see a partial blob
+        return True
+
+    def discard(self, writer: BlobWriter):
+        writer.close()
+        writer.temp_path.unlink(missing_ok=True)
+
+    def path(self, sha256: str) -> Optional[Path]:
+        target = self._path(sha256)
+        return target if target.is_file() else None
+
+    def delete(self, sha256: str):
+        self._path(sha256).unlink(missing_ok=True)
+
+    def remove_stale_uploads(self, max_age_seconds: int) -> int:
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for temp_path in self.tmp.glob("*.part"):
+            try:
+                if temp_path.stat().st_mtime < cutoff:
+                    temp_path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    global _store
+    if _store is None:
+        _store = LocalBlobStore(settings.BLOB_STORE_ROOT)
+    return _store
@@ -0,0 +1,43 @@
+import asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func
+
+from app.models.building import Building
+from app.models.user import User
+
+
+async def recompute_member_counts(db: AsyncSession) -> int:
+    """
+    Repairs Building.member_count from the users table with a single GROUP BY.
+    Returns the number of buildings whose count was corrected.
+    """
+    result = await db.execute(
+        select(User.building_id, func.count())
+        .where(User.building_id.is_not(None))
+        .group_by(User.building_id)
+    )
+    actual = dict(result.all())
+
+    result = await db.execute(select(Building.id, Building.member_count))
+    fixes = [
+        {"id": building_id, "member_count": actual.get(building_id, 0)}
+        for building_id, member_count in result.all()
+        if member_count != actual.get(building_id, 0)
+    ]
+    if fixes:
+        await db.execute(update(Building), fixes)
+    await db.commit()
+    return len(fixes)
+
+
+async def _main():
+    from app.core.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        fixed = await recompute_member_counts(db)
+    print(f"Corrected member_count on {fixed} building(s)")
+
+
+if __name__ == "__main__":
+    # python -m app.services.building_service
+    asyncio.run(_main())
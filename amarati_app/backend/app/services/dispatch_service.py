@@ -0,0 +1,403 @@
+import heapq
+import re
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.maintenance import ProviderProfile, StatusLog
+from app.models.maintenance_request import MaintenanceRequest
+from app.services.search_service import search_tokens
+
+# Requests in these statuses count towards a provider's current load
+ACTIVE_STATUSES = ("pending", "accepted", "in_progress")
+
+# Scoring weights: rating (0-5) helps, slow response and current load hurt
+RATING_WEIGHT = 1.0
+RESPONSE_WEIGHT = 0.5
+LOAD_WEIGHT = 0.75
+VERIFIED_BONUS = 0.1
+RESPONSE_CAP_HOURS = 72.0
+DEFAULT_RESPONSE_HOURS = 24.0
+
+# Heap key for providers without a specialization; used when nobody matches
+GENERAL = ""
+_SPECIALIZATION_SEPARATORS = re.compile(r"[,،/;|]")
+
+
+def specialization_key(value: Optional[str]) -> str:
+    """"الكهرباء" and "كهرباء" (or "سباكة" and "السباكه") share a key."""
+    return " ".join(search_tokens(value or ""))
+
+
+class ProviderState:
+    __slots__ = ("user_id", "rating", "avg_response_hours", "is_verified", "specializations", "active_jobs", "version")
+
+    def __init__(self, profile: ProviderProfile, active_jobs: int):
+        self.user_id = profile.user_id
+        self.rating = profile.rating or 0.0
+        self.avg_response_hours = profile.avg_response_time_hours
+        self.is_verified = bool(profile.is_verified)
+        keys = {specialization_key(s) for s in _SPECIALIZATION_SEPARATORS.split(profile.specialization or "")}
+        self.specializations = {k for k in keys if k} or {GENERAL}
+        self.active_jobs = active_jobs
+        self.version = 0
+
+    def score(self) -> float:
+        response = self.avg_response_hours if self.avg_response_hours is not None else DEFAULT_RESPONSE_HOURS
+        return (
+            RATING_WEIGHT * self.rating / 5
+            - RESPONSE_WEIGHT * min(response, RESPONSE_CAP_HOURS) / RESPONSE_CAP_HOURS
+            - LOAD_WEIGHT * self.active_jobs / settings.DISPATCH_MAX_ACTIVE_JOBS
+            + (VERIFIED_BONUS if self.is_verified else 0.0)
+        )
+
+    @property
+    def available(self) -> bool:
+        return self.active_jobs < settings.DISPATCH_MAX_ACTIVE_JOBS
+
+
+class PendingDispatch:
+    """
+    Dispatch changes made inside a transaction. The engine's in-memory state
+    only takes them once the caller has committed (apply_committed_changes);
+    after a rollback they are simply dropped.
+    """
+    __slots__ = ("loads", "waiting", "requeue")
+
+    def __init__(self):
+        self.loads: Dict[str, int] = defaultdict(int)  # provider_id -> load delta
+        self.waiting: List[Tuple[str, datetime, str]] = []  # (key, created_at, request_id)
+        self.requeue: List[str] = []  # requests declined by their provider, to dispatch again
+
+    def __bool__(self) -> bool:
+        return bool(self.loads or self.waiting or self.requeue)
+
+
+async def declined_by(db: AsyncSession, request_ids: List[str]) -> Dict[str, Set[str]]:
+    """Who rejected each request; a provider is never offered a request it declined."""
+    if not request_ids:
+        return {}
+    result = await db.execute(
+        select(StatusLog.request_id, StatusLog.changed_by).where(
+            StatusLog.request_id.in_(request_ids),
+            StatusLog.new_status == "rejected",
+        )
+    )
+    declined: Dict[str, Set[str]] = defaultdict(set)
+    for request_id, user_id in result.all():
+        declined[request_id].add(user_id)
+    return declined
+
+
+class DispatchEngine:
+    """
+    In-memory matcher of maintenance requests to providers.
+
+    Keeps one max-heap of providers per specialization (lazy deletion: a
+    provider's entries are superseded whenever its load changes) and one
+    FIFO heap of waiting requests per specialization for when nobody has
+    capacity. Matching a request is O(log n) amortized.
+
+    State is rebuilt from the database on first use and every
+    DISPATCH_REFRESH_SECONDS. It is per process: with several workers each
+    one only sees its own assignments until the next refresh, so a provider
+    can briefly go over DISPATCH_MAX_ACTIVE_JOBS and a request that starts
+    waiting on one worker is only picked up by the others after their
+    refresh. Run dispatch on a single worker, or keep the refresh interval
+    short. Assignments themselves always go through the database.
+    """
+
+    def __init__(self):
+        self._providers: Dict[str, ProviderState] = {}
+        self._heaps: Dict[str, List[Tuple[float, int, str]]] = defaultdict(list)
+        self._waiting: Dict[str, List[Tuple[datetime, str]]] = defaultdict(list)
+        self._loaded_at: Optional[float] = None
+
+    # ---- State ----
+    async def ensure_loaded(self) -> bool:
+        """
+        Rebuilds the state from the database when it is due; returns whether
+        it did. Reads in a session of its own, so a caller's uncommitted
+        changes (say, the request being dispatched) never leak in.
+        """
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < settings.DISPATCH_REFRESH_SECONDS:
+            return False
+        async with AsyncSessionLocal() as db:
+            await self._load(db)
+        self._loaded_at = time.monotonic()
+        return True
+
+    async def _load(self, db: AsyncSession):
+        result = await db.execute(
+            select(MaintenanceRequest.assigned_provider_id, func.count())
+            .where(
+                MaintenanceRequest.assigned_provider_id.is_not(None),
+                MaintenanceRequest.status.in_(ACTIVE_STATUSES),
+            )
+            .group_by(MaintenanceRequest.assigned_provider_id)
+        )
+        loads = dict(result.all())
+        profiles = (await db.execute(select(ProviderProfile))).scalars().all()
+
+        self._providers = {p.user_id: ProviderState(p, loads.get(p.user_id, 0)) for p in profiles}
+        self._heaps = defaultdict(list)
+        for provider in self._providers.values():
+            self._push(provider)
+
+        result = await db.execute(
+            select(MaintenanceRequest.created_at, MaintenanceRequest.request_id, MaintenanceRequest.category)
+            .where(
+                MaintenanceRequest.assigned_provider_id.is_(None),
+                MaintenanceRequest.status == "pending",
+            )
+        )
+        self._waiting = defaultdict(list)
+        for created_at, request_id, category in result.all():
+            self._waiting[specialization_key(category)].append((created_at or datetime.min, request_id))
+        for queue in self._waiting.values():
+            heapq.heapify(queue)
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def _push(self, provider: ProviderState):
+        provider.version += 1
+        if not provider.available:
+            return
+        entry = (-provider.score(), provider.version, provider.user_id)
+        for key in provider.specializations:
+            heap = self._heaps[key]
+            heapq.heappush(heap, entry)
+            if len(heap) > 4 * len(self._providers) + 64:
+                self._compact(key)
+
+    def _compact(self, key: str):
+        """Drops superseded entries so a heap can't grow without bound between refreshes."""
+        live = []
+        for entry in self._heaps[key]:
+            provider = self._providers.get(entry[2])
+            if provider is not None and provider.version == entry[1]:
+                live.append(entry)
+        heapq.heapify(live)
+        self._heaps[key] = live
+
+    def _best(self, key: str, skip: Optional[Callable[[ProviderState], bool]] = None) -> Optional[ProviderState]:
+        heap = self._heaps.get(key)
+        skipped = []
+        best = None
+        while heap:
+            _, version, user_id = heap[0]
+            provider = self._providers.get(user_id)
+            if provider is None or provider.version != version or not provider.available:
+                heapq.heappop(heap)  # stale entry
+            elif skip is not None and skip(provider):
+                skipped.append(heapq.heappop(heap))
+            else:
+                best = provider
+                break
+        for entry in skipped:
+            heapq.heappush(heap, entry)
+        return best
+
+    def adjust_load(self, provider_id: str, delta: int):
+        provider = self._providers.get(provider_id)
+        if provider is None:
+            return
+        provider.active_jobs = max(0, provider.active_jobs + delta)
+        self._push(provider)
+
+    # ---- Matching ----
+    def match(self, category: str, skip: Optional[Callable[[ProviderState], bool]] = None) -> Optional[str]:
+        key = specialization_key(category)
+        provider = self._best(key, skip) or self._best(GENERAL, skip)
+        return provider.user_id if provider else None
+
+    def _assign(self, req: MaintenanceRequest, changes: PendingDispatch, declined: Set[str]) -> Optional[str]:
+        # Loads only change once the transaction commits, so providers already
+        # given requests in this one are counted against their capacity here
+        def skip(provider: ProviderState) -> bool:
+            return (
+                provider.user_id in declined
+                or provider.active_jobs + changes.loads[provider.user_id] >= settings.DISPATCH_MAX_ACTIVE_JOBS
+            )
+
+        provider_id = self.match(req.category, skip)
+        if provider_id is None:
+            changes.waiting.append(
+                (specialization_key(req.category), req.created_at or datetime.utcnow(), req.request_id)
+            )
+            return None
+        req.assigned_provider_id = provider_id
+        req.assigned_at = datetime.utcnow()
+        changes.loads[provider_id] += 1
+        return provider_id
+
+    async def dispatch(self, req: MaintenanceRequest) -> PendingDispatch:
+        """
+        Assigns the best available provider to a new request; without one,
+        the request waits for capacity. The caller commits, then passes the
+        result to apply_committed_changes().
+        """
+        await self.ensure_loaded()
+        changes = PendingDispatch()
+        self._assign(req, changes, set())
+        return changes
+
+    async def assign_waiting(self, db: AsyncSession, provider_ids: Iterable[str]) -> int:
+        """
+        Hands queued requests to providers that just freed capacity, then
+        commits. Each round pops as many requests as the provider has room
+        for, loads who declined them in one query and assigns the rest with
+        one guarded UPDATE.
+        """
+        await self.ensure_loaded()
+        assigned: Dict[str, int] = defaultdict(int)
+        now = datetime.utcnow()
+        for provider_id in set(provider_ids):
+            provider = self._providers.get(provider_id)
+            if provider is None:
+                continue
+            capacity = settings.DISPATCH_MAX_ACTIVE_JOBS - provider.active_jobs
+            for key in provider.specializations:
+                queue = self._waiting.get(key)
+                passed_over = []
+                while queue and assigned[provider_id] < capacity:
+                    count = min(len(queue), capacity - assigned[provider_id])
+                    entries = [heapq.heappop(queue) for _ in range(count)]
+                    declined = await declined_by(db, [request_id for _, request_id in entries])
+                    request_ids = []
+                    for entry in entries:
+                        if provider_id in declined.get(entry[1], ()):
+                            passed_over.append(entry)  # stays queued for someone else
+                        else:
+                            request_ids.append(entry[1])
+                    if not request_ids:
+                        continue
+                    # Requests assigned or closed meanwhile are skipped (and leave the queue)
+                    moved = await db.execute(
+                        update(MaintenanceRequest)
+                        .where(
+                            MaintenanceRequest.request_id.in_(request_ids),
+                            MaintenanceRequest.assigned_provider_id.is_(None),
+                            MaintenanceRequest.status == "pending",
+                        )
+                        .values(assigned_provider_id=provider_id, assigned_at=now)
+                    )
+                    assigned[provider_id] += moved.rowcount
+                for entry in passed_over:
+                    heapq.heappush(queue, entry)
+        if not any(assigned.values()):
+            return 0
+        await db.commit()
+        for provider_id, count in assigned.items():
+            if count:
+                self.adjust_load(provider_id, count)
+        return sum(assigned.values())
+
+    # ---- Status changes ----
+    async def record_status_change(
+        self,
+        db: AsyncSession,
+        requests: List[MaintenanceRequest],
+        old_statuses: Dict[str, str],
+        new_status: str,
+        changed_by: str,
+        changed_at: datetime,
+    ) -> PendingDispatch:
+        """
+        Updates assignments and provider stats inside the caller's
+        transaction and returns the changes to apply once it commits.
+
+        A rejected request loses its provider; when the provider itself
+        declined, the request is listed in `requeue` so the caller can put it
+        back to pending, which dispatches it again (never to a provider that
+        declined it). On a provider's first acceptance of a request,
+        total_jobs and avg_response_time_hours (hours from request creation
+        to acceptance) are updated incrementally.
+        """
+        changes = PendingDispatch()
+        accepted: Dict[str, List[MaintenanceRequest]] = defaultdict(list)
+        redispatch: List[MaintenanceRequest] = []
+        for req in requests:
+            provider_id = req.assigned_provider_id
+            if provider_id is None:
+                if new_status == "pending":
+                    redispatch.append(req)
+                continue
+            was_active = old_statuses[req.request_id] in ACTIVE_STATUSES
+            is_active = new_status in ACTIVE_STATUSES
+            if was_active and not is_active:
+                changes.loads[provider_id] -= 1
+            elif is_active and not was_active:
+                changes.loads[provider_id] += 1
+            if new_status == "rejected":
+                req.assigned_provider_id = None
+                req.assigned_at = None
+                if changed_by == provider_id:
+                    changes.requeue.append(req.request_id)
+            elif new_status == "accepted" and req.created_at:
+                accepted[provider_id].append(req)
+
+        if redispatch:
+            declined = await declined_by(db, [req.request_id for req in redispatch])
+            for req in redispatch:
+                self._assign(req, changes, declined.get(req.request_id, set()))
+
+        if accepted:
+            # Requests go back to pending after a rejection; a provider
+            # accepting the same request again is not another job
+            result = await db.execute(
+                select(StatusLog.request_id, StatusLog.changed_by).where(
+                    StatusLog.request_id.in_([req.request_id for reqs in accepted.values() for req in reqs]),
+                    StatusLog.new_status == "accepted",
+                    StatusLog.created_at < changed_at,
+                )
+            )
+            seen = set(result.all())
+            accepted = {
+                provider_id: [
+                    (changed_at - req.created_at).total_seconds() / 3600
+                    for req in reqs
+                    if (req.request_id, provider_id) not in seen
+                ]
+                for provider_id, reqs in accepted.items()
+            }
+
+        for provider_id, hours in accepted.items():
+            if not hours:
+                continue
+            await db.execute(
+                update(ProviderProfile)
+                .where(ProviderProfile.user_id == provider_id)
+                .values(
+                    avg_response_time_hours=(
+                        func.coalesce(ProviderProfile.avg_response_time_hours, 0)
+                        * func.coalesce(ProviderProfile.total_jobs, 0)
+                        + sum(hours)
+                    ) / (func.coalesce(ProviderProfile.total_jobs, 0) + len(hours)),
+                    total_jobs=func.coalesce(ProviderProfile.total_jobs, 0) + len(hours),
+                )
+            )
+        return changes
+
+    async def apply_committed_changes(self, db: AsyncSession, changes: PendingDispatch):
+        """Applies a committed transaction's changes, then fills any capacity it freed."""
+        if not changes:
+            return
+        if not await self.ensure_loaded():
+            # (a fresh load already reflects the commit)
+            for provider_id, delta in changes.loads.items():
+                if delta:
+                    self.adjust_load(provider_id, delta)
+            for key, created_at, request_id in changes.waiting:
+                heapq.heappush(self._waiting[key], (created_at, request_id))
+        await self.assign_waiting(db, [provider_id for provider_id, delta in changes.loads.items() if delta < 0])
+
+
+dispatcher = DispatchEngine()
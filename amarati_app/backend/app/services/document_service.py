@@ -0,0 +1,96 @@
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select, update, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.document import Document
+from app.services.blob_service import release_blobs
+
+
+async def get_document(db: AsyncSession, document_id: str) -> Document:
+    result = await db.execute(select(Document).where(Document.document_id == document_id))
+    document = result.scalar_one_or_none()
+    if not document:
+        raise HTTPException(status_code=404, detail="المستند غير موجود")
+    return document
+
+
+async def current_version(db: AsyncSession, version_group_id: str) -> Optional[Document]:
+    """The group's latest version: a single lookup on (version_group_id, is_current)."""
+    result = await db.execute(
+        select(Document).where(Document.version_group_id == version_group_id, Document.is_current.is_(True))
+    )
+    return result.scalar_one_or_none()
+
+
+async def version_history(db: AsyncSession, version_group_id: str, *criteria) -> List[Document]:
+    """The group's versions, oldest first, narrowed by any extra WHERE criteria."""
+    result = await db.execute(
+        select(Document).where(Document.version_group_id == version_group_id, *criteria).order_by(Document.version)
+    )
+    return list(result.scalars().all())
+
+
+async def create_document(db: AsyncSession, document: Document) -> Document:
+    """Adds the first version of a new document (its own version group) and commits."""
+    document.version = 1
+    document.version_group_id = document.document_id
+    document.parent_document_id = None
+    document.is_current = True
+    document.upload_date = document.upload_date or datetime.utcnow()
+    db.add(document)
+    await db.commit()
+    return document
+
+
+async def add_version(db: AsyncSession, document: Document, new: Document) -> Document:
+    """
+    Makes `new` the current version of `document`'s group, chained after
+    the group's current version (not necessarily `document`). The old
+    version is retired with an UPDATE guarded on is_current, and
+    (version_group_id, version) is unique, so concurrent uploads get a 409
+    instead of forking the chain.
+    """
+    current = await current_version(db, document.version_group_id)
+    if current is None:
+        raise HTTPException(status_code=404, detail="المستند غير موجود")
+    retired = await db.execute(
+        update(Document)
+        .where(Document.document_id == current.document_id, Document.is_current.is_(True))
+        .values(is_current=False)
+    )
+    if retired.rowcount != 1:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="تم رفع نسخة أخرى من المستند أثناء التحديث، أعد المحاولة")
+
+    new.version = current.version + 1
+    new.version_group_id = current.version_group_id
+    new.parent_document_id = current.document_id
+    new.is_current = True
+    new.upload_date = new.upload_date or datetime.utcnow()
+    db.add(new)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="تم رفع نسخة أخرى من المستند أثناء التحديث، أعد المحاولة")
+    return new
+
+
+async def delete_document(db: AsyncSession, document: Document) -> int:
+    """
+    Deletes every version of the document and drops their blob
+    references (the blobs themselves go at the next GC). Returns the number
+    of versions deleted.
+    """
+    group = Document.version_group_id == document.version_group_id
+    result = await db.execute(select(Document.blob_sha256).where(group))
+    blobs = Counter(sha256 for sha256 in result.scalars().all() if sha256)
+    deleted = await db.execute(delete(Document).where(group).execution_options(synchronize_session=False))
+    await release_blobs(db, blobs)
+    await db.commit()
+    return deleted.rowcount
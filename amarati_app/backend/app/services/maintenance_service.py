@@ -0,0 +1,129 @@
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from fastapi import HTTPException
+from sqlalchemy import select, update, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.maintenance import StatusLog
+from app.models.maintenance_request import MaintenanceRequest
+from app.services.analytics_service import record_status_changes
+from app.services.dispatch_service import dispatcher
+
+# Allowed status changes: current status -> statuses it may move to
+STATUS_TRANSITIONS: Dict[str, Set[str]] = {
+    "pending": {"accepted", "rejected"},
+    "accepted": {"in_progress", "completed", "rejected"},
+    "in_progress": {"completed"},
+    "rejected": {"pending"},
+    "completed": {"in_progress"},  # reopened
+}
+VALID_STATUSES = list(STATUS_TRANSITIONS)
+
+# Most request ids accepted by one bulk status update or batch visit scheduling call
+MAX_BULK_REQUESTS = 500
+
+
+def allowed_previous_statuses(new_status: str) -> Set[str]:
+    return {old for old, targets in STATUS_TRANSITIONS.items() if new_status in targets}
+
+
+def check_new_status(new_status: str):
+    if new_status not in STATUS_TRANSITIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"الحالة غير صالحة. الحالات المسموحة: {', '.join(VALID_STATUSES)}"
+        )
+
+
+async def apply_status_transition(
+    db: AsyncSession,
+    request_ids: List[str],
+    new_status: str,
+    changed_by: str,
+    notes: Optional[str] = None,
+) -> dict:
+    """
+    Moves every request that may legally go to `new_status` with one
+    UPDATE ... WHERE request_id IN (...) and records the changes with one
+    multi-row StatusLog INSERT, then commits. Assigned providers' stats
+    and load and the analytics rollups are updated in the same transaction;
+    requests their provider rejected are then dispatched again.
+
+    Returns {"updated": [MaintenanceRequest], "not_found": [id], "invalid": [{request_id, status}]}.
+    """
+    check_new_status(new_status)
+    request_ids = list(dict.fromkeys(request_ids))
+    allowed = allowed_previous_statuses(new_status)
+
+    result = await db.execute(
+        select(MaintenanceRequest).where(MaintenanceRequest.request_id.in_(request_ids))
+    )
+    found = {req.request_id: req for req in result.scalars().all()}
+
+    not_found = [rid for rid in request_ids if rid not in found]
+    invalid = [
+        {"request_id": rid, "status": found[rid].status}
+        for rid in request_ids
+        if rid in found and found[rid].status not in allowed
+    ]
+    movable = [found[rid] for rid in request_ids if rid in found and found[rid].status in allowed]
+    if not movable:
+        return {"updated": [], "not_found": not_found, "invalid": invalid}
+
+    old_statuses = {req.request_id: req.status for req in movable}
+    moved = await db.execute(
+        update(MaintenanceRequest)
+        .where(
+            MaintenanceRequest.request_id.in_(list(old_statuses)),
+            MaintenanceRequest.status.in_(allowed),
+        )
+        .values(status=new_status)
+    )
+    if moved.rowcount != len(movable):
+        # another writer changed some of these rows since we read them
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="تم تعديل بعض الطلبات أثناء التحديث، أعد المحاولة")
+
+    now = datetime.utcnow()
+    await db.execute(
+        insert(StatusLog),
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "request_id": request_id,
+                "old_status": old_status,
+                "new_status": new_status,
+                "changed_by": changed_by,
+                "notes": notes,
+                "created_at": now,
+            }
+            for request_id, old_status in old_statuses.items()
+        ],
+    )
+    await record_status_changes(db, movable, old_statuses, new_status, now)
+    dispatch_changes = None
+    if settings.DISPATCH_ENABLED:
+        dispatch_changes = await dispatcher.record_status_change(
+            db, movable, old_statuses, new_status, changed_by, now
+        )
+    await db.commit()
+    if dispatch_changes:
+        await dispatcher.apply_committed_changes(db, dispatch_changes)
+        if dispatch_changes.requeue:
+            # Declined by the assigned provider: back to pending for someone else
+            await apply_status_transition(
+                db, dispatch_changes.requeue, "pending", changed_by, "أعيد توزيع الطلب بعد رفض مقدم الخدمة"
+            )
+    return {"updated": movable, "not_found": not_found, "invalid": invalid}
+
+
+async def get_status_timeline(db: AsyncSession, request_id: str) -> List[StatusLog]:
+    result = await db.execute(
+        select(StatusLog)
+        .where(StatusLog.request_id == request_id)
+        .order_by(StatusLog.created_at, StatusLog.id)
+    )
+    return list(result.scalars().all())
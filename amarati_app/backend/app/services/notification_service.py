@@ -5,6 +5,7 @@ from sqlalchemy import select
 
 from app.models.notification import Notification
 from app.models.user import User
+from app.services.user_cache import invalidate_user
 
 
 class NotificationService:
@@ -39,12 +40,13 @@ class NotificationService:
         if not user:
             return new_prefs
             
-        current_prefs = user.notification_preferences or {}
+        current_prefs = dict(user.notification_preferences or {})
         current_prefs.update(new_prefs)
         
         user.notification_preferences = current_prefs
         db.add(user)
         await db.commit()
+        await invalidate_user(user_id)
         await db.refresh(user)
         
         return current_prefs
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordWorkerPool:
+    """
+    Runs CPU-heavy password hashing off the event loop.
+    At most `max_workers` calls run at once; further callers wait in line
+    and are counted in `queued`.
+    """
+
+    def __init__(self, max_workers: int, executor_type: str = "thread"):
+        if executor_type not in ("thread", "process"):
+            raise ValueError(f"Unknown executor type {executor_type!r}, expected 'thread' or 'process'")
+        self.max_workers = max_workers
+        self.executor_type = executor_type
+        self._executor: Optional[Executor] = None
+        self._semaphore = asyncio.Semaphore(max_workers)
+        self.queued = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.max_queue_depth = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password")
+        return self._executor
+
+    async def run(self, fn: Callable, *args):
+        self.queued += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "executor": self.executor_type,
+            "workers": self.max_workers,
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "max_queue_depth": self.max_queue_depth,
+        }
+
+    async def log_stats(self, interval_seconds: float):
+        """Logs stats() every `interval_seconds` while the pool is in use (run as a background task)."""
+        logged_completed = None
+        while True:
+            await asyncio.sleep(interval_seconds)
+            stats = self.stats()
+            if stats["completed"] != logged_completed or stats["queued"]:
+                logger.info("password pool %s", stats)
+                logged_completed = stats["completed"]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,225 @@
+import asyncio
+import sys
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import upsert_insert
+from app.models.payment import Payment, PaymentLedger, PaymentStatus
+
+PROVIDER_ACCOUNT = "provider"
+BUILDING_ACCOUNT = "building"
+
+# Allowed status changes: current status -> statuses it may move to
+PAYMENT_TRANSITIONS = {
+    PaymentStatus.pending: {PaymentStatus.completed, PaymentStatus.failed},
+    PaymentStatus.failed: {PaymentStatus.completed, PaymentStatus.pending},
+    PaymentStatus.completed: {PaymentStatus.refunded},
+    PaymentStatus.refunded: set(),
+}
+
+RECONCILE_BATCH_SIZE = 5000
+_TOLERANCE = 0.005
+
+AccountKey = Tuple[str, str]
+
+
+def ledger_accounts(receiver_id: Optional[str], building_id: Optional[str]) -> List[AccountKey]:
+    accounts = []
+    if receiver_id:
+        accounts.append((PROVIDER_ACCOUNT, receiver_id))
+    if building_id:
+        accounts.append((BUILDING_ACCOUNT, building_id))
+    return accounts
+
+
+def _amount_column(status: PaymentStatus) -> str:
+    return f"{status.value}_amount"
+
+
+_COUNTERS = ("payment_count", "total_amount") + tuple(_amount_column(s) for s in PaymentStatus)
+
+
+def _ledger_delta(amount: float, old_status: Optional[PaymentStatus], new_status: PaymentStatus) -> dict:
+    delta = dict.fromkeys(_COUNTERS, 0)
+    if old_status is None:
+        delta["payment_count"] = 1
+        delta["total_amount"] = amount
+    else:
+        delta[_amount_column(old_status)] -= amount
+    delta[_amount_column(new_status)] += amount
+    return delta
+
+
+async def apply_ledger_deltas(db: AsyncSession, deltas: Dict[AccountKey, dict]):
+    """Adds the deltas to the ledger rows in one executemany upsert (inside the caller's transaction)."""
+    if not deltas:
+        return
+    stmt = upsert_insert(db.bind.dialect.name, PaymentLedger)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PaymentLedger.account_type, PaymentLedger.account_id],
+        set_={
+            **{name: getattr(PaymentLedger, name) + getattr(stmt.excluded, name) for name in _COUNTERS},
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    now = datetime.utcnow()
+    await db.execute(stmt, [
+        {"account_type": account_type, "account_id": account_id, "updated_at": now, **delta}
+        for (account_type, account_id), delta in deltas.items()
+    ])
+
+
+def add_ledger_delta(
+    deltas: Dict[AccountKey, dict],
+    payment: Payment,
+    old_status: Optional[PaymentStatus],
+    new_status: PaymentStatus,
+):
+    """Accumulates one payment's change into `deltas` (for batched callers)."""
+    change = _ledger_delta(payment.amount, old_status, new_status)
+    for account in ledger_accounts(payment.receiver_id, payment.building_id):
+        current = deltas.setdefault(account, dict.fromkeys(_COUNTERS, 0))
+        for name, value in change.items():
+            current[name] += value
+
+
+async def record_new_payment(db: AsyncSession, payment: Payment):
+    """Adds a new payment and its ledger entries in the same transaction; the caller commits."""
+    db.add(payment)
+    deltas: Dict[AccountKey, dict] = {}
+    add_ledger_delta(deltas, payment, None, payment.status)
+    await apply_ledger_deltas(db, deltas)
+
+
+async def transition_payment(db: AsyncSession, payment: Payment, new_status: PaymentStatus, **values) -> Payment:
+    """
+    Moves a payment to `new_status` with an UPDATE guarded on its current
+    status, adjusts the ledgers in the same transaction and commits.
+    """
+    old_status = payment.status
+    if new_status == old_status:
+        return payment
+    if new_status not in PAYMENT_TRANSITIONS[old_status]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"لا يمكن تغيير حالة الدفعة من {old_status.value} إلى {new_status.value}",
+        )
+    moved = await db.execute(
+        update(Payment)
+        .where(Payment.id == payment.id, Payment.status == old_status)
+        .values(status=new_status, **values)
+    )
+    if moved.rowcount != 1:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="تم تعديل الدفعة أثناء التحديث، أعد المحاولة")
+
+    deltas: Dict[AccountKey, dict] = {}
+    add_ledger_delta(deltas, payment, old_status, new_status)
+    await apply_ledger_deltas(db, deltas)
+    await db.commit()
+    return payment
+
+
+async def get_ledger(db: AsyncSession, account_type: str, account_id: str) -> Optional[PaymentLedger]:
+    result = await db.execute(
+        select(PaymentLedger).where(
+            PaymentLedger.account_type == account_type,
+            PaymentLedger.account_id == account_id,
+        )
+    )
+    return result.scalar_one_or_none()
+
+
+# ---- Reconciliation ----
+async def _recompute_ledger(db: AsyncSession, account: AccountKey) -> dict:
+    """
+    Overwrites one ledger row with totals summed from its payments and
+    commits. The row is locked first (SELECT ... FOR UPDATE; on SQLite the
+    upsert that makes sure it exists takes the write lock), so a payment
+    change committed before the sum is counted in it and one still in
+    flight waits and applies its delta on top.
+    """
+    account_type, account_id = account
+    await apply_ledger_deltas(db, {account: dict.fromkeys(_COUNTERS, 0)})
+    await db.execute(
+        select(PaymentLedger.account_id)
+        .where(PaymentLedger.account_type == account_type, PaymentLedger.account_id == account_id)
+        .with_for_update()
+    )
+    column = Payment.receiver_id if account_type == PROVIDER_ACCOUNT else Payment.building_id
+    result = await db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(Payment.amount), 0.0),
+            *(func.coalesce(func.sum(Payment.amount).filter(Payment.status == s), 0.0) for s in PaymentStatus),
+        ).where(column == account_id)
+    )
+    totals = dict(zip(_COUNTERS, result.one()))
+    await db.execute(
+        update(PaymentLedger)
+        .where(PaymentLedger.account_type == account_type, PaymentLedger.account_id == account_id)
+        .values(**totals, updated_at=datetime.utcnow())
+    )
+    await db.commit()
+    return totals
+
+
+async def reconcile_ledgers(db: AsyncSession, fix: bool = False, batch_size: int = RECONCILE_BATCH_SIZE) -> List[dict]:
+    """
+    Recomputes every ledger from the payments table, streaming payments in
+    batches (memory grows with the number of accounts, not payments), and
+    returns the accounts whose stored totals differ. With fix=True each of
+    those is recomputed again under a row lock (_recompute_ledger) and
+    overwritten, since payments may have changed since the scan.
+    """
+    expected: Dict[AccountKey, dict] = defaultdict(lambda: dict.fromkeys(_COUNTERS, 0))
+    result = await db.stream(
+        select(Payment.receiver_id, Payment.building_id, Payment.status, Payment.amount)
+        .execution_options(yield_per=batch_size)
+    )
+    async for partition in result.partitions():
+        for receiver_id, building_id, status, amount in partition:
+            change = _ledger_delta(amount, None, status)
+            for account in ledger_accounts(receiver_id, building_id):
+                totals = expected[account]
+                for name, value in change.items():
+                    totals[name] += value
+
+    stored: Dict[AccountKey, dict] = {}
+    result = await db.stream(select(PaymentLedger).execution_options(yield_per=batch_size))
+    async for ledger in result.scalars():
+        stored[(ledger.account_type, ledger.account_id)] = {name: getattr(ledger, name) for name in _COUNTERS}
+
+    mismatches = []
+    for account in expected.keys() | stored.keys():
+        want = expected.get(account, dict.fromkeys(_COUNTERS, 0))
+        have = stored.get(account, dict.fromkeys(_COUNTERS, 0))
+        if any(abs(want[name] - have[name]) > _TOLERANCE for name in _COUNTERS):
+            mismatches.append({"account_type": account[0], "account_id": account[1], "expected": want, "stored": have})
+
+    if fix:
+        await db.rollback()  # end the scan's transaction before taking row locks
+        for m in mismatches:
+            m["expected"] = await _recompute_ledger(db, (m["account_type"], m["account_id"]))
+    return mismatches
+
+
+async def _main():
+    from app.core.database import AsyncSessionLocal
+
+    fix = "--fix" in sys.argv[1:]
+    async with AsyncSessionLocal() as db:
+        mismatches = await reconcile_ledgers(db, fix=fix)
+    for m in mismatches:
+        print(f"{m['account_type']} {m['account_id']}: stored {m['stored']} expected {m['expected']}")
+    print(f"{len(mismatches)} ledger(s) out of balance" + (" (fixed)" if fix and mismatches else ""))
+
+
+if __name__ == "__main__":
+    # python -m app.services.payment_service [--fix]
+    asyncio.run(_main())
@@ -0,0 +1,221 @@
+import asyncio
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy import select, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import upsert_insert
+from app.models.maintenance_request import MaintenanceRequest
+from app.models.predictive_maintenance import PredictiveMaintenance
+from app.models.unit import Unit
+from app.services.search_service import search_tokens
+
+RISK_LEVELS = np.array(["low", "medium", "high"])
+RISK_THRESHOLDS = (0.45, 0.75)  # score >= threshold -> medium, high
+INSPECTION_INTERVAL_DAYS = np.array([180, 90, 30])  # per risk level
+
+RECENT_DAYS = 90
+WRITE_BATCH_SIZE = 1000
+
+# How much a request in each category says about a unit's condition (default 1.0)
+CATEGORY_WEIGHTS = {
+    "غاز": 2.0,
+    "كهرباء": 1.5,
+    "سباكة": 1.2,
+    "تسريب": 1.2,
+    "تكييف": 1.0,
+    "نظافة": 0.3,
+}
+
+
+def _category_key(category: str) -> str:
+    return " ".join(search_tokens(category or ""))
+
+
+_WEIGHTS_BY_KEY = {_category_key(name): weight for name, weight in CATEGORY_WEIGHTS.items()}
+
+
+class UnitHistory:
+    """Per-unit maintenance history as NumPy arrays, one row per unit."""
+
+    def __init__(self, unit_ids: np.ndarray, categories: List[str]):
+        n, m = len(unit_ids), len(categories)
+        self.unit_ids = unit_ids
+        self.categories = categories
+        self.counts = np.zeros((n, m), dtype=np.float32)
+        self.recent_counts = np.zeros((n, m), dtype=np.float32)
+        self.days_since_request = np.full(n, np.inf)
+        self.days_since_inspection = np.full(n, np.inf)
+        self.last_inspection = np.full(n, np.datetime64("NaT"), dtype="datetime64[D]")
+        self.current_level = np.full(n, None, dtype=object)
+        self.current_next = np.full(n, np.datetime64("NaT"), dtype="datetime64[D]")
+
+
+async def link_request_units(db: AsyncSession) -> int:
+    """
+    Fills MaintenanceRequest.unit_id from (building_id, unit_number) where
+    it is missing and a matching unit exists. Returns the number linked.
+    """
+    matching_unit = select(Unit.unit_id).where(
+        Unit.building == MaintenanceRequest.building_id,
+        Unit.unit_number == MaintenanceRequest.unit_number,
+    )
+    result = await db.execute(
+        update(MaintenanceRequest)
+        .where(
+            MaintenanceRequest.unit_id.is_(None),
+            MaintenanceRequest.building_id.is_not(None),
+            MaintenanceRequest.unit_number.is_not(None),
+            MaintenanceRequest.unit_number != "",
+            matching_unit.exists(),
+        )
+        .values(unit_id=matching_unit.limit(1).scalar_subquery())
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def load_unit_history(db: AsyncSession, as_of: datetime) -> UnitHistory:
+    today = np.datetime64(as_of.date(), "D")
+
+    result = await db.execute(
+        select(
+            Unit.unit_id,
+            PredictiveMaintenance.last_inspection,
+            PredictiveMaintenance.risk_level,
+            PredictiveMaintenance.next_inspection,
+        )
+        .outerjoin(PredictiveMaintenance, PredictiveMaintenance.unit_id == Unit.unit_id)
+    )
+    units = result.all()
+    if not units:
+        return UnitHistory(np.array([], dtype=object), [])
+    unit_ids, inspections, levels, next_dates = zip(*units)
+
+    recent_since = as_of - timedelta(days=RECENT_DAYS)
+    result = await db.execute(
+        select(
+            MaintenanceRequest.unit_id,
+            MaintenanceRequest.category,
+            func.count(),
+            func.count().filter(MaintenanceRequest.created_at >= recent_since),
+            func.max(MaintenanceRequest.created_at),
+        )
+        .where(MaintenanceRequest.unit_id.is_not(None))
+        .group_by(MaintenanceRequest.unit_id, MaintenanceRequest.category)
+    )
+    rows = result.all()
+
+    categories = sorted({row[1] for row in rows})
+    history = UnitHistory(np.array(unit_ids, dtype=object), categories)
+    history.last_inspection[:] = np.array(inspections, dtype="datetime64[D]")
+    history.days_since_inspection = (today - history.last_inspection).astype(np.float64)
+    history.days_since_inspection[np.isnat(history.last_inspection)] = np.inf
+    history.current_level[:] = levels
+    history.current_next[:] = np.array(next_dates, dtype="datetime64[D]")
+    if not rows:
+        return history
+
+    unit_pos = {unit_id: i for i, unit_id in enumerate(unit_ids)}
+    category_pos = {category: j for j, category in enumerate(categories)}
+    n = len(rows)
+    unit_idx = np.fromiter((unit_pos.get(row[0], -1) for row in rows), dtype=np.int64, count=n)
+    category_idx = np.fromiter((category_pos[row[1]] for row in rows), dtype=np.int64, count=n)
+    counts = np.fromiter((row[2] for row in rows), dtype=np.float32, count=n)
+    recent = np.fromiter((row[3] for row in rows), dtype=np.float32, count=n)
+    now_ts = as_of.timestamp()
+    days_since = np.fromiter(((now_ts - row[4].timestamp()) / 86400 for row in rows), dtype=np.float64, count=n)
+
+    known = unit_idx >= 0  # requests pointing at a deleted unit
+    unit_idx, category_idx = unit_idx[known], category_idx[known]
+    np.add.at(history.counts, (unit_idx, category_idx), counts[known])
+    np.add.at(history.recent_counts, (unit_idx, category_idx), recent[known])
+    np.minimum.at(history.days_since_request, unit_idx, days_since[known])
+    return history
+
+
+def score_units(history: UnitHistory, as_of: date):
+    """
+    Scores every unit at once. Returns (score 0..1, risk level index,
+    next inspection date) arrays aligned with history.unit_ids.
+
+    A unit that is due (never inspected, or its interval has run out) is
+    due from today; once it is, its stored date is kept, so re-running
+    does not push it forward a day at a time and rewrite it.
+    """
+    weights = np.array(
+        [_WEIGHTS_BY_KEY.get(_category_key(c), 1.0) for c in history.categories], dtype=np.float32
+    )
+    load = history.counts @ weights if len(weights) else np.zeros(len(history.unit_ids))
+    recent_load = history.recent_counts @ weights if len(weights) else np.zeros(len(history.unit_ids))
+    recency = np.exp(-history.days_since_request / RECENT_DAYS)  # 0 when the unit never had a request
+    overdue = np.clip(np.nan_to_num(history.days_since_inspection / 365, posinf=1.0), 0, 2)
+
+    raw = 0.15 * load + 0.6 * recent_load + 1.0 * recency + 0.8 * overdue
+    score = 1 - np.exp(-raw / 2)
+    level = np.searchsorted(RISK_THRESHOLDS, score, side="right")
+
+    today = np.datetime64(as_of, "D")
+    scheduled = history.last_inspection + INSPECTION_INTERVAL_DAYS[level].astype("timedelta64[D]")
+    due = np.isnat(scheduled) | (scheduled < today)
+    already_due = ~np.isnat(history.current_next) & (history.current_next <= today)
+    next_inspection = np.where(due, np.where(already_due, history.current_next, today), scheduled)
+    return score, level, next_inspection
+
+
+async def write_risk(db: AsyncSession, history: UnitHistory, score, level, next_inspection) -> int:
+    """Bulk-upserts units whose level or next inspection changed. Returns rows written."""
+    levels = RISK_LEVELS[level]
+    changed = np.flatnonzero((levels != history.current_level) | (next_inspection != history.current_next))
+
+    stmt = upsert_insert(db.bind.dialect.name, PredictiveMaintenance)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PredictiveMaintenance.unit_id],
+        set_={
+            "risk_level": stmt.excluded.risk_level,
+            "risk_score": stmt.excluded.risk_score,
+            "next_inspection": stmt.excluded.next_inspection,
+        },
+    )
+    for start in range(0, len(changed), WRITE_BATCH_SIZE):
+        rows = changed[start:start + WRITE_BATCH_SIZE]
+        await db.execute(stmt, [
+            {
+                "pm_id": str(uuid.uuid4()),
+                "unit_id": history.unit_ids[i],
+                "risk_level": str(levels[i]),
+                "risk_score": round(float(score[i]), 4),
+                "next_inspection": next_inspection[i].item(),
+            }
+            for i in rows.tolist()
+        ])
+        await db.commit()
+    return len(changed)
+
+
+async def run_risk_scoring(db: AsyncSession) -> Dict[str, int]:
+    now = datetime.utcnow()
+    linked = await link_request_units(db)
+    history = await load_unit_history(db, now)
+    score, level, next_inspection = score_units(history, now.date())
+    written = await write_risk(db, history, score, level, next_inspection)
+    summary = {"units": len(history.unit_ids), "updated": written, "linked_requests": linked}
+    for i, name in enumerate(RISK_LEVELS):
+        summary[str(name)] = int(np.count_nonzero(level == i))
+    return summary
+
+
+async def _main():
+    from app.core.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        summary = await run_risk_scoring(db)
+    print(", ".join(f"{key}={value}" for key, value in summary.items()))
+
+
+if __name__ == "__main__":
+    # python -m app.services.risk_service
+    asyncio.run(_main())
@@ -0,0 +1,313 @@
+import heapq
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from fastapi import HTTPException
+from sortedcontainers import SortedKeyList
+from sqlalchemy import select, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.maintenance import Visit
+from app.models.maintenance_request import MaintenanceRequest
+
+# Visits in these statuses occupy their technician's time
+ACTIVE_VISIT_STATUSES = ("scheduled", "confirmed", "in_progress")
+MAX_SLOT_SEARCH_DAYS = 60
+
+
+class IntervalIndex:
+    """
+    One technician's booked visits as non-overlapping [start, end)
+    intervals, kept as (start, end, visit_id) in a list sorted on start.
+    Booking, overlap checks and locating the next gap are logarithmic.
+    """
+
+    def __init__(self):
+        self.visits = SortedKeyList(key=itemgetter(0))
+
+    def __len__(self):
+        return len(self.visits)
+
+    def conflict(self, start: datetime, end: datetime, ignore_id: Optional[str] = None) -> Optional[str]:
+        """Id of a booked visit overlapping [start, end), if any."""
+        # intervals don't overlap, so ends are sorted too: walk back from the
+        # last visit starting before `end` while visits still reach past `start`
+        i = self.visits.bisect_key_left(end) - 1
+        while i >= 0:
+            _, visit_end, visit_id = self.visits[i]
+            if visit_end <= start:
+                break
+            if visit_id != ignore_id:
+                return visit_id
+            i -= 1  # skip the visit being rescheduled
+        return None
+
+    def add(self, visit_id: str, start: datetime, end: datetime):
+        self.visits.add((start, end, visit_id))
+
+    def remove(self, visit_id: str, start: datetime):
+        i = self.visits.bisect_key_left(start)
+        while i < len(self.visits) and self.visits[i][0] == start:
+            if self.visits[i][2] == visit_id:
+                del self.visits[i]
+                return
+            i += 1
+
+    def next_free(self, after: datetime, duration: timedelta, until: datetime) -> Optional[datetime]:
+        """Earliest start >= after such that [start, start + duration) fits before `until`."""
+        candidate = after
+        i = self.visits.bisect_key_right(after) - 1
+        if i >= 0 and self.visits[i][1] > candidate:
+            candidate = self.visits[i][1]
+        for visit_start, visit_end, _ in self.visits.islice(i + 1):
+            if visit_start >= candidate + duration:
+                break
+            candidate = max(candidate, visit_end)
+        return candidate if candidate + duration <= until else None
+
+
+class VisitScheduler:
+    """
+    Per-process interval indexes keyed by (provider, technician), built
+    lazily per provider with one query and rebuilt after
+    VISIT_INDEX_TTL_SECONDS so visits booked by other workers show up.
+    """
+
+    def __init__(self):
+        self._indexes: Dict[str, Dict[str, IntervalIndex]] = {}
+        self._loaded_at: Dict[str, float] = {}
+
+    async def technicians(self, db: AsyncSession, provider_id: str) -> Dict[str, IntervalIndex]:
+        loaded_at = self._loaded_at.get(provider_id)
+        if loaded_at is None or time.monotonic() - loaded_at > settings.VISIT_INDEX_TTL_SECONDS:
+            result = await db.execute(
+                select(Visit.id, Visit.technician_name, Visit.start_time, Visit.end_time)
+                .where(
+                    Visit.provider_id == provider_id,
+                    Visit.status.in_(ACTIVE_VISIT_STATUSES),
+                    Visit.start_time.is_not(None),
+                    Visit.end_time > datetime.utcnow(),
+                )
+                .order_by(Visit.start_time)
+            )
+            indexes: Dict[str, IntervalIndex] = defaultdict(IntervalIndex)
+            for visit_id, technician, start, end in result.all():
+                indexes[technician or ""].add(visit_id, start, end)
+            self._indexes[provider_id] = indexes
+            self._loaded_at[provider_id] = time.monotonic()
+        return self._indexes[provider_id]
+
+    async def index_for(self, db: AsyncSession, provider_id: str, technician: Optional[str]) -> IntervalIndex:
+        return (await self.technicians(db, provider_id))[technician or ""]
+
+    def invalidate(self, provider_id: str):
+        self._loaded_at.pop(provider_id, None)
+
+
+scheduler = VisitScheduler()
+
+
+def _local_hour_utc(day: date, hour: int) -> datetime:
+    """`hour` o'clock on `day` in VISIT_TIMEZONE, as naive UTC."""
+    local = datetime.combine(day, datetime.min.time(), ZoneInfo(settings.VISIT_TIMEZONE)) + timedelta(hours=hour)
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _working_windows(after: datetime, until: datetime, day_start_hour: int, day_end_hour: int):
+    """Each local working day's [start, end) between `after` and `until`, in naive UTC."""
+    day = after.replace(tzinfo=timezone.utc).astimezone(ZoneInfo(settings.VISIT_TIMEZONE)).date()
+    while True:
+        window_start = max(_local_hour_utc(day, day_start_hour), after)
+        window_end = min(_local_hour_utc(day, day_end_hour), until)
+        if window_start >= until:
+            return
+        if window_end > window_start:
+            yield window_start, window_end
+        day += timedelta(days=1)
+
+
+def next_free_slot(
+    index: IntervalIndex,
+    after: datetime,
+    duration: timedelta,
+    day_start_hour: int = 8,
+    day_end_hour: int = 18,
+    until: Optional[datetime] = None,
+) -> Optional[datetime]:
+    """
+    Earliest free start within working hours whose visit ends by `until`
+    (default MAX_SLOT_SEARCH_DAYS days after `after`).
+    """
+    if until is None:
+        until = after + timedelta(days=MAX_SLOT_SEARCH_DAYS)
+    for window_start, window_end in _working_windows(after, until, day_start_hour, day_end_hour):
+        start = index.next_free(window_start, duration, window_end)
+        if start is not None:
+            return start
+    return None
+
+
+async def _get_request(db: AsyncSession, request_id: str) -> MaintenanceRequest:
+    result = await db.execute(select(MaintenanceRequest).where(MaintenanceRequest.request_id == request_id))
+    req = result.scalar_one_or_none()
+    if not req:
+        raise HTTPException(status_code=404, detail="الطلب غير موجود")
+    return req
+
+
+def _conflict_error(index: IntervalIndex, start: datetime, duration: timedelta):
+    suggestion = next_free_slot(index, start, duration)
+    raise HTTPException(
+        status_code=409,
+        detail={
+            "message": "الفني لديه زيارة أخرى في هذا الوقت",
+            "next_free_slot": suggestion.isoformat() if suggestion else None,
+        },
+    )
+
+
+async def propose_visit(
+    db: AsyncSession,
+    provider_id: str,
+    request_id: str,
+    technician: Optional[str],
+    start: datetime,
+    duration: timedelta,
+    notes: Optional[str] = None,
+) -> Visit:
+    await _get_request(db, request_id)
+    index = await scheduler.index_for(db, provider_id, technician)
+    end = start + duration
+    if index.conflict(start, end):
+        _conflict_error(index, start, duration)
+
+    visit = Visit(
+        id=str(uuid.uuid4()),
+        request_id=request_id,
+        provider_id=provider_id,
+        technician_name=technician,
+        status="scheduled",
+        proposed_time=start,
+        start_time=start,
+        end_time=end,
+        notes=notes,
+    )
+    index.add(visit.id, start, end)  # reserve before yielding to other requests
+    try:
+        db.add(visit)
+        await db.commit()
+    except Exception:
+        index.remove(visit.id, start)
+        raise
+    return visit
+
+
+async def reschedule_visit(db: AsyncSession, visit: Visit, start: datetime, duration: timedelta) -> Visit:
+    index = await scheduler.index_for(db, visit.provider_id, visit.technician_name)
+    end = start + duration
+    if index.conflict(start, end, ignore_id=visit.id):
+        _conflict_error(index, start, duration)
+
+    old_start, old_end = visit.start_time, visit.end_time
+    index.remove(visit.id, old_start)
+    index.add(visit.id, start, end)
+    visit.proposed_time = start
+    visit.start_time = start
+    visit.end_time = end
+    visit.status = "scheduled"
+    visit.confirmed_by_resident = False  # the resident has to confirm the new time
+    try:
+        await db.commit()
+    except Exception:
+        index.remove(visit.id, start)
+        index.add(visit.id, old_start, old_end)
+        raise
+    return visit
+
+
+async def cancel_visit(db: AsyncSession, visit: Visit) -> Visit:
+    index = await scheduler.index_for(db, visit.provider_id, visit.technician_name)
+    visit.status = "cancelled"
+    await db.commit()
+    index.remove(visit.id, visit.start_time)
+    return visit
+
+
+async def schedule_batch(
+    db: AsyncSession,
+    provider_id: str,
+    request_ids: List[str],
+    technicians: List[str],
+    week_start: date,
+    duration: timedelta,
+    day_start_hour: int,
+    day_end_hour: int,
+) -> Tuple[List[Visit], List[str]]:
+    """
+    Greedily books each request (oldest first) on the technician who can
+    start it soonest within the week, using a heap of each technician's
+    next free slot. One multi-row INSERT; returns (visits, unscheduled ids).
+    """
+    result = await db.execute(
+        select(MaintenanceRequest.request_id)
+        .where(MaintenanceRequest.request_id.in_(request_ids))
+        .order_by(MaintenanceRequest.created_at, MaintenanceRequest.request_id)
+    )
+    ordered = result.scalars().all()
+    found = set(ordered)
+    unscheduled = [rid for rid in request_ids if rid not in found]
+
+    indexes = await scheduler.technicians(db, provider_id)
+    after = max(_local_hour_utc(week_start, 0), datetime.utcnow())
+    until = _local_hour_utc(week_start + timedelta(days=7), 0)
+
+    heap = []
+    for technician in dict.fromkeys(technicians):
+        slot = next_free_slot(indexes[technician], after, duration, day_start_hour, day_end_hour, until)
+        if slot is not None:
+            heap.append((slot, technician))
+    heapq.heapify(heap)
+
+    rows = []
+    booked = []
+    for request_id in ordered:
+        if not heap:
+            unscheduled.append(request_id)
+            continue
+        start, technician = heapq.heappop(heap)
+        end = start + duration
+        visit_id = str(uuid.uuid4())
+        indexes[technician].add(visit_id, start, end)
+        booked.append((technician, visit_id, start))
+        rows.append({
+            "id": visit_id,
+            "request_id": request_id,
+            "provider_id": provider_id,
+            "technician_name": technician,
+            "status": "scheduled",
+            "proposed_time": start,
+            "confirmed_by_resident": False,
+            "start_time": start,
+            "end_time": end,
+            "created_at": datetime.utcnow(),
+        })
+        slot = next_free_slot(indexes[technician], end, duration, day_start_hour, day_end_hour, until)
+        if slot is not None:
+            heapq.heappush(heap, (slot, technician))
+
+    if rows:
+        try:
+            await db.execute(insert(Visit), rows)
+            await db.commit()
+        except Exception:
+            for technician, visit_id, start in booked:
+                indexes[technician].remove(visit_id, start)
+            raise
+    visits = [Visit(**row) for row in rows]
+    return visits, unscheduled
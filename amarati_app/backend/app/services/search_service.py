@@ -0,0 +1,181 @@
+import asyncio
+import re
+import unicodedata
+from typing import List, Optional
+
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import upsert_insert
+from app.models.maintenance_request import MaintenanceRequest
+from app.models.maintenance_search import MaintenanceSearchDocument
+
+# ---- Arabic normalization ----
+_DIACRITICS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")  # tashkeel + tatweel
+_CHAR_MAP = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي",
+    "ؤ": "و",
+    "ة": "ه",
+    **{chr(0x0660 + d): str(d) for d in range(10)},  # Arabic-Indic digits
+})
+_TOKEN = re.compile(r"\w+")
+
+# Light stemming (in the spirit of Light10): strip common prefixes/suffixes
+# while keeping at least a two/three letter stem.
+_PREFIXES = ("وال", "بال", "كال", "فال", "لل", "ال")
+_SUFFIXES = ("ها", "ان", "ات", "ون", "ين", "يه", "ه", "ي")
+
+
+def normalize_arabic(value: str) -> str:
+    value = unicodedata.normalize("NFKC", value)
+    value = _DIACRITICS.sub("", value)
+    return value.translate(_CHAR_MAP).lower()
+
+
+def light_stem(token: str) -> str:
+    for prefix in _PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+            token = token[len(prefix):]
+            break
+    else:
+        if token.startswith("و") and len(token) > 3:
+            token = token[1:]
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            token = token[:-len(suffix)]
+            break
+    return token
+
+
+def search_tokens(value: str) -> List[str]:
+    return [light_stem(token) for token in _TOKEN.findall(normalize_arabic(value))]
+
+
+def search_document(category: str, description: str) -> str:
+    return " ".join(search_tokens(f"{category or ''} {description or ''}"))
+
+
+# ---- Index maintenance ----
+def upsert_search_documents(connection: Connection, rows: List[tuple]):
+    """Indexes (request_id, category, description) rows."""
+    stmt = upsert_insert(connection.dialect.name, MaintenanceSearchDocument)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[MaintenanceSearchDocument.request_id],
+        set_={"content": stmt.excluded.content},
+    )
+    connection.execute(
+        stmt,
+        [
+            {"request_id": request_id, "content": search_document(category, description)}
+            for request_id, category, description in rows
+        ],
+    )
+
+
+@event.listens_for(MaintenanceRequest, "after_insert")
+def _index_new_request(mapper, connection, target):
+    upsert_search_documents(connection, [(target.request_id, target.category, target.description)])
+
+
+@event.listens_for(MaintenanceRequest, "after_update")
+def _reindex_request(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.description.history.has_changes() or state.attrs.category.history.has_changes():
+        upsert_search_documents(connection, [(target.request_id, target.category, target.description)])
+
+
+async def rebuild_search_index(db: AsyncSession, batch_size: int = 1000) -> int:
+    """Re-indexes every maintenance request, e.g. after changing the normalization rules."""
+    indexed = 0
+    last_id = ""
+    while True:
+        result = await db.execute(
+            select(MaintenanceRequest.request_id, MaintenanceRequest.category, MaintenanceRequest.description)
+            .where(MaintenanceRequest.request_id > last_id)
+            .order_by(MaintenanceRequest.request_id)
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            break
+        connection = await db.connection()
+        await connection.run_sync(upsert_search_documents, [tuple(row) for row in rows])
+        await db.commit()
+        indexed += len(rows)
+        last_id = rows[-1].request_id
+    return indexed
+
+
+# ---- Querying ----
+async def search_requests(
+    db: AsyncSession,
+    query: str,
+    limit: int,
+    offset: int,
+    building_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+) -> List[MaintenanceRequest]:
+    """
+    Best matches first, among the requests of `building_id` and/or created
+    by `user_id` when given. Every query token must match (as a prefix of)
+    an indexed token.
+    """
+    tokens = [token for token in search_tokens(query) if token]
+    if not tokens:
+        return []
+
+    params = {"limit": limit, "offset": offset}
+    scope = ""
+    if building_id is not None:
+        scope += " AND r.building_id = :building_id"
+        params["building_id"] = building_id
+    if user_id is not None:
+        scope += " AND r.user_id = :user_id"
+        params["user_id"] = user_id
+
+    if db.bind.dialect.name == "postgresql":
+        stmt = text(
+            "SELECT d.request_id FROM maintenance_search_documents d "
+            "JOIN maintenance_requests r ON r.request_id = d.request_id "
+            "CROSS JOIN to_tsquery('simple', :q) AS q "
+            f"WHERE to_tsvector('simple', d.content) @@ q{scope} "
+            "ORDER BY ts_rank(to_tsvector('simple', d.content), q) DESC, d.request_id "
+            "LIMIT :limit OFFSET :offset"
+        )
+        params["q"] = " & ".join(f"{token}:*" for token in tokens)
+    else:
+        stmt = text(
+            "SELECT d.request_id FROM maintenance_search_fts "
+            "JOIN maintenance_search_documents d ON d.id = maintenance_search_fts.rowid "
+            "JOIN maintenance_requests r ON r.request_id = d.request_id "
+            f"WHERE maintenance_search_fts MATCH :q{scope} "
+            "ORDER BY bm25(maintenance_search_fts), d.request_id "
+            "LIMIT :limit OFFSET :offset"
+        )
+        params["q"] = " ".join(f'"{token}"*' for token in tokens)
+
+    result = await db.execute(stmt, params)
+    ranked_ids = result.scalars().all()
+    if not ranked_ids:
+        return []
+
+    result = await db.execute(
+        select(MaintenanceRequest).where(MaintenanceRequest.request_id.in_(ranked_ids))
+    )
+    by_id = {req.request_id: req for req in result.scalars().all()}
+    return [by_id[rid] for rid in ranked_ids if rid in by_id]
+
+
+async def _main():
+    from app.core.database import AsyncSessionLocal
+
+    async with AsyncSessionLocal() as db:
+        indexed = await rebuild_search_index(db)
+    print(f"Indexed {indexed} maintenance request(s)")
+
+
+if __name__ == "__main__":
+    # python -m app.services.search_service
+    asyncio.run(_main())
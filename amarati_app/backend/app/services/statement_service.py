@@ -0,0 +1,360 @@
+import asyncio
+import csv
+import io
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from difflib import SequenceMatcher
+from itertools import islice
+from typing import AbstractSet, AsyncIterator, BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select, update, case, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.payment import Payment, PaymentStatus
+from app.models.user import User
+from app.services.payment_service import AccountKey, add_ledger_delta, apply_ledger_deltas
+from app.services.search_service import search_tokens
+
+STATEMENT_CHUNK_SIZE = 5000
+DEFAULT_WINDOW_DAYS = 7
+FUZZY_THRESHOLD = 0.6
+FUZZY_MARGIN = 0.1
+FUZZY_MAX_CANDIDATES = 50  # words shared by more same-amount payments than this don't narrow anything
+
+_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d")
+# A full payment id, or the 8-character prefix printed on receipts
+_REFERENCE = re.compile(r"[0-9a-f]{8}(?:-[0-9a-f]{4}){3}-[0-9a-f]{12}|[0-9a-f]{8}")
+
+
+class StatementLine(NamedTuple):
+    line_no: int
+    posted_on: Optional[date]  # None when the row's date or amount can't be read
+    amount_cents: int
+    reference: str
+    description: str
+
+
+def _cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+def _parse_date(value: str, formats: List[str]) -> Optional[date]:
+    """Tries `formats` in order and moves the one that worked to the front (a statement sticks to one)."""
+    for i, fmt in enumerate(formats):
+        try:
+            parsed = datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+        if i:
+            formats.insert(0, formats.pop(i))
+        return parsed
+    return None
+
+
+def read_statement(file: BinaryIO) -> Iterator[StatementLine]:
+    """
+    Yields credit lines from a bank statement CSV with `date`, `amount` and
+    optional `reference` / `description` columns, reading the file lazily.
+    Debits and zero amounts are skipped; rows that can't be parsed are
+    yielded with posted_on=None so they end up in the report.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    fields = {name.strip().lower() for name in reader.fieldnames or []}
+    if not {"date", "amount"} <= fields:
+        raise HTTPException(status_code=400, detail="ملف كشف الحساب يجب أن يحتوي على الأعمدة date و amount")
+
+    date_formats = list(_DATE_FORMATS)
+    for line_no, row in enumerate(reader, start=2):
+        row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+        reference, description = row.get("reference", ""), row.get("description", "")
+        posted_on = _parse_date(row["date"], date_formats)
+        try:
+            amount = float(row["amount"].replace(",", ""))
+        except ValueError:
+            posted_on, amount = None, 0.0
+        if posted_on is None:
+            yield StatementLine(line_no, None, _cents(amount), reference, description)
+        elif amount > 0:
+            yield StatementLine(line_no, posted_on, _cents(amount), reference, description)
+
+
+async def _chunks(lines: Iterator[StatementLine], size: int) -> AsyncIterator[List[StatementLine]]:
+    """Reads and parses `size` lines at a time in a worker thread, off the event loop."""
+    while True:
+        chunk = await asyncio.to_thread(lambda: list(islice(lines, size)))
+        if not chunk:
+            return
+        yield chunk
+
+
+class _TokenCache(dict):
+    """search_tokens() memoised per load; payer names and descriptions repeat a lot."""
+
+    def __call__(self, value: Optional[str]) -> List[str]:
+        value = value or ""
+        if value not in self:
+            self[value] = search_tokens(value)
+        return self[value]
+
+
+class _Candidates:
+    """
+    Pending payments for a range of statement dates, hashed by amount in
+    cents (each bucket sorted by the last day the payment can be paid, so a
+    date probe is a bisect), by reference and by (amount, payer-name /
+    description token) for the fuzzy fallback.
+    """
+
+    def __init__(self, payments, settled, window: timedelta):
+        self.by_amount: Dict[int, list] = defaultdict(list)
+        self.by_reference: Dict[str, list] = defaultdict(list)
+        self.by_token: Dict[Tuple[int, str], list] = defaultdict(list)
+        self.windows: Dict[str, Tuple[int, int]] = {}
+        self.labels: Dict[str, Tuple[str, str]] = {}
+        self.claimed: set = set()
+        self.first_day: Optional[date] = None
+        self.last_day: Optional[date] = None
+        tokens = _TokenCache()
+        for payment in payments:
+            cents = _cents(payment.amount)
+            # Paid no earlier than `window` before it was raised and no later than `window` past its due date
+            opened = (payment.created_at.date() - window).toordinal()
+            closes = (max(payment.created_at, payment.due_date or payment.created_at).date() + window).toordinal()
+            self.windows[payment.id] = (opened, closes)
+            self.by_amount[cents].append((closes, payment.id, payment))
+            self.by_reference[payment.id.lower()].append(payment)
+            self.by_reference[payment.id[:8].lower()].append(payment)
+            name, description = tokens(payment.payer_name), tokens(payment.description)
+            self.labels[payment.id] = (" ".join(name), " ".join(description))
+            for token in set(name + description):
+                self.by_token[(cents, token)].append(payment)
+        for bucket in self.by_amount.values():
+            bucket.sort()
+        self.closes = {cents: [entry[0] for entry in bucket] for cents, bucket in self.by_amount.items()}
+        # (amount, day) of payments already completed in the range: a
+        # statement uploaded twice finds its lines here the second time
+        self.settled: Counter = Counter()
+        self.settled_references: Dict[str, Tuple[int, int]] = {}
+        for payment_id, amount, paid_at in settled:
+            key = (_cents(amount), paid_at.date().toordinal())
+            self.settled[key] += 1
+            self.settled_references[payment_id.lower()] = key
+            self.settled_references[payment_id[:8].lower()] = key
+
+    def _available(self, payments, posted_on: int):
+        for payment in payments:
+            opened, closes = self.windows[payment.id]
+            if opened <= posted_on <= closes and payment.id not in self.claimed:
+                yield payment
+
+    def _by_amount(self, cents: int, posted_on: int):
+        bucket = self.by_amount.get(cents, ())
+        start = bisect_left(self.closes.get(cents, ()), posted_on)
+        return self._available((bucket[i][2] for i in range(start, len(bucket))), posted_on)
+
+    def _similarity(self, matcher: SequenceMatcher, payment_id: str) -> float:
+        best = 0.0
+        for label in self.labels[payment_id]:
+            if not label:
+                continue
+            matcher.set_seq1(label)
+            # cheap upper bounds first; ratio() is the expensive part
+            if matcher.real_quick_ratio() > best and matcher.quick_ratio() > best:
+                best = max(best, matcher.ratio())
+        return best
+
+    def claim(self, payment):
+        self.claimed.add(payment.id)
+
+    def match(self, line: StatementLine):
+        """(payment, method) for a statement line, or (None, reason)."""
+        text = f"{line.reference} {line.description}".lower()
+        posted_on = line.posted_on.toordinal()
+        references = _REFERENCE.findall(text)
+        for reference in references:
+            for payment in self._available(self.by_reference.get(reference, ()), posted_on):
+                if _cents(payment.amount) == line.amount_cents:
+                    return payment, "reference"
+
+        settled = next(
+            (
+                self.settled_references[reference] for reference in references
+                if self.settled_references.get(reference, (None,))[0] == line.amount_cents
+            ),
+            (line.amount_cents, posted_on),
+        )
+        if self.settled[settled] > 0:
+            self.settled[settled] -= 1
+            return None, "already_paid"
+
+        # stop at the second candidate: only a unique amount is a match
+        found = list(islice(self._by_amount(line.amount_cents, posted_on), 2))
+        if not found:
+            return None, "no_pending_payment"
+        if len(found) == 1:
+            return found[0], "amount"
+
+        # Several pending payments of this amount: shortlist those sharing a
+        # distinctive word with the line (one that few of them have), then
+        # take the payer name / description that reads most like the line,
+        # if it clearly beats the runner-up
+        tokens = search_tokens(text)
+        shortlist: Dict[str, object] = {}
+        for token in set(tokens):
+            bucket = self.by_token.get((line.amount_cents, token), ())
+            if len(bucket) <= FUZZY_MAX_CANDIDATES:
+                for payment in self._available(bucket, posted_on):
+                    shortlist[payment.id] = payment
+
+        matcher = SequenceMatcher(None, b=" ".join(tokens))
+        ratios = sorted((self._similarity(matcher, payment_id), payment_id) for payment_id in shortlist)
+        if ratios and ratios[-1][0] >= FUZZY_THRESHOLD:
+            if len(ratios) == 1 or ratios[-1][0] - ratios[-2][0] >= FUZZY_MARGIN:
+                return shortlist[ratios[-1][1]], "fuzzy"
+        return None, "ambiguous"
+
+
+async def _load_candidates(
+    db: AsyncSession,
+    building_id: str,
+    first_day: date,
+    last_day: date,
+    window: timedelta,
+    completed_here: AbstractSet[str] = frozenset(),
+) -> _Candidates:
+    """
+    The building's pending payments that could have been paid between
+    first_day and last_day, and the payments already completed in that
+    range other than `completed_here` (those this run completed, which
+    must not turn the statement's later lines into already_paid).
+    """
+    first = datetime.combine(first_day, datetime.min.time())
+    last = datetime.combine(last_day, datetime.min.time())
+    result = await db.execute(
+        select(
+            Payment.id,
+            Payment.amount,
+            Payment.created_at,
+            Payment.due_date,
+            Payment.receiver_id,
+            Payment.building_id,
+            Payment.description,
+            User.name.label("payer_name"),
+        )
+        .outerjoin(User, User.user_id == Payment.payer_id)
+        .where(
+            Payment.building_id == building_id,
+            Payment.status == PaymentStatus.pending,
+            Payment.created_at <= last + window + timedelta(days=1),
+            func.coalesce(Payment.due_date, Payment.created_at) >= first - window - timedelta(days=1),
+        )
+    )
+    pending = result.all()
+    result = await db.execute(
+        select(Payment.id, Payment.amount, Payment.paid_at).where(
+            Payment.building_id == building_id,
+            Payment.status == PaymentStatus.completed,
+            Payment.paid_at >= first,
+            Payment.paid_at < last + timedelta(days=1),
+        )
+    )
+    settled = [row for row in result.all() if row.id not in completed_here]
+    candidates = _Candidates(pending, settled, window)
+    candidates.first_day, candidates.last_day = first_day, last_day
+    return candidates
+
+
+def _unmatched(line: StatementLine, reason: str) -> dict:
+    return {
+        "line": line.line_no,
+        "date": line.posted_on.isoformat() if line.posted_on else None,
+        "amount": line.amount_cents / 100,
+        "reference": line.reference,
+        "description": line.description,
+        "reason": reason,
+    }
+
+
+async def reconcile_statement(
+    db: AsyncSession,
+    building_id: str,
+    file: BinaryIO,
+    window_days: int = DEFAULT_WINDOW_DAYS,
+    chunk_size: int = STATEMENT_CHUNK_SIZE,
+) -> dict:
+    """
+    Matches bank statement credits to the building's pending payments and
+    marks the matches completed (paid_at = statement date). Per chunk of
+    lines: an in-memory hash join on reference / amount and date window,
+    one guarded UPDATE, one ledger upsert and a commit. The pending
+    payments are queried once and only re-read when a chunk's dates fall
+    outside the range already loaded. A payment matches at most one line.
+    """
+    window = timedelta(days=window_days)
+    report = {
+        "lines": 0,
+        "matched": 0,
+        "by_method": {"reference": 0, "amount": 0, "fuzzy": 0},
+        "matches": [],
+        "unmatched": [],
+    }
+
+    candidates: Optional[_Candidates] = None
+    completed_here: set = set()
+    async for chunk in _chunks(read_statement(file), chunk_size):
+        report["lines"] += len(chunk)
+        report["unmatched"].extend(_unmatched(line, "invalid") for line in chunk if line.posted_on is None)
+        chunk = [line for line in chunk if line.posted_on is not None]
+        if not chunk:
+            continue
+        first_day = min(line.posted_on for line in chunk)
+        last_day = max(line.posted_on for line in chunk)
+        if candidates is None or not (candidates.first_day <= first_day and last_day <= candidates.last_day):
+            candidates = await _load_candidates(db, building_id, first_day, last_day, window, completed_here)
+        matched: Dict[str, tuple] = {}
+        for line in chunk:
+            payment, method = candidates.match(line)
+            if payment is None:
+                report["unmatched"].append(_unmatched(line, method))
+                continue
+            candidates.claim(payment)
+            matched[payment.id] = (payment, line, method)
+        if not matched:
+            continue
+
+        # paid_at is the statement date: one CASE branch per day in the chunk
+        by_day: Dict[date, List[str]] = defaultdict(list)
+        for payment_id, (_, line, _) in matched.items():
+            by_day[line.posted_on].append(payment_id)
+        paid_at = case(*(
+            (Payment.id.in_(payment_ids), datetime.combine(day, datetime.min.time()))
+            for day, payment_ids in by_day.items()
+        ))
+        result = await db.execute(
+            update(Payment)
+            .where(Payment.id.in_(list(matched)), Payment.status == PaymentStatus.pending)
+            .values(status=PaymentStatus.completed, paid_at=paid_at)
+            .returning(Payment.id)
+            .execution_options(synchronize_session=False)
+        )
+        updated = set(result.scalars().all())
+        completed_here |= updated
+
+        deltas: Dict[AccountKey, dict] = {}
+        for payment_id, (payment, line, method) in matched.items():
+            if payment_id not in updated:
+                # paid by someone else since the chunk's candidates were read
+                report["unmatched"].append(_unmatched(line, "already_paid"))
+                continue
+            add_ledger_delta(deltas, payment, PaymentStatus.pending, PaymentStatus.completed)
+            report["by_method"][method] += 1
+            report["matches"].append({"line": line.line_no, "payment_id": payment_id, "method": method})
+        await apply_ledger_deltas(db, deltas)
+        await db.commit()
+
+    report["matched"] = len(report["matches"])
+    report["unmatched"].sort(key=lambda entry: entry["line"])
+    return report
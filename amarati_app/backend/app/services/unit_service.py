@@ -0,0 +1,171 @@
+import csv
+import io
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator, BinaryIO, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import select, insert, update, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.building import Building, UnitInvite
+from app.models.unit import Unit
+
+MAX_UNITS_PER_IMPORT = 50_000
+INSERT_BATCH_SIZE = 1000
+_LOOKUP_BATCH_SIZE = 5000
+
+# (floor, unit_number)
+UnitSpec = Tuple[int, str]
+
+
+def new_invite_code() -> str:
+    return secrets.token_urlsafe(6).upper()[:8]
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def layout_units(floors: int, units_per_floor: int, first_floor: int = 1) -> List[UnitSpec]:
+    """Numbers units floor by floor: 101, 102, ... 201, 202, ..."""
+    width = max(2, len(str(units_per_floor)))
+    return [
+        (floor, f"{floor}{index:0{width}d}")
+        for floor in range(first_floor, first_floor + floors)
+        for index in range(1, units_per_floor + 1)
+    ]
+
+
+def parse_units_csv(file: BinaryIO) -> List[UnitSpec]:
+    """Reads a CSV with `floor` and `unit_number` columns."""
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding="utf-8-sig", newline=""))
+    fields = {name.strip().lower() for name in reader.fieldnames or []}
+    if not {"floor", "unit_number"} <= fields:
+        raise HTTPException(status_code=400, detail="ملف CSV يجب أن يحتوي على الأعمدة floor و unit_number")
+
+    units: List[UnitSpec] = []
+    for line_no, row in enumerate(reader, start=2):
+        row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+        try:
+            floor = int(row["floor"])
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"رقم الطابق غير صالح في السطر {line_no}")
+        if not row["unit_number"]:
+            raise HTTPException(status_code=400, detail=f"رقم الوحدة مفقود في السطر {line_no}")
+        units.append((floor, row["unit_number"]))
+        if len(units) > MAX_UNITS_PER_IMPORT:
+            break
+    return units
+
+
+async def validate_new_units(db: AsyncSession, building_id: str, units: List[UnitSpec]):
+    """Rejects oversize imports and unit numbers that repeat or already exist in the building."""
+    if not units:
+        raise HTTPException(status_code=400, detail="لا توجد وحدات للإضافة")
+    if len(units) > MAX_UNITS_PER_IMPORT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"الحد الأقصى {MAX_UNITS_PER_IMPORT} وحدة في العملية الواحدة",
+        )
+
+    numbers = [number for _, number in units]
+    if len(set(numbers)) != len(numbers):
+        raise HTTPException(status_code=400, detail="أرقام الوحدات مكررة في الملف")
+
+    for chunk in _chunks(numbers, _LOOKUP_BATCH_SIZE):
+        result = await db.execute(
+            select(Unit.unit_number)
+            .where(Unit.building == building_id, Unit.unit_number.in_(chunk))
+            .limit(5)
+        )
+        existing = result.scalars().all()
+        if existing:
+            raise HTTPException(
+                status_code=409,
+                detail=f"الوحدات موجودة مسبقاً: {', '.join(existing)}",
+            )
+
+
+async def generate_invite_codes(db: AsyncSession, count: int) -> List[str]:
+    """Generates `count` invite codes unique among themselves and against unit_invites."""
+    codes: set = set()
+    while len(codes) < count:
+        candidates = {new_invite_code() for _ in range(count - len(codes))} - codes
+        batch = list(candidates)
+        for chunk in _chunks(batch, _LOOKUP_BATCH_SIZE):
+            result = await db.execute(
+                select(UnitInvite.invite_code).where(UnitInvite.invite_code.in_(chunk))
+            )
+            candidates.difference_update(result.scalars().all())
+        codes |= candidates
+    return list(codes)
+
+
+async def provision_units(
+    db: AsyncSession,
+    building: Building,
+    units: List[UnitSpec],
+    created_by: str,
+    invite_expires_in_days: Optional[int] = None,
+) -> AsyncIterator[dict]:
+    """
+    Creates Unit and UnitInvite rows in batched multi-row INSERTs within one
+    transaction. Yields a progress event after every batch, then a final
+    "done" event carrying the generated invite codes.
+    Call validate_new_units() first.
+    """
+    total = len(units)
+    codes = await generate_invite_codes(db, total)
+    now = datetime.utcnow()
+    expires_at = now + timedelta(days=invite_expires_in_days) if invite_expires_in_days else None
+
+    invites = []
+    created = 0
+    try:
+        for chunk in _chunks(list(zip(units, codes)), INSERT_BATCH_SIZE):
+            unit_rows = []
+            invite_rows = []
+            for (floor, unit_number), code in chunk:
+                unit_id = str(uuid.uuid4())
+                unit_rows.append({
+                    "unit_id": unit_id,
+                    "building": building.id,
+                    "floor": floor,
+                    "unit_number": unit_number,
+                })
+                invite_rows.append({
+                    "id": str(uuid.uuid4()),
+                    "unit_id": unit_id,
+                    "invite_code": code,
+                    "created_by": created_by,
+                    "is_used": False,
+                    "expires_at": expires_at,
+                    "created_at": now,
+                })
+                invites.append({"unit_id": unit_id, "floor": floor, "unit_number": unit_number, "invite_code": code})
+
+            await db.execute(insert(Unit), unit_rows)
+            await db.execute(insert(UnitInvite), invite_rows)
+            created += len(chunk)
+            yield {"event": "progress", "created": created, "total": total}
+
+        await db.execute(
+            update(Building)
+            .where(Building.id == building.id)
+            .values(total_units=func.coalesce(Building.total_units, 0) + created)
+        )
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+
+    yield {
+        "event": "done",
+        "status": "done",
+        "created_units": created,
+        "created_invites": created,
+        "invites": invites,
+    }
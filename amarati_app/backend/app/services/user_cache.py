@@ -0,0 +1,107 @@
+import copy
+import enum
+import uuid
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.cache import CacheBackend, create_cache_backend
+from app.core.config import settings
+from app.models.user import User, UserRole
+
+_backend: CacheBackend = create_cache_backend(
+    "users",
+    max_entries=settings.USER_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+)
+# Never cached: get_current_user callers have no use for it, and a shared
+# backend would otherwise hold every user's password hash
+_EXCLUDED_COLUMNS = {"password"}
+
+
+def set_user_cache_backend(backend: CacheBackend):
+    """Swap the cache backend, e.g. for a shared store in multi-worker deployments."""
+    global _backend
+    _backend = backend
+
+
+def _cache_key(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def _generation_key(user_id: str) -> str:
+    return f"user-gen:{user_id}"
+
+
+def _snapshot(user: User) -> dict:
+    """JSON-serialisable copy of the user's column values (without the password hash)."""
+    data = {}
+    for column in User.__table__.columns:
+        if column.key in _EXCLUDED_COLUMNS:
+            continue
+        value = getattr(user, column.key)
+        if isinstance(value, enum.Enum):
+            value = value.value
+        data[column.key] = copy.deepcopy(value)
+    return data
+
+
+async def _attach(db: AsyncSession, data: dict) -> User:
+    """
+    Rebuild a persistent User in this session from a snapshot, without a
+    SELECT. Columns left out of the snapshot stay unloaded.
+    """
+    data = copy.deepcopy(data)
+    if data.get("role") is not None:
+        data["role"] = UserRole(data["role"])
+    user = User(**data)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+
+async def _generation(user_id: str) -> str:
+    """The user's current cache generation, created if there is none."""
+    key = _generation_key(user_id)
+    generation = await _backend.get(key)
+    if generation is None:
+        generation = uuid.uuid4().hex
+        if not await _backend.add(key, generation, ttl=2 * settings.USER_CACHE_TTL_SECONDS):
+            generation = await _backend.get(key)
+    return generation
+
+
+async def load_user(db: AsyncSession, user_id: str) -> Optional[User]:
+    """
+    Returns the user attached to `db`, served from the cache when possible.
+    The returned object can be modified and committed like any loaded row.
+
+    Entries are tagged with the user's cache generation as it was before
+    the row was read. invalidate_user() replaces the generation, so a row
+    read before an invalidation can't be served after it even if it is
+    stored afterwards.
+    """
+    if settings.USER_CACHE_TTL_SECONDS <= 0:
+        result = await db.execute(select(User).where(User.user_id == user_id))
+        return result.scalar_one_or_none()
+
+    generation, entry = await _backend.get_many([_generation_key(user_id), _cache_key(user_id)])
+    if entry is not None and generation is not None and entry["generation"] == generation:
+        return await _attach(db, entry["user"])
+
+    generation = await _generation(user_id)
+    result = await db.execute(select(User).where(User.user_id == user_id))
+    user = result.scalar_one_or_none()
+    if user is not None and generation is not None:
+        await _backend.set(_cache_key(user_id), {"generation": generation, "user": _snapshot(user)})
+    return user
+
+
+async def invalidate_user(user_id: str):
+    """
+    Drop the cached row, in every worker sharing the backend. Call after
+    committing any change to the user.
+    """
+    await _backend.set(_generation_key(user_id), uuid.uuid4().hex, ttl=2 * settings.USER_CACHE_TTL_SECONDS)
+    await _backend.delete(_cache_key(user_id))
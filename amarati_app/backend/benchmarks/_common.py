@@ -0,0 +1,26 @@
+"""
+Shared setup for the benchmark scripts. Run them from amarati_app/backend,
+e.g. `python -m benchmarks.login_storm`. Each script works on its own
+scratch SQLite database and never touches amarati.db.
+"""
+import math
+import os
+import tempfile
+from typing import Sequence
+
+
+def use_scratch_database(name: str) -> str:
+    """Points the app at a fresh SQLite file. Call before importing anything from app."""
+    path = os.path.join(tempfile.gettempdir(), f"amarati-bench-{name}.db")
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{path}"
+    os.environ.setdefault("DB_PROFILE", "sqlite-prod")
+    os.environ.setdefault("SQL_INSTRUMENTATION", "false")
+    return path
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1)]
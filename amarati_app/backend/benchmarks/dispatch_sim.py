@@ -0,0 +1,142 @@
+"""
+Dispatch simulation (user-014): providers with limited capacity, a stream
+of new requests dispatched the way the create endpoint does it
+(dispatcher.dispatch, commit, apply_committed_changes), more of them than
+there is capacity so the rest wait, then providers accepting and finishing
+(or declining) jobs through apply_status_transition, where each freed slot
+is filled from the waiting queue by assign_waiting.
+
+    python -m benchmarks.dispatch_sim [--providers 200] [--requests 5000] [--completions 2000]
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from datetime import datetime
+
+from benchmarks._common import percentile, use_scratch_database
+
+use_scratch_database("dispatch_sim")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.database import AsyncSessionLocal, dispose_engines, upgrade_schema  # noqa: E402
+from app.models.maintenance import ProviderProfile  # noqa: E402
+from app.models.maintenance_request import MaintenanceRequest  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.services.dispatch_service import dispatcher  # noqa: E402
+from app.services.maintenance_service import apply_status_transition  # noqa: E402
+
+SPECIALIZATIONS = [f"تخصص{i}" for i in range(20)]
+DECLINE_PROBABILITY = 0.1  # chance that a provider rejects a job instead of doing it
+
+
+async def seed(db, rng: random.Random, providers: int):
+    await db.execute(insert(User), [
+        {"user_id": "bench-tenant", "name": "bench", "phone": "0500000000", "password": "x", "role": UserRole.tenant},
+        *(
+            {"user_id": f"provider-{i}", "name": "bench", "phone": f"06{i:08d}", "password": "x",
+             "role": UserRole.provider}
+            for i in range(providers)
+        ),
+    ])
+    await db.execute(insert(ProviderProfile), [
+        {
+            "id": str(uuid.uuid4()), "user_id": f"provider-{i}", "rating": rng.uniform(2, 5),
+            "avg_response_time_hours": rng.choice([None, rng.uniform(0.5, 48)]),
+            "is_verified": rng.random() < 0.3, "specialization": "، ".join(rng.sample(SPECIALIZATIONS, 2)),
+        }
+        for i in range(providers)
+    ])
+    await db.commit()
+
+
+async def waiting_count(db) -> int:
+    return await db.scalar(
+        select(func.count()).select_from(MaintenanceRequest).where(
+            MaintenanceRequest.assigned_provider_id.is_(None), MaintenanceRequest.status == "pending",
+        )
+    )
+
+
+async def create_requests(db, rng: random.Random, requests: int):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        req = MaintenanceRequest(
+            request_id=str(uuid.uuid4()), description="عطل", category=rng.choice(SPECIALIZATIONS),
+            status="pending", user_id="bench-tenant", created_at=datetime.utcnow(),
+        )
+        db.add(req)
+        changes = await dispatcher.dispatch(req)
+        await db.commit()
+        await dispatcher.apply_committed_changes(db, changes)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def finish_jobs(db, rng: random.Random, completions: int):
+    """Each round one provider accepts and completes (or declines) one of its jobs."""
+    latencies = []
+    declines = 0
+    for _ in range(completions):
+        result = await db.execute(
+            select(MaintenanceRequest.request_id, MaintenanceRequest.assigned_provider_id)
+            .where(MaintenanceRequest.assigned_provider_id.is_not(None), MaintenanceRequest.status == "pending")
+            .order_by(func.random())
+            .limit(1)
+        )
+        row = result.first()
+        if row is None:
+            break
+        request_id, provider_id = row
+        start = time.perf_counter()
+        if rng.random() < DECLINE_PROBABILITY:
+            await apply_status_transition(db, [request_id], "rejected", provider_id)
+            declines += 1
+        else:
+            await apply_status_transition(db, [request_id], "accepted", provider_id)
+            await apply_status_transition(db, [request_id], "completed", provider_id)
+        latencies.append(time.perf_counter() - start)
+    return latencies, declines
+
+
+def report(label: str, latencies):
+    total = sum(latencies)
+    print(
+        f"  {label:22s} {len(latencies):6d} in {total:6.2f} s  {len(latencies) / total:7.0f}/s"
+        f"  p50 {percentile(latencies, 50) * 1000:5.2f} ms  p99 {percentile(latencies, 99) * 1000:5.2f} ms"
+    )
+
+
+async def run(providers: int, requests: int, completions: int, seed_value: int):
+    rng = random.Random(seed_value)
+    await upgrade_schema()
+    async with AsyncSessionLocal() as db:
+        await seed(db, rng, providers)
+        print(f"{providers} providers, capacity {providers * settings.DISPATCH_MAX_ACTIVE_JOBS} jobs")
+
+        report("dispatch new requests", await create_requests(db, rng, requests))
+        waiting = await waiting_count(db)
+        print(f"  {requests - waiting} assigned, {waiting} waiting")
+
+        latencies, declines = await finish_jobs(db, rng, completions)
+        report("finish / decline jobs", latencies)
+        print(f"  {declines} declined, {waiting - await waiting_count(db)} taken off the waiting queue")
+    await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--providers", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--completions", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(run(args.providers, args.requests, args.completions, args.seed))
+
+
+if __name__ == "__main__":
+    main()
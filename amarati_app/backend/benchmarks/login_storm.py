@@ -0,0 +1,83 @@
+"""
+Login storm (user-006): latency of an unrelated GET / while other clients
+log in, with bcrypt run inline on the event loop (--inline, the old
+behaviour) or in the password worker pool. The app is driven in-process
+through httpx.ASGITransport.
+
+    python -m benchmarks.login_storm [--inline] [--logins 40] [--login-clients 4] [--get-clients 4]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks._common import percentile, use_scratch_database
+
+use_scratch_database("login_storm")
+
+import httpx  # noqa: E402
+
+from app.core.database import upgrade_schema  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.auth_service import password_pool  # noqa: E402
+
+PHONE, PASSWORD = "0500000000", "bench-password"
+
+
+async def main(args):
+    if args.inline:
+        async def run_inline(fn, *fn_args):
+            return fn(*fn_args)
+        password_pool.run = run_inline
+
+    await upgrade_schema()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post(
+            "/api/v1/auth/register", json={"name": "bench", "phone": PHONE, "password": PASSWORD}
+        )
+        response.raise_for_status()
+
+        remaining = args.logins
+        login_times, get_times = [], []
+        done = asyncio.Event()
+
+        async def login_client():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                response = await client.post("/api/v1/auth/login", json={"phone": PHONE, "password": PASSWORD})
+                response.raise_for_status()
+                login_times.append(time.perf_counter() - start)
+
+        async def get_client():
+            while not done.is_set():
+                start = time.perf_counter()
+                (await client.get("/")).raise_for_status()
+                get_times.append(time.perf_counter() - start)
+                await asyncio.sleep(0.005)
+
+        getters = [asyncio.create_task(get_client()) for _ in range(args.get_clients)]
+        start = time.perf_counter()
+        await asyncio.gather(*(login_client() for _ in range(args.login_clients)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await asyncio.gather(*getters)
+
+    mode = "inline bcrypt" if args.inline else f"{password_pool.executor_type} pool x{password_pool.max_workers}"
+    print(f"{mode}: {args.logins} logins in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s)")
+    print(f"  login  p50 {percentile(login_times, 50) * 1000:7.1f} ms  p99 {percentile(login_times, 99) * 1000:7.1f} ms")
+    print(f"  GET /  p50 {percentile(get_times, 50) * 1000:7.1f} ms  p99 {percentile(get_times, 99) * 1000:7.1f} ms"
+          f"  ({len(get_times)} requests)")
+    if not args.inline:
+        print(f"  pool {password_pool.stats()}")
+    password_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--inline", action="store_true", help="hash on the event loop (behaviour before user-006)")
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--login-clients", type=int, default=4)
+    parser.add_argument("--get-clients", type=int, default=4)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,112 @@
+"""
+Monthly billing run (user-020): bills and reminders for every occupied
+unit in batched multi-row INSERTs, then the same period again (a resume,
+which inserts nothing), one building on its own, and for comparison the
+per-row ORM adds with a commit per unit that the batches replace.
+
+    python -m benchmarks.monthly_billing [--units 100000] [--orm-units 5000]
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks._common import use_scratch_database
+
+use_scratch_database("monthly_billing")
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.database import AsyncSessionLocal, dispose_engines, upgrade_schema  # noqa: E402
+from app.models.bill import Bill  # noqa: E402
+from app.models.payment import BillingReminder  # noqa: E402
+from app.models.unit import Unit  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.services.billing_service import bill_id_for, due_date_for, parse_period, run_billing  # noqa: E402
+
+PERIOD = "2030-01"
+INSERT_BATCH = 5000
+UNITS_PER_BUILDING = 100
+
+
+async def seed(db, units: int):
+    """Nine units in ten occupied; one in seven without a monthly_rent."""
+    await db.execute(insert(User), [
+        {"user_id": "bench", "name": "bench", "phone": "0500000000", "password": "x", "role": UserRole.tenant}
+    ])
+    rows = [
+        {
+            "unit_id": str(uuid.uuid4()), "building": f"b{i // UNITS_PER_BUILDING}", "floor": 1,
+            "unit_number": str(i % UNITS_PER_BUILDING), "user_id": "bench" if i % 10 else None,
+            "monthly_rent": 1500.0 if i % 7 else None,
+        }
+        for i in range(units)
+    ]
+    for start in range(0, units, INSERT_BATCH):
+        await db.execute(insert(Unit), rows[start:start + INSERT_BATCH])
+    await db.commit()
+
+
+async def per_row_orm(db, units: int) -> float:
+    """The baseline: one Bill and its reminders added through the ORM and committed per unit."""
+    result = await db.execute(
+        select(Unit.unit_id, Unit.user_id).where(Unit.user_id.is_not(None)).order_by(Unit.unit_id).limit(units)
+    )
+    rows = result.all()
+    period = "2031-01"
+    due_date = due_date_for(parse_period(period))
+    start = time.perf_counter()
+    for unit_id, user_id in rows:
+        bill_id = bill_id_for(unit_id, period)
+        db.add(Bill(
+            bill_id=bill_id, amount=1500.0, due_date=due_date,
+            period=period, user_id=user_id, unit_id=unit_id,
+        ))
+        for offset in settings.BILLING_REMINDER_OFFSETS_DAYS:
+            remind_at = datetime.combine(due_date - timedelta(days=offset), datetime.min.time())
+            db.add(BillingReminder(bill_id=bill_id, user_id=user_id, remind_at=remind_at))
+        await db.commit()
+    return len(rows) / (time.perf_counter() - start)
+
+
+async def run(units: int, orm_units: int):
+    await upgrade_schema()
+    async with AsyncSessionLocal() as db:
+        await seed(db, units)
+
+        start = time.perf_counter()
+        stats = await run_billing(db, PERIOD, default_amount=1200.0)
+        elapsed = time.perf_counter() - start
+        print(f"{units} units")
+        print(f"  first run         {elapsed:6.2f} s  {stats['units'] / elapsed:8,.0f} units/s  {stats}")
+
+        start = time.perf_counter()
+        stats = await run_billing(db, PERIOD, default_amount=1200.0)
+        print(f"  re-run / resume   {time.perf_counter() - start:6.2f} s  {stats}")
+
+        bills = await db.scalar(select(func.count()).select_from(Bill))
+        reminders = await db.scalar(select(func.count()).select_from(BillingReminder))
+        print(f"  rows              {bills} bills, {reminders} reminders")
+
+        start = time.perf_counter()
+        stats = await run_billing(db, "2030-02", building_id="b5")
+        print(f"  one building      {(time.perf_counter() - start) * 1000:6.1f} ms  {stats}")
+
+        if orm_units:
+            rate = await per_row_orm(db, orm_units)
+            print(f"  per-row ORM adds  {rate:8,.0f} units/s  ({orm_units} units)")
+    await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--units", type=int, default=100000)
+    parser.add_argument("--orm-units", type=int, default=5000, help="0 skips the per-row comparison")
+    args = parser.parse_args()
+    asyncio.run(run(args.units, args.orm_units))
+
+
+if __name__ == "__main__":
+    main()
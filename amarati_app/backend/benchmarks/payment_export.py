@@ -0,0 +1,142 @@
+"""
+Payment export (user-021): streams a building's payments as CSV or NDJSON
+from a uvicorn server in a subprocess and samples the server's resident
+memory (Linux /proc) while the body downloads. Memory should level off
+however many rows are exported: each pooled SQLite connection fills its
+page cache (anonymous, up to cache_size) and its mmap of the database
+file (file-backed, up to mmap_size) once, and it stays there.
+
+    python -m benchmarks.payment_export [--payments 1000000] [--formats csv ndjson]
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Tuple
+
+from benchmarks._common import use_scratch_database
+
+use_scratch_database("payment_export")
+
+import httpx  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from app.core.database import AsyncSessionLocal, dispose_engines, upgrade_schema  # noqa: E402
+from app.models.building import Building  # noqa: E402
+from app.models.payment import Payment, PaymentStatus, PaymentType  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.services.auth_service import create_access_token  # noqa: E402
+
+PORT = 8765
+INSERT_BATCH = 20000
+OWNER_ID, BUILDING_ID = "bench-owner", "bench-building"
+
+
+async def seed(payments: int):
+    await upgrade_schema()
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(User), [{
+            "user_id": OWNER_ID, "name": "bench", "phone": "0500000000", "password": "x",
+            "role": UserRole.owner,
+        }])
+        await db.execute(insert(Building), [{"id": BUILDING_ID, "name": "bench", "owner_id": OWNER_ID, "invite_code": "BENCH"}])
+        start = datetime(2025, 1, 1)
+        for offset in range(0, payments, INSERT_BATCH):
+            await db.execute(insert(Payment), [
+                {
+                    "id": str(uuid.uuid4()), "amount": 100.0 + i % 50, "payment_type": PaymentType.rent,
+                    "status": PaymentStatus.completed, "payer_id": f"payer-{i % 300}", "receiver_id": OWNER_ID,
+                    "building_id": BUILDING_ID, "description": "إيجار شهري",
+                    "created_at": start + timedelta(seconds=30 * i),
+                }
+                for i in range(offset, min(payments, offset + INSERT_BATCH))
+            ])
+        await db.commit()
+    await dispose_engines()
+
+
+def rss_mb(pid: int) -> Tuple[int, int]:
+    """(anonymous, file-backed) resident MB; the file-backed part is SQLite's mmap of the database."""
+    with open(f"/proc/{pid}/status") as status:
+        sizes = {line.split(":")[0]: int(line.split()[1]) // 1024 for line in status if line.startswith("Rss")}
+    return sizes["RssAnon"], sizes["RssFile"]
+
+
+async def wait_until_up(client: httpx.AsyncClient, server: subprocess.Popen):
+    for _ in range(100):
+        if server.poll() is not None:
+            raise RuntimeError("the server exited during startup")
+        try:
+            await client.get("/")
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("the server did not start")
+
+
+async def export(client: httpx.AsyncClient, server: subprocess.Popen, export_format: str):
+    token = create_access_token(OWNER_ID, UserRole.owner.value)
+    samples = []
+    sampling = threading.Event()
+
+    def sample():
+        while not sampling.is_set():
+            samples.append(rss_mb(server.pid))
+            time.sleep(0.05)
+
+    baseline = rss_mb(server.pid)
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    start = time.perf_counter()
+    size = lines = 0
+    try:
+        async with client.stream(
+            "GET", f"/api/v1/payments/export?format={export_format}&building_id={BUILDING_ID}",
+            headers={"Authorization": f"Bearer {token}"},
+        ) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                lines += chunk.count(b"\n")
+    finally:
+        sampling.set()
+        sampler.join()
+    elapsed = time.perf_counter() - start
+    anon = max((sample[0] for sample in samples), default=baseline[0])
+    mapped = max((sample[1] for sample in samples), default=baseline[1])
+    print(
+        f"  {export_format:6s} {lines:9d} lines  {size / 1e6:6.0f} MB  {elapsed:6.1f} s"
+        f"  server RSS anon {baseline[0]} -> {anon} MB peak, file {baseline[1]} -> {mapped} MB peak"
+    )
+
+
+async def run(payments: int, formats):
+    await seed(payments)
+    print(f"{payments} payments")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(PORT), "--log-level", "warning"],
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=None) as client:
+            await wait_until_up(client, server)
+            for export_format in formats:
+                await export(client, server, export_format)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--payments", type=int, default=1000000)
+    parser.add_argument("--formats", nargs="+", choices=["csv", "ndjson"], default=["csv", "ndjson"])
+    args = parser.parse_args()
+    asyncio.run(run(args.payments, args.formats))
+
+
+if __name__ == "__main__":
+    main()
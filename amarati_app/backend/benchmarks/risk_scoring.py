@@ -0,0 +1,111 @@
+"""
+Unit risk scoring (user-016): load the maintenance history of every unit,
+score them all with NumPy, and bulk-write the changed rows; compared with
+scoring the same history one unit at a time in plain Python.
+
+    python -m benchmarks.risk_scoring [--units 100000] [--requests 300000]
+"""
+import argparse
+import asyncio
+import math
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks._common import use_scratch_database
+
+use_scratch_database("risk_scoring")
+
+from sqlalchemy import insert  # noqa: E402
+
+from app.core.database import AsyncSessionLocal, dispose_engines, upgrade_schema  # noqa: E402
+from app.models.maintenance_request import MaintenanceRequest  # noqa: E402
+from app.models.unit import Unit  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.services import risk_service  # noqa: E402
+
+CATEGORIES = ["كهرباء", "سباكة", "تكييف", "نظافة", "غاز", "نجارة"]
+INSERT_BATCH = 5000
+
+
+async def seed(db, rng: random.Random, units: int, requests: int, now: datetime):
+    await db.execute(insert(User), [
+        {"user_id": "bench", "name": "bench", "phone": "0500000000", "password": "x", "role": UserRole.tenant}
+    ])
+    unit_ids = [str(uuid.uuid4()) for _ in range(units)]
+    rows = [
+        {"unit_id": unit_id, "building": f"b{i // 100}", "floor": 1, "unit_number": str(i % 100)}
+        for i, unit_id in enumerate(unit_ids)
+    ]
+    for start in range(0, units, INSERT_BATCH):
+        await db.execute(insert(Unit), rows[start:start + INSERT_BATCH])
+    rows = [
+        {
+            "request_id": str(uuid.uuid4()), "description": "x", "category": rng.choice(CATEGORIES),
+            "status": "pending", "user_id": "bench", "unit_id": rng.choice(unit_ids),
+            "created_at": now - timedelta(days=rng.randint(0, 1000)),
+        }
+        for _ in range(requests)
+    ]
+    for start in range(0, requests, INSERT_BATCH):
+        await db.execute(insert(MaintenanceRequest), rows[start:start + INSERT_BATCH])
+    await db.commit()
+
+
+def score_in_python(history) -> list:
+    """The same formula as risk_service.score_units, one unit at a time."""
+    weights = [risk_service._WEIGHTS_BY_KEY.get(risk_service._category_key(c), 1.0) for c in history.categories]
+    scores = []
+    for i in range(len(history.unit_ids)):
+        load = sum(history.counts[i, j] * w for j, w in enumerate(weights))
+        recent_load = sum(history.recent_counts[i, j] * w for j, w in enumerate(weights))
+        recency = math.exp(-history.days_since_request[i] / risk_service.RECENT_DAYS)
+        days = history.days_since_inspection[i]
+        overdue = 1.0 if math.isinf(days) else min(max(days / 365, 0), 2)
+        raw = 0.15 * load + 0.6 * recent_load + 1.0 * recency + 0.8 * overdue
+        scores.append(1 - math.exp(-raw / 2))
+    return scores
+
+
+async def run(units: int, requests: int, seed_value: int):
+    await upgrade_schema()
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        await seed(db, random.Random(seed_value), units, requests, now)
+
+        start = time.perf_counter()
+        history = await risk_service.load_unit_history(db, now)
+        loaded = time.perf_counter()
+        score, level, next_inspection = risk_service.score_units(history, now.date())
+        scored = time.perf_counter()
+        written = await risk_service.write_risk(db, history, score, level, next_inspection)
+        done = time.perf_counter()
+        print(f"{units} units, {requests} requests")
+        print(f"  load history     {loaded - start:6.2f} s")
+        print(f"  score (NumPy)    {(scored - loaded) * 1000:6.1f} ms")
+        print(f"  write            {done - scored:6.2f} s  ({written} rows)")
+
+        start = time.perf_counter()
+        reference = score_in_python(history)
+        elapsed = time.perf_counter() - start
+        max_diff = max((abs(a - b) for a, b in zip(reference, score)), default=0.0)
+        print(f"  score (Python)   {elapsed:6.2f} s  (max difference {max_diff:.1e})")
+
+        start = time.perf_counter()
+        summary = await risk_service.run_risk_scoring(db)
+        print(f"  rerun, no change {time.perf_counter() - start:6.2f} s  {summary}")
+    await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--units", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=300000)
+    parser.add_argument("--seed", type=int, default=2)
+    args = parser.parse_args()
+    asyncio.run(run(args.units, args.requests, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+JWT costs (user-007): python-jose verification vs. the verified-claims
+cache, token creation, and GET /auth/me throughput in-process with the
+claims cache on and off.
+
+    python -m benchmarks.token_decode [--iterations 20000] [--requests 2000]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks._common import use_scratch_database
+
+use_scratch_database("token_decode")
+
+import httpx  # noqa: E402
+from jose import jwt  # noqa: E402
+
+from app.core.cache import TTLCache  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.database import upgrade_schema  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import auth_service  # noqa: E402
+
+
+def per_call_us(elapsed: float, n: int) -> str:
+    return f"{elapsed / n * 1e6:7.1f} us/call"
+
+
+async def microbenchmarks(n: int):
+    start = time.perf_counter()
+    tokens = [auth_service.create_access_token(f"user-{i}", "tenant") for i in range(n)]
+    print(f"create_access_token      {per_call_us(time.perf_counter() - start, n)}")
+
+    token = tokens[0]
+    start = time.perf_counter()
+    for _ in range(n):
+        jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
+    print(f"jose decode              {per_call_us(time.perf_counter() - start, n)}")
+
+    await auth_service.decode_access_token(token)
+    start = time.perf_counter()
+    for _ in range(n):
+        await auth_service.decode_access_token(token)
+    print(f"decode_access_token hit  {per_call_us(time.perf_counter() - start, n)}")
+
+
+async def me_throughput(requests: int, cached: bool):
+    if not cached:
+        auth_service._verified_tokens = TTLCache(0, 0)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        response = await client.post(
+            "/api/v1/auth/register", json={"name": "bench", "phone": f"05{int(cached)}", "password": "bench-password"}
+        )
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        start = time.perf_counter()
+        for _ in range(requests):
+            (await client.get("/api/v1/auth/me", headers=headers)).raise_for_status()
+        elapsed = time.perf_counter() - start
+    label = "claims cache on " if cached else "claims cache off"
+    print(f"GET /auth/me, {label}: {requests / elapsed:7.0f} req/s ({elapsed / requests * 1e6:.0f} us/request)")
+
+
+async def main(args):
+    await upgrade_schema()
+    await microbenchmarks(args.iterations)
+    await me_throughput(args.requests, cached=True)
+    await me_throughput(args.requests, cached=False)
+    auth_service.password_pool.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=2000)
+    asyncio.run(main(parser.parse_args()))
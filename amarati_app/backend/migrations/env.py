@@ -0,0 +1,72 @@
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import pool
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.database import Base, import_models
+
+config = context.config
+import_models()
+target_metadata = Base.metadata
+
+
+def _include_name(name, type_, parent_names):
+    # The full-text index (app.models.maintenance_search) is raw DDL, not
+    # part of the metadata: FTS5 tables on SQLite, a GIN index on PostgreSQL
+    if type_ == "table":
+        return not name.startswith("maintenance_search_fts")
+    if type_ == "index":
+        return name != "ix_maintenance_search_documents_tsv"
+    return True
+
+
+def _configure(**kwargs):
+    # render_as_batch: SQLite can only add columns in place; other changes
+    # go through batch_alter_table, which copies the table
+    context.configure(
+        target_metadata=target_metadata,
+        render_as_batch=True,
+        compare_type=True,
+        include_name=_include_name,
+        **kwargs,
+    )
+
+
+def run_migrations_offline():
+    _configure(url=settings.DATABASE_URL, literal_binds=True, dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run_migrations(connection):
+    _configure(connection=connection)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def _run_async_migrations():
+    engine = create_async_engine(settings.DATABASE_URL, poolclass=pool.NullPool)
+    async with engine.connect() as connection:
+        await connection.run_sync(_run_migrations)
+        await connection.commit()
+    await engine.dispose()
+
+
+def run_migrations_online():
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        # Called by upgrade_schema() inside the app's own transaction
+        _run_migrations(connection)
+        return
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+    asyncio.run(_run_async_migrations())
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,361 @@
+"""Baseline schema
+
+The schema as create_all() built it before the migrations existed. Tables
+that are already there are left alone, apart from adding the columns older
+versions of the models did not have.
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-18 17:12:59.219343
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.database import Base
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_table(existing, name, *elements):
+    # Databases set up by create_all() before the migrations existed
+    # already have the table
+    if name not in existing:
+        op.create_table(name, *elements)
+
+
+def _sqlite_only(bind, *constraints):
+    return list(constraints) if bind.dialect.name == 'sqlite' else []
+
+
+def _add_legacy_columns(bind):
+    """Columns missing from tables created by older versions of the models."""
+    inspector = sa.inspect(bind)
+    columns = {column['name'] for column in inspector.get_columns('users')}
+    if 'building_id' not in columns:
+        with op.batch_alter_table('users', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('building_id', sa.String(length=36), nullable=True))
+            batch_op.create_foreign_key(batch_op.f('users_building_id_fkey'), 'buildings', ['building_id'], ['id'])
+    if 'notification_preferences' not in columns:
+        op.add_column('users', sa.Column('notification_preferences', sa.JSON(), nullable=True))
+
+    columns = {column['name'] for column in inspector.get_columns('notifications')}
+    if 'title' not in columns:
+        # Existing notifications get an empty title
+        op.add_column('notifications', sa.Column('title', sa.String(length=255), nullable=False, server_default=''))
+        with op.batch_alter_table('notifications', schema=None) as batch_op:
+            batch_op.alter_column('title', existing_type=sa.String(length=255), server_default=None)
+    for column in (
+        sa.Column('is_read', sa.Boolean(), nullable=True),
+        sa.Column('related_entity_id', sa.String(length=36), nullable=True),
+        sa.Column('related_entity_type', sa.String(length=50), nullable=True),
+    ):
+        if column.name not in columns:
+            op.add_column('notifications', column)
+
+    if bind.dialect.name == 'sqlite':
+        # create_all() left SQLite's unique constraints unnamed; copying the
+        # table gives them the names the models use
+        for table in inspector.get_table_names():
+            if any(constraint['name'] is None for constraint in inspector.get_unique_constraints(table)):
+                with op.batch_alter_table(
+                    table, recreate='always', naming_convention=Base.metadata.naming_convention
+                ):
+                    pass
+
+
+def upgrade():
+    bind = op.get_bind()
+    existing = set(sa.inspect(bind).get_table_names())
+
+    if 'users' not in existing:
+        op.create_table('users',
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('phone', sa.String(length=20), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=True),
+        sa.Column('password', sa.String(length=255), nullable=False),
+        sa.Column('role', sa.Enum('owner', 'tenant', 'supervisor', 'provider', 'admin', name='userrole'), nullable=False),
+        sa.Column('building_id', sa.String(length=36), nullable=True),
+        sa.Column('notification_preferences', sa.JSON(), nullable=True),
+        # users and buildings reference each other; outside SQLite this key is added once buildings exists
+        *_sqlite_only(bind, sa.ForeignKeyConstraint(['building_id'], ['buildings.id'], name=op.f('users_building_id_fkey'))),
+        sa.PrimaryKeyConstraint('user_id', name=op.f('users_pkey'))
+        )
+        with op.batch_alter_table('users', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_users_email'), ['email'], unique=True)
+            batch_op.create_index(batch_op.f('ix_users_phone'), ['phone'], unique=True)
+
+    _create_table(existing, 'buildings',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=False),
+    sa.Column('address', sa.Text(), nullable=True),
+    sa.Column('city', sa.String(length=100), nullable=True),
+    sa.Column('total_units', sa.Integer(), nullable=True),
+    sa.Column('owner_id', sa.String(length=36), nullable=False),
+    sa.Column('invite_code', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.user_id'], name=op.f('buildings_owner_id_fkey')),
+    sa.PrimaryKeyConstraint('id', name=op.f('buildings_pkey')),
+    sa.UniqueConstraint('invite_code', name=op.f('buildings_invite_code_key'))
+    )
+
+    if 'users' not in existing and bind.dialect.name != 'sqlite':
+        op.create_foreign_key(op.f('users_building_id_fkey'), 'users', 'buildings', ['building_id'], ['id'])
+
+    _create_table(existing, 'audit_logs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=True),
+    sa.Column('action', sa.String(length=255), nullable=False),
+    sa.Column('entity_type', sa.String(length=100), nullable=True),
+    sa.Column('entity_id', sa.String(length=36), nullable=True),
+    sa.Column('details', sa.Text(), nullable=True),
+    sa.Column('ip_address', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], name=op.f('audit_logs_user_id_fkey')),
+    sa.PrimaryKeyConstraint('id', name=op.f('audit_logs_pkey'))
+    )
+
+    _create_table(existing, 'chat_messages',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('building_id', sa.String(length=36), nullable=False),
+    sa.Column('sender_id', sa.String(length=36), nullable=False),
+    sa.Column('message', sa.Text(), nullable=False),
+    sa.Column('message_type', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['building_id'], ['buildings.id'], name=op.f('chat_messages_building_id_fkey')),
+    sa.ForeignKeyConstraint(['sender_id'], ['users.user_id'], name=op.f('chat_messages_sender_id_fkey')),
+    sa.PrimaryKeyConstraint('id', name=op.f('chat_messages_pkey'))
+    )
+
+    _create_table(existing, 'chatbot_interactions',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('query', sa.Text(), nullable=False),
+    sa.Column('response', sa.Text(), nullable=False),
+    sa.Column('language', sa.String(length=5), nullable=True),
+    sa.Column('module_accessed', sa.String(length=50), nullable=True),
+    sa.Column('requires_confirmation', sa.Boolean(), nullable=True),
+    sa.Column('confirmed', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], name=op.f('chatbot_interactions_user_id_fkey')),
+    sa.PrimaryKeyConstraint('id', name=op.f('chatbot_interactions_pkey'))
+    )
+
+    _create_table(existing, 'notifications',
+    sa.Column('notification_id', sa.String(length=36), nullable=False),
+    sa.Column('title', sa.String(length=255), nullable=False),
+    sa.Column('message', sa.Text(), nullable=False),
+    sa.Column('type', sa.String(length=50), nullable=False),
+    sa.Column('is_read', sa.Boolean(), nullable=True),
+    sa.Column('related_entity_id', sa.String(length=36), nullable=True),
+    sa.Column('related_entity_type', sa.String(length=50), nullable=True),
+    sa.Column('date', sa.DateTime(), nullable=True),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], name=op.f('notifications_user_id_fkey')),
+    sa.PrimaryKeyConstraint('notification_id', name=op.f('notifications_pkey'))
+    )
+
+    _create_table(existing, 'provider_profiles',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('company_name', sa.String(length=255), nullable=True),
+    sa.Column('specialization', sa.String(length=255), nullable=True),
+    sa.Column('rating', sa.Float(), nullable=True),
+    sa.Column('total_jobs', sa.Integer(), nullable=True),
+    sa.Column('avg_response_time_hours', sa.Float(), nullable=True),
+    sa.Column('price_range', sa.String(length=50), nullable=True),
+    sa.Column('is_verified', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], name=op.f('provider_profiles_user_id_fkey')),
+    sa.PrimaryKeyConstraint('id', name=op.f('provider_profiles_pkey')),
+    sa.UniqueConstraint('user_id', name=op.f('provider_profiles_user_id_key'))
+    )
+
+    _create_table(existing, 'units',
+    sa.Column('unit_id', sa.String(length=36), nullable=False),
+    sa.Column('building', sa.String(length=255), nullable=False),
+    sa.Column('floor', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], name=op.f('units_user_id_fkey')),
+    sa.PrimaryKeyConstraint('unit_id', name=op.f('units_pkey'))
+    )
+
+    _create_table(existing, 'bills',
+    sa.Column('bill_id', sa.String(length=36), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('due_date', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('unit_id', sa.String(length=36), nullable=False),
+    sa.ForeignKeyConstraint(['unit_id'], ['units.unit_id'], name=op.f('bills_unit_id_fkey')),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], name=op.f('bills_user_id_fkey')),
+    sa.PrimaryKeyConstraint('bill_id', name=op.f('bills_pkey'))
+    )
+
+    _create_table(existing, 'maintenance_requests',
+    sa.Column('request_id', sa.String(length=36), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('unit_number', sa.String(length=50), nullable=True),
+    sa.Column('contact_name', sa.String(length=255), nullable=True),
+    sa.Column('contact_phone', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('unit_id', sa.String(length=36), nullable=True),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.ForeignKeyConstraint(['unit_id'], ['units.unit_id'], name=op.f('maintenance_requests_unit_id_fkey')),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], name=op.f('maintenance_requests_user_id_fkey')),
+    sa.PrimaryKeyConstraint('request_id', name=op.f('maintenance_requests_pkey'))
+    )
+
+    _create_table(existing, 'predictive_maintenance',
+    sa.Column('pm_id', sa.String(length=36), nullable=False),
+    sa.Column('last_inspection', sa.Date(), nullable=True),
+    sa.Column('next_inspection', sa.Date(), nullable=True),
+    sa.Column('risk_level', sa.String(length=50), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('unit_id', sa.String(length=36), nullable=False),
+    sa.ForeignKeyConstraint(['unit_id'], ['units.unit_id'], name=op.f('predictive_maintenance_unit_id_fkey')),
+    sa.PrimaryKeyConstraint('pm_id', name=op.f('predictive_maintenance_pkey'))
+    )
+
+    _create_table(existing, 'unit_invites',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('unit_id', sa.String(length=36), nullable=False),
+    sa.Column('invite_code', sa.String(length=20), nullable=False),
+    sa.Column('created_by', sa.String(length=36), nullable=False),
+    sa.Column('used_by', sa.String(length=36), nullable=True),
+    sa.Column('is_used', sa.Boolean(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by'], ['users.user_id'], name=op.f('unit_invites_created_by_fkey')),
+    sa.ForeignKeyConstraint(['unit_id'], ['units.unit_id'], name=op.f('unit_invites_unit_id_fkey')),
+    sa.ForeignKeyConstraint(['used_by'], ['users.user_id'], name=op.f('unit_invites_used_by_fkey')),
+    sa.PrimaryKeyConstraint('id', name=op.f('unit_invites_pkey')),
+    sa.UniqueConstraint('invite_code', name=op.f('unit_invites_invite_code_key'))
+    )
+
+    _create_table(existing, 'documents',
+    sa.Column('document_id', sa.String(length=36), nullable=False),
+    sa.Column('doc_type', sa.String(length=100), nullable=False),
+    sa.Column('upload_date', sa.DateTime(), nullable=True),
+    sa.Column('file_path', sa.String(length=500), nullable=False),
+    sa.Column('unit_id', sa.String(length=36), nullable=True),
+    sa.Column('user_id', sa.String(length=36), nullable=True),
+    sa.Column('bill_id', sa.String(length=36), nullable=True),
+    sa.ForeignKeyConstraint(['bill_id'], ['bills.bill_id'], name=op.f('documents_bill_id_fkey')),
+    sa.ForeignKeyConstraint(['unit_id'], ['units.unit_id'], name=op.f('documents_unit_id_fkey')),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], name=op.f('documents_user_id_fkey')),
+    sa.PrimaryKeyConstraint('document_id', name=op.f('documents_pkey'))
+    )
+
+    _create_table(existing, 'maintenance_votes',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('request_id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('vote', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['request_id'], ['maintenance_requests.request_id'], name=op.f('maintenance_votes_request_id_fkey')),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], name=op.f('maintenance_votes_user_id_fkey')),
+    sa.PrimaryKeyConstraint('id', name=op.f('maintenance_votes_pkey'))
+    )
+
+    _create_table(existing, 'payments',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('amount', sa.Float(), nullable=False),
+    sa.Column('payment_type', sa.Enum('rent', 'maintenance', 'shared_expense', 'other', name='paymenttype'), nullable=True),
+    sa.Column('status', sa.Enum('pending', 'completed', 'failed', 'refunded', name='paymentstatus'), nullable=True),
+    sa.Column('payer_id', sa.String(length=36), nullable=False),
+    sa.Column('receiver_id', sa.String(length=36), nullable=True),
+    sa.Column('unit_id', sa.String(length=36), nullable=True),
+    sa.Column('building_id', sa.String(length=36), nullable=True),
+    sa.Column('maintenance_request_id', sa.String(length=36), nullable=True),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('receipt_url', sa.Text(), nullable=True),
+    sa.Column('due_date', sa.DateTime(), nullable=True),
+    sa.Column('paid_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['building_id'], ['buildings.id'], name=op.f('payments_building_id_fkey')),
+    sa.ForeignKeyConstraint(['maintenance_request_id'], ['maintenance_requests.request_id'], name=op.f('payments_maintenance_request_id_fkey')),
+    sa.ForeignKeyConstraint(['payer_id'], ['users.user_id'], name=op.f('payments_payer_id_fkey')),
+    sa.ForeignKeyConstraint(['receiver_id'], ['users.user_id'], name=op.f('payments_receiver_id_fkey')),
+    sa.ForeignKeyConstraint(['unit_id'], ['units.unit_id'], name=op.f('payments_unit_id_fkey')),
+    sa.PrimaryKeyConstraint('id', name=op.f('payments_pkey'))
+    )
+
+    _create_table(existing, 'status_logs',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('request_id', sa.String(length=36), nullable=False),
+    sa.Column('old_status', sa.String(length=50), nullable=True),
+    sa.Column('new_status', sa.String(length=50), nullable=False),
+    sa.Column('changed_by', sa.String(length=36), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['changed_by'], ['users.user_id'], name=op.f('status_logs_changed_by_fkey')),
+    sa.ForeignKeyConstraint(['request_id'], ['maintenance_requests.request_id'], name=op.f('status_logs_request_id_fkey')),
+    sa.PrimaryKeyConstraint('id', name=op.f('status_logs_pkey'))
+    )
+
+    _create_table(existing, 'visits',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('request_id', sa.String(length=36), nullable=False),
+    sa.Column('provider_id', sa.String(length=36), nullable=False),
+    sa.Column('technician_name', sa.String(length=255), nullable=True),
+    sa.Column('status', sa.String(length=50), nullable=True),
+    sa.Column('proposed_time', sa.DateTime(), nullable=True),
+    sa.Column('confirmed_by_resident', sa.Boolean(), nullable=True),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('end_time', sa.DateTime(), nullable=True),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['provider_id'], ['users.user_id'], name=op.f('visits_provider_id_fkey')),
+    sa.ForeignKeyConstraint(['request_id'], ['maintenance_requests.request_id'], name=op.f('visits_request_id_fkey')),
+    sa.PrimaryKeyConstraint('id', name=op.f('visits_pkey'))
+    )
+
+    _create_table(existing, 'billing_reminders',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('payment_id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('message', sa.Text(), nullable=True),
+    sa.Column('is_sent', sa.Boolean(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['payment_id'], ['payments.id'], name=op.f('billing_reminders_payment_id_fkey')),
+    sa.ForeignKeyConstraint(['user_id'], ['users.user_id'], name=op.f('billing_reminders_user_id_fkey')),
+    sa.PrimaryKeyConstraint('id', name=op.f('billing_reminders_pkey'))
+    )
+
+    _add_legacy_columns(bind)
+
+
+def downgrade():
+    op.drop_table('billing_reminders')
+    op.drop_table('visits')
+    op.drop_table('status_logs')
+    op.drop_table('payments')
+    op.drop_table('maintenance_votes')
+    op.drop_table('documents')
+    op.drop_table('unit_invites')
+    op.drop_table('predictive_maintenance')
+    op.drop_table('maintenance_requests')
+    op.drop_table('bills')
+    op.drop_table('units')
+    op.drop_table('provider_profiles')
+    op.drop_table('notifications')
+    op.drop_table('chatbot_interactions')
+    op.drop_table('chat_messages')
+    op.drop_table('audit_logs')
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_phone'))
+        batch_op.drop_index(batch_op.f('ix_users_email'))
+
+    if op.get_bind().dialect.name != 'sqlite':
+        op.drop_constraint(op.f('users_building_id_fkey'), 'users', type_='foreignkey')
+    op.drop_table('buildings')
+    op.drop_table('users')
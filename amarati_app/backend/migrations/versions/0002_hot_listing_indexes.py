@@ -0,0 +1,45 @@
+"""Hot listing indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 17:13:01.613230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('chat_messages', schema=None) as batch_op:
+        batch_op.create_index('ix_chat_messages_building_created', ['building_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('maintenance_requests', schema=None) as batch_op:
+        batch_op.create_index('ix_maintenance_requests_status_created', ['status', 'created_at'], unique=False)
+        batch_op.create_index('ix_maintenance_requests_user_created', ['user_id', 'created_at'], unique=False)
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_notifications_user_date', ['user_id', 'date'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_building_id'), ['building_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_building_id'))
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_user_date')
+
+    with op.batch_alter_table('maintenance_requests', schema=None) as batch_op:
+        batch_op.drop_index('ix_maintenance_requests_user_created')
+        batch_op.drop_index('ix_maintenance_requests_status_created')
+
+    with op.batch_alter_table('chat_messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_chat_messages_building_created')
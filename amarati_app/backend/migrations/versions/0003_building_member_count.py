@@ -0,0 +1,30 @@
+"""Building member count
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 17:13:04.030226
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('buildings', sa.Column('member_count', sa.Integer(), nullable=False, server_default='0'))
+    op.execute(
+        "UPDATE buildings SET member_count = "
+        "(SELECT count(*) FROM users WHERE users.building_id = buildings.id)"
+    )
+    with op.batch_alter_table('buildings', schema=None) as batch_op:
+        batch_op.alter_column('member_count', existing_type=sa.Integer(), server_default=None)
+
+
+def downgrade():
+    with op.batch_alter_table('buildings', schema=None) as batch_op:
+        batch_op.drop_column('member_count')
@@ -0,0 +1,27 @@
+"""Member directory index
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 17:13:06.072350
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_building_id'))
+        batch_op.create_index('ix_users_building_name', ['building_id', 'name', 'user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_building_name')
+        batch_op.create_index(batch_op.f('ix_users_building_id'), ['building_id'], unique=False)
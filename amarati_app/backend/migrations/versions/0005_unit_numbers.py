@@ -0,0 +1,27 @@
+"""Unit numbers
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 17:13:08.457367
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('unit_number', sa.String(length=50), nullable=True))
+        batch_op.create_unique_constraint('uq_units_building_unit_number', ['building', 'unit_number'])
+
+
+def downgrade():
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_units_building_unit_number', type_='unique')
+        batch_op.drop_column('unit_number')
@@ -0,0 +1,37 @@
+"""Maintenance listing indexes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 17:13:10.958384
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('maintenance_requests', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_maintenance_requests_status_created'))
+        batch_op.create_index('ix_maintenance_requests_status_created', ['status', 'created_at', 'request_id'], unique=False)
+        batch_op.drop_index(batch_op.f('ix_maintenance_requests_user_created'))
+        batch_op.create_index('ix_maintenance_requests_user_created', ['user_id', 'created_at', 'request_id'], unique=False)
+        batch_op.create_index('ix_maintenance_requests_category_created', ['category', 'created_at', 'request_id'], unique=False)
+        batch_op.create_index('ix_maintenance_requests_created', ['created_at', 'request_id'], unique=False)
+        batch_op.create_index('ix_maintenance_requests_unit_created', ['unit_number', 'created_at', 'request_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('maintenance_requests', schema=None) as batch_op:
+        batch_op.drop_index('ix_maintenance_requests_unit_created')
+        batch_op.drop_index('ix_maintenance_requests_created')
+        batch_op.drop_index('ix_maintenance_requests_category_created')
+        batch_op.drop_index('ix_maintenance_requests_user_created')
+        batch_op.create_index(batch_op.f('ix_maintenance_requests_user_created'), ['user_id', 'created_at'], unique=False)
+        batch_op.drop_index('ix_maintenance_requests_status_created')
+        batch_op.create_index(batch_op.f('ix_maintenance_requests_status_created'), ['status', 'created_at'], unique=False)
@@ -0,0 +1,25 @@
+"""Status log index
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 17:13:13.364082
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('status_logs', schema=None) as batch_op:
+        batch_op.create_index('ix_status_logs_request_created', ['request_id', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('status_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_status_logs_request_created')
@@ -0,0 +1,78 @@
+"""Maintenance search documents
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 17:13:15.638294
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.search_service import search_document
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+# The full-text index as it stood at this revision (0019 re-keys it on an id column)
+_SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS maintenance_search_fts USING fts5(
+        content, content='maintenance_search_documents', content_rowid='rowid'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS maintenance_search_ai AFTER INSERT ON maintenance_search_documents BEGIN
+        INSERT INTO maintenance_search_fts(rowid, content) VALUES (new.rowid, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS maintenance_search_ad AFTER DELETE ON maintenance_search_documents BEGIN
+        INSERT INTO maintenance_search_fts(maintenance_search_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS maintenance_search_au AFTER UPDATE ON maintenance_search_documents BEGIN
+        INSERT INTO maintenance_search_fts(maintenance_search_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+        INSERT INTO maintenance_search_fts(rowid, content) VALUES (new.rowid, new.content);
+    END""",
+]
+_POSTGRES_DDL = [
+    """CREATE INDEX IF NOT EXISTS ix_maintenance_search_documents_tsv
+        ON maintenance_search_documents USING gin (to_tsvector('simple', content))""",
+]
+
+
+def upgrade():
+    op.create_table('maintenance_search_documents',
+    sa.Column('request_id', sa.String(length=36), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['request_id'], ['maintenance_requests.request_id'], name=op.f('maintenance_search_documents_request_id_fkey')),
+    sa.PrimaryKeyConstraint('request_id', name=op.f('maintenance_search_documents_pkey'))
+    )
+
+    bind = op.get_bind()
+    for statement in {"sqlite": _SQLITE_DDL, "postgresql": _POSTGRES_DDL}.get(bind.dialect.name, []):
+        bind.exec_driver_sql(statement)
+    last_id = ''
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT request_id, category, description FROM maintenance_requests "
+                "WHERE request_id > :last_id ORDER BY request_id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BACKFILL_BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            sa.text("INSERT INTO maintenance_search_documents (request_id, content) VALUES (:request_id, :content)"),
+            [{"request_id": request_id, "content": search_document(category, description)}
+             for request_id, category, description in rows],
+        )
+        last_id = rows[-1].request_id
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        for trigger in ('maintenance_search_ai', 'maintenance_search_ad', 'maintenance_search_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS maintenance_search_fts")
+    op.drop_table('maintenance_search_documents')
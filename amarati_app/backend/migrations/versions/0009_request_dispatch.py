@@ -0,0 +1,31 @@
+"""Request dispatch
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 17:13:17.925448
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('maintenance_requests', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('assigned_provider_id', sa.String(length=36), nullable=True))
+        batch_op.add_column(sa.Column('assigned_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_maintenance_requests_provider_created', ['assigned_provider_id', 'created_at', 'request_id'], unique=False)
+        batch_op.create_foreign_key(batch_op.f('maintenance_requests_assigned_provider_id_fkey'), 'users', ['assigned_provider_id'], ['user_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('maintenance_requests', schema=None) as batch_op:
+        batch_op.drop_constraint(batch_op.f('maintenance_requests_assigned_provider_id_fkey'), type_='foreignkey')
+        batch_op.drop_index('ix_maintenance_requests_provider_created')
+        batch_op.drop_column('assigned_at')
+        batch_op.drop_column('assigned_provider_id')
@@ -0,0 +1,80 @@
+"""Maintenance analytics rollups
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 17:13:20.006885
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('maintenance_activity_rollups',
+    sa.Column('building_id', sa.String(length=36), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('completed_count', sa.Integer(), nullable=False),
+    sa.Column('completion_hours_total', sa.Float(), nullable=False),
+    sa.Column('reopened_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['building_id'], ['buildings.id'], name=op.f('maintenance_activity_rollups_building_id_fkey')),
+    sa.PrimaryKeyConstraint('building_id', 'day', 'category', name=op.f('maintenance_activity_rollups_pkey'))
+    )
+    op.create_table('maintenance_status_rollups',
+    sa.Column('building_id', sa.String(length=36), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('category', sa.String(length=100), nullable=False),
+    sa.Column('status', sa.String(length=50), nullable=False),
+    sa.Column('request_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['building_id'], ['buildings.id'], name=op.f('maintenance_status_rollups_building_id_fkey')),
+    sa.PrimaryKeyConstraint('building_id', 'day', 'category', 'status', name=op.f('maintenance_status_rollups_pkey'))
+    )
+    with op.batch_alter_table('maintenance_requests', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('building_id', sa.String(length=36), nullable=True))
+        batch_op.create_index('ix_maintenance_requests_building_created', ['building_id', 'created_at', 'request_id'], unique=False)
+        batch_op.create_foreign_key(batch_op.f('maintenance_requests_building_id_fkey'), 'buildings', ['building_id'], ['id'])
+
+    # Existing requests belong to their creator's building; then build the
+    # rollups from them the way analytics_service.rebuild_rollups() does
+    op.execute(
+        "UPDATE maintenance_requests SET building_id = "
+        "(SELECT users.building_id FROM users WHERE users.user_id = maintenance_requests.user_id)"
+    )
+    op.execute(
+        "INSERT INTO maintenance_status_rollups (building_id, day, category, status, request_count) "
+        "SELECT building_id, date(created_at), category, status, count(*) FROM maintenance_requests "
+        "WHERE building_id IS NOT NULL AND created_at IS NOT NULL "
+        "GROUP BY building_id, date(created_at), category, status"
+    )
+    if op.get_bind().dialect.name == 'postgresql':
+        hours = "extract(epoch FROM l.created_at - r.created_at) / 3600"
+    else:
+        hours = "(julianday(l.created_at) - julianday(r.created_at)) * 24"
+    op.execute(
+        "INSERT INTO maintenance_activity_rollups "
+        "(building_id, day, category, completed_count, completion_hours_total, reopened_count) "
+        "SELECT r.building_id, date(l.created_at), r.category, "
+        "sum(CASE WHEN l.new_status = 'completed' THEN 1 ELSE 0 END), "
+        f"coalesce(sum(CASE WHEN l.new_status = 'completed' THEN {hours} END), 0.0), "
+        "sum(CASE WHEN l.old_status = 'completed' THEN 1 ELSE 0 END) "
+        "FROM status_logs l JOIN maintenance_requests r ON r.request_id = l.request_id "
+        "WHERE r.building_id IS NOT NULL AND l.created_at IS NOT NULL "
+        "AND (l.new_status = 'completed' OR l.old_status = 'completed') "
+        "GROUP BY r.building_id, date(l.created_at), r.category"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('maintenance_requests', schema=None) as batch_op:
+        batch_op.drop_constraint(batch_op.f('maintenance_requests_building_id_fkey'), type_='foreignkey')
+        batch_op.drop_index('ix_maintenance_requests_building_created')
+        batch_op.drop_column('building_id')
+
+    op.drop_table('maintenance_status_rollups')
+    op.drop_table('maintenance_activity_rollups')
@@ -0,0 +1,36 @@
+"""Unit risk scores
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 17:13:22.116583
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # One row per unit from now on: keep each unit's most recently inspected row
+    op.execute(
+        "DELETE FROM predictive_maintenance WHERE EXISTS ("
+        "SELECT 1 FROM predictive_maintenance newer "
+        "WHERE newer.unit_id = predictive_maintenance.unit_id AND ("
+        "coalesce(newer.last_inspection, '0001-01-01') > coalesce(predictive_maintenance.last_inspection, '0001-01-01') "
+        "OR (coalesce(newer.last_inspection, '0001-01-01') = coalesce(predictive_maintenance.last_inspection, '0001-01-01') "
+        "AND newer.pm_id > predictive_maintenance.pm_id)))"
+    )
+    with op.batch_alter_table('predictive_maintenance', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('risk_score', sa.Float(), nullable=True))
+        batch_op.create_unique_constraint(batch_op.f('predictive_maintenance_unit_id_key'), ['unit_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('predictive_maintenance', schema=None) as batch_op:
+        batch_op.drop_constraint(batch_op.f('predictive_maintenance_unit_id_key'), type_='unique')
+        batch_op.drop_column('risk_score')
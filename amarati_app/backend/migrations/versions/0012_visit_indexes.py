@@ -0,0 +1,27 @@
+"""Visit indexes
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 17:13:24.116677
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('visits', schema=None) as batch_op:
+        batch_op.create_index('ix_visits_provider_start', ['provider_id', 'start_time'], unique=False)
+        batch_op.create_index('ix_visits_request', ['request_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('visits', schema=None) as batch_op:
+        batch_op.drop_index('ix_visits_request')
+        batch_op.drop_index('ix_visits_provider_start')
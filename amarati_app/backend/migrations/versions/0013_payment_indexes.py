@@ -0,0 +1,31 @@
+"""Payment indexes
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-18 17:13:26.039943
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0013'
+down_revision = '0012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.create_index('ix_payments_created', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_payments_payer_created', ['payer_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_payments_receiver_status', ['receiver_id', 'status', 'amount'], unique=False)
+        batch_op.create_index('ix_payments_status_due', ['status', 'due_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index('ix_payments_status_due')
+        batch_op.drop_index('ix_payments_receiver_status')
+        batch_op.drop_index('ix_payments_payer_created')
+        batch_op.drop_index('ix_payments_created')
@@ -0,0 +1,48 @@
+"""Payment ledgers
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-18 17:13:28.034070
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0014'
+down_revision = '0013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('payment_ledgers',
+    sa.Column('account_type', sa.String(length=20), nullable=False),
+    sa.Column('account_id', sa.String(length=36), nullable=False),
+    sa.Column('payment_count', sa.Integer(), nullable=False),
+    sa.Column('total_amount', sa.Float(), nullable=False),
+    sa.Column('pending_amount', sa.Float(), nullable=False),
+    sa.Column('completed_amount', sa.Float(), nullable=False),
+    sa.Column('failed_amount', sa.Float(), nullable=False),
+    sa.Column('refunded_amount', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('account_type', 'account_id', name=op.f('payment_ledgers_pkey'))
+    )
+
+    # The totals payment_service.reconcile_ledgers() expects: each payment
+    # counts towards its receiver's and its building's ledger
+    amounts = ", ".join(
+        f"sum(CASE WHEN status = '{status}' THEN amount ELSE 0 END)"
+        for status in ('pending', 'completed', 'failed', 'refunded')
+    )
+    for account_type, column in (('provider', 'receiver_id'), ('building', 'building_id')):
+        op.execute(
+            "INSERT INTO payment_ledgers (account_type, account_id, payment_count, total_amount, "
+            "pending_amount, completed_amount, failed_amount, refunded_amount, updated_at) "
+            f"SELECT '{account_type}', {column}, count(*), sum(amount), {amounts}, CURRENT_TIMESTAMP "
+            f"FROM payments WHERE {column} IS NOT NULL GROUP BY {column}"
+        )
+
+
+def downgrade():
+    op.drop_table('payment_ledgers')
@@ -0,0 +1,53 @@
+"""Billing runs
+
+Revision ID: 0015
+Revises: 0014
+Create Date: 2026-10-18 17:13:30.434585
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0015'
+down_revision = '0014'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('billing_reminders', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('bill_id', sa.String(length=36), nullable=True))
+        batch_op.add_column(sa.Column('remind_at', sa.DateTime(), nullable=True))
+        batch_op.alter_column('payment_id',
+               existing_type=sa.VARCHAR(length=36),
+               nullable=True)
+        batch_op.create_index('ix_billing_reminders_due', ['is_sent', 'remind_at'], unique=False)
+        batch_op.create_unique_constraint('uq_billing_reminders_bill_time', ['bill_id', 'remind_at'])
+        batch_op.create_foreign_key(batch_op.f('billing_reminders_bill_id_fkey'), 'bills', ['bill_id'], ['bill_id'])
+
+    with op.batch_alter_table('bills', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('period', sa.String(length=7), nullable=True))
+        batch_op.create_unique_constraint('uq_bills_unit_period', ['unit_id', 'period'])
+
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('monthly_rent', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('units', schema=None) as batch_op:
+        batch_op.drop_column('monthly_rent')
+
+    with op.batch_alter_table('bills', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_bills_unit_period', type_='unique')
+        batch_op.drop_column('period')
+
+    with op.batch_alter_table('billing_reminders', schema=None) as batch_op:
+        batch_op.drop_constraint(batch_op.f('billing_reminders_bill_id_fkey'), type_='foreignkey')
+        batch_op.drop_constraint('uq_billing_reminders_bill_time', type_='unique')
+        batch_op.drop_index('ix_billing_reminders_due')
+        batch_op.alter_column('payment_id',
+               existing_type=sa.VARCHAR(length=36),
+               nullable=False)
+        batch_op.drop_column('remind_at')
+        batch_op.drop_column('bill_id')
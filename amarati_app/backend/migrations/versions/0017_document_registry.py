@@ -0,0 +1,58 @@
+"""Document registry
+
+Revision ID: 0017
+Revises: 0016
+Create Date: 2026-10-18 17:13:35.614150
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0017'
+down_revision = '0016'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Every existing document becomes version 1 of its own group
+    op.add_column('documents', sa.Column('title', sa.String(length=255), nullable=True))
+    op.add_column('documents', sa.Column('building_id', sa.String(length=36), nullable=True))
+    op.add_column('documents', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    op.add_column('documents', sa.Column('visibility_role', sa.String(length=20), nullable=False, server_default='all'))
+    op.add_column('documents', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    op.add_column('documents', sa.Column('version_group_id', sa.String(length=36), nullable=True))
+    op.add_column('documents', sa.Column('parent_document_id', sa.String(length=36), nullable=True))
+    op.add_column('documents', sa.Column('is_current', sa.Boolean(), nullable=False, server_default=sa.true()))
+    op.execute("UPDATE documents SET version_group_id = document_id")
+
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.alter_column('visibility_role', existing_type=sa.String(length=20), server_default=None)
+        batch_op.alter_column('version', existing_type=sa.Integer(), server_default=None)
+        batch_op.alter_column('version_group_id', existing_type=sa.String(length=36), nullable=False)
+        batch_op.alter_column('is_current', existing_type=sa.Boolean(), server_default=None)
+        batch_op.create_index('ix_documents_building_current_uploaded', ['building_id', 'is_current', 'upload_date', 'document_id'], unique=False)
+        batch_op.create_index('ix_documents_current_expires', ['is_current', 'expires_at'], unique=False)
+        batch_op.create_index('ix_documents_group_current', ['version_group_id', 'is_current'], unique=False)
+        batch_op.create_unique_constraint('uq_documents_group_version', ['version_group_id', 'version'])
+        batch_op.create_foreign_key(batch_op.f('documents_building_id_fkey'), 'buildings', ['building_id'], ['id'])
+        batch_op.create_foreign_key(batch_op.f('documents_parent_document_id_fkey'), 'documents', ['parent_document_id'], ['document_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_constraint(batch_op.f('documents_parent_document_id_fkey'), type_='foreignkey')
+        batch_op.drop_constraint(batch_op.f('documents_building_id_fkey'), type_='foreignkey')
+        batch_op.drop_constraint('uq_documents_group_version', type_='unique')
+        batch_op.drop_index('ix_documents_group_current')
+        batch_op.drop_index('ix_documents_current_expires')
+        batch_op.drop_index('ix_documents_building_current_uploaded')
+        batch_op.drop_column('is_current')
+        batch_op.drop_column('parent_document_id')
+        batch_op.drop_column('version_group_id')
+        batch_op.drop_column('version')
+        batch_op.drop_column('visibility_role')
+        batch_op.drop_column('expires_at')
+        batch_op.drop_column('building_id')
+        batch_op.drop_column('title')
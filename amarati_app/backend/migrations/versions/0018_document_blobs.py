@@ -0,0 +1,49 @@
+"""Document blobs
+
+Revision ID: 0018
+Revises: 0017
+Create Date: 2026-10-18 17:13:38.570660
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0018'
+down_revision = '0017'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('document_blobs',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('size_bytes', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('released_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('sha256', name=op.f('document_blobs_pkey'))
+    )
+    with op.batch_alter_table('document_blobs', schema=None) as batch_op:
+        batch_op.create_index('ix_document_blobs_released', ['ref_count', 'released_at'], unique=False)
+
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('blob_sha256', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('file_name', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('content_type', sa.String(length=100), nullable=True))
+        batch_op.add_column(sa.Column('size_bytes', sa.BigInteger(), nullable=True))
+        batch_op.create_foreign_key(batch_op.f('documents_blob_sha256_fkey'), 'document_blobs', ['blob_sha256'], ['sha256'])
+
+
+def downgrade():
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_constraint(batch_op.f('documents_blob_sha256_fkey'), type_='foreignkey')
+        batch_op.drop_column('size_bytes')
+        batch_op.drop_column('content_type')
+        batch_op.drop_column('file_name')
+        batch_op.drop_column('blob_sha256')
+
+    with op.batch_alter_table('document_blobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_document_blobs_released')
+
+    op.drop_table('document_blobs')
@@ -0,0 +1,105 @@
+"""Search document ids
+
+Revision ID: 0019
+Revises: 0018
+Create Date: 2026-10-18 21:40:12.518203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.maintenance_search import create_search_index
+from app.services.search_service import search_document
+
+
+revision = '0019'
+down_revision = '0018'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _drop_search_index(bind):
+    if bind.dialect.name == 'sqlite':
+        for trigger in ('maintenance_search_ai', 'maintenance_search_ad', 'maintenance_search_au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS maintenance_search_fts")
+    elif bind.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_maintenance_search_documents_tsv")
+
+
+def _backfill(bind):
+    last_id = ''
+    while True:
+        rows = bind.execute(
+            sa.text(
+                "SELECT request_id, category, description FROM maintenance_requests "
+                "WHERE request_id > :last_id ORDER BY request_id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BACKFILL_BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            sa.text("INSERT INTO maintenance_search_documents (request_id, content) VALUES (:request_id, :content)"),
+            [{"request_id": request_id, "content": search_document(category, description)}
+             for request_id, category, description in rows],
+        )
+        last_id = rows[-1].request_id
+
+
+def upgrade():
+    # The documents are derived from maintenance_requests: rebuild the table
+    # keyed on an INTEGER PRIMARY KEY for the FTS5 content_rowid
+    bind = op.get_bind()
+    _drop_search_index(bind)
+    op.drop_table('maintenance_search_documents')
+    op.create_table('maintenance_search_documents',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('request_id', sa.String(length=36), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['request_id'], ['maintenance_requests.request_id'], name=op.f('maintenance_search_documents_request_id_fkey')),
+    sa.PrimaryKeyConstraint('id', name=op.f('maintenance_search_documents_pkey')),
+    sa.UniqueConstraint('request_id', name=op.f('maintenance_search_documents_request_id_key'))
+    )
+    create_search_index(bind)
+    _backfill(bind)
+
+
+def downgrade():
+    bind = op.get_bind()
+    _drop_search_index(bind)
+    op.drop_table('maintenance_search_documents')
+    op.create_table('maintenance_search_documents',
+    sa.Column('request_id', sa.String(length=36), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['request_id'], ['maintenance_requests.request_id'], name=op.f('maintenance_search_documents_request_id_fkey')),
+    sa.PrimaryKeyConstraint('request_id', name=op.f('maintenance_search_documents_pkey'))
+    )
+    if bind.dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE maintenance_search_fts USING fts5("
+            "content, content='maintenance_search_documents', content_rowid='rowid')"
+        )
+        op.execute(
+            "CREATE TRIGGER maintenance_search_ai AFTER INSERT ON maintenance_search_documents BEGIN "
+            "INSERT INTO maintenance_search_fts(rowid, content) VALUES (new.rowid, new.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER maintenance_search_ad AFTER DELETE ON maintenance_search_documents BEGIN "
+            "INSERT INTO maintenance_search_fts(maintenance_search_fts, rowid, content) "
+            "VALUES ('delete', old.rowid, old.content); END"
+        )
+        op.execute(
+            "CREATE TRIGGER maintenance_search_au AFTER UPDATE ON maintenance_search_documents BEGIN "
+            "INSERT INTO maintenance_search_fts(maintenance_search_fts, rowid, content) "
+            "VALUES ('delete', old.rowid, old.content); "
+            "INSERT INTO maintenance_search_fts(rowid, content) VALUES (new.rowid, new.content); END"
+        )
+    elif bind.dialect.name == 'postgresql':
+        op.execute(
+            "CREATE INDEX ix_maintenance_search_documents_tsv "
+            "ON maintenance_search_documents USING gin (to_tsvector('simple', content))"
+        )
+    _backfill(bind)
@@ -0,0 +1,139 @@
+"""
+EXPLAIN QUERY PLAN checks for the hot listing queries: each must be
+answered from its composite index, never by scanning the table, and
+(for the ordered listings) without a temp B-tree sort.
+"""
+import random
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select, text
+
+from app.core.database import Base
+from app.models import user, unit, bill, document, maintenance_request, predictive_maintenance, notification  # noqa
+from app.models import building, payment, maintenance, system  # noqa
+from app.models import maintenance_search, maintenance_analytics  # noqa
+from app.models.building import Building
+from app.models.maintenance_request import MaintenanceRequest
+from app.models.notification import Notification
+from app.models.system import ChatMessage
+from app.models.user import User, UserRole
+
+BUILDINGS = 20
+USERS = 400
+ROWS = 4000
+STATUSES = ("pending", "in_progress", "completed", "cancelled")
+
+
+@pytest.fixture(scope="module")
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    rng = random.Random(3)
+    start = datetime(2025, 1, 1)
+    building_ids = [str(uuid.uuid4()) for _ in range(BUILDINGS)]
+    user_ids = [str(uuid.uuid4()) for _ in range(USERS)]
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {
+                "user_id": user_id, "name": f"user {i}", "phone": f"05{i:08d}", "password": "x",
+                "role": UserRole.tenant, "building_id": building_ids[i % BUILDINGS],
+            }
+            for i, user_id in enumerate(user_ids)
+        ])
+        conn.execute(insert(Building), [
+            {"id": building_id, "name": f"b{i}", "owner_id": user_ids[i], "invite_code": f"CODE{i}"}
+            for i, building_id in enumerate(building_ids)
+        ])
+        conn.execute(insert(MaintenanceRequest), [
+            {
+                "request_id": str(uuid.uuid4()), "description": "تسريب", "category": "plumbing",
+                "status": rng.choice(STATUSES), "user_id": rng.choice(user_ids),
+                "building_id": rng.choice(building_ids), "created_at": start + timedelta(minutes=i),
+            }
+            for i in range(ROWS)
+        ])
+        conn.execute(insert(Notification), [
+            {
+                "notification_id": str(uuid.uuid4()), "title": "t", "message": "m", "type": "general",
+                "user_id": rng.choice(user_ids), "date": start + timedelta(minutes=i),
+            }
+            for i in range(ROWS)
+        ])
+        conn.execute(insert(ChatMessage), [
+            {
+                "id": str(uuid.uuid4()), "building_id": rng.choice(building_ids),
+                "sender_id": rng.choice(user_ids), "message": "مرحبا", "created_at": start + timedelta(minutes=i),
+            }
+            for i in range(ROWS)
+        ])
+        conn.execute(text("ANALYZE"))
+    yield engine
+    engine.dispose()
+
+
+def _plan(engine, statement) -> list:
+    compiled = statement.compile(dialect=engine.dialect)
+    params = compiled.construct_params()
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {compiled}", tuple(params[name] for name in compiled.positiontup)
+        ).all()
+    return [row[-1] for row in rows]
+
+
+_since = datetime(2025, 1, 2)
+
+HOT_QUERIES = {
+    # /maintenance/my: one user's requests, newest first (keyset page)
+    "maintenance_my": (
+        select(MaintenanceRequest)
+        .where(MaintenanceRequest.user_id == "u", MaintenanceRequest.created_at >= _since)
+        .order_by(MaintenanceRequest.created_at.desc(), MaintenanceRequest.request_id.desc())
+        .limit(51),
+        "ix_maintenance_requests_user_created",
+    ),
+    # /maintenance/?status=...
+    "maintenance_by_status": (
+        select(MaintenanceRequest)
+        .where(MaintenanceRequest.status == "pending")
+        .order_by(MaintenanceRequest.created_at.desc(), MaintenanceRequest.request_id.desc())
+        .limit(51),
+        "ix_maintenance_requests_status_created",
+    ),
+    # /notifications/
+    "notifications": (
+        select(Notification).where(Notification.user_id == "u").order_by(Notification.date.desc()),
+        "ix_notifications_user_date",
+    ),
+    # /chat
+    "chat_history": (
+        select(ChatMessage).where(ChatMessage.building_id == "b").order_by(ChatMessage.created_at.asc()),
+        "ix_chat_messages_building_created",
+    ),
+    # /buildings/my/members
+    "building_members": (
+        select(User.user_id, User.name, User.role)
+        .where(User.building_id == "b")
+        .order_by(User.name, User.user_id)
+        .limit(51),
+        "ix_users_building_name",
+    ),
+    # Member count of a building
+    "building_member_count": (
+        select(func.count()).select_from(User).where(User.building_id == "b"),
+        "ix_users_building_name",
+    ),
+}
+
+
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+def test_hot_query_uses_index(engine, name):
+    statement, index = HOT_QUERIES[name]
+    table = statement.get_final_froms()[0].name
+    plan = _plan(engine, statement)
+
+    assert any(index in step for step in plan), plan
+    assert not any(step.startswith(f"SCAN {table}") for step in plan), plan
+    assert not any("USE TEMP B-TREE" in step for step in plan), plan